@@ -1,7 +1,17 @@
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.bot_service import analyze_image_with_gemini, verify_certificate
+from app.services import bot_service
+from app.services.bot_service import analyze_image_with_gemini, verify_certificate, iter_file_upload_stages
+from app.core import config
+from app.core.admission import admission, AdmissionRejected, PRIORITY_HIGH
+from app.core.deadline import current_deadline
+from app.core.responses import json_response, not_modified, request_etag
+from app.services.decision_engine import get_engine
+from app.utils.file_utils import detect_file_type
+from app.utils.sse import stage_event_stream, SSE_HEADERS
+import hashlib
 import json
 
 router = APIRouter()
@@ -9,8 +19,11 @@ router = APIRouter()
 class CertificateRequest(BaseModel):
     url: str
 
+def _upload_work_class(content: bytes) -> str:
+    return "pdf" if detect_file_type(content) == "pdf" else "image"
+
 @router.post("/bot/analyze-image")
-async def analyze_image(file: UploadFile = File(...)):
+async def analyze_image(request: Request, file: UploadFile = File(...)):
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
     
@@ -18,12 +31,21 @@ async def analyze_image(file: UploadFile = File(...)):
 
     # Read file content
     content = await file.read()
+    # A rules, model or prompt change must not revalidate an old answer
+    etag = request_etag(request, "bot-file", hashlib.sha256(content).hexdigest(),
+                        get_engine().fingerprint, bot_service.ai_fingerprint())
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
     
     # Process with Gemini
     # The service returns a JSON string, we try to parse it to return a proper JSON object
     try:
-        result_str = await analyze_image_with_gemini(content)
+        async with admission.admit(_upload_work_class(content)):
+            result_str = await analyze_image_with_gemini(content)
         print(f"[DEBUG] Service returned result string of length {len(result_str)}")
+    except AdmissionRejected:
+        raise
     except Exception as e:
         print(f"[ERROR] Service call failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -31,19 +53,39 @@ async def analyze_image(file: UploadFile = File(...)):
     try:
         result_json = json.loads(result_str)
         print(f"[DEBUG] JSON Parsed successfully. returning.")
-        return result_json
+        cacheable = isinstance(result_json, dict) and not result_json.get("partial")
+        return json_response(request, result_json, etag=etag, cacheable=cacheable)
     except json.JSONDecodeError as e:
         # If parsing fails, return raw string (or wrap it)
         print(f"[ERROR] JSON Decode Error: {e}. Raw: {result_str}")
-        return {
+        return json_response(request, {
             "raw_response": result_str,
             "note": "Could not parse JSON from AI model"
-        }
+        }, cacheable=False)
+
+@router.post("/bot/analyze-image/stream")
+async def analyze_image_stream(request: Request, file: UploadFile = File(...)):
+    """Streaming variant of /bot/analyze-image (Server-Sent Events)."""
+    if not file:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    content = await file.read()
+    ticket = await admission.acquire(_upload_work_class(content))
+    current_deadline().add_done_callback(ticket.release)
+    return StreamingResponse(
+        stage_event_stream(request, iter_file_upload_stages(content), on_close=ticket.release),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
 
 @router.post("/bot/verify-certificate")
-async def verify_cert_endpoint(request: CertificateRequest):
-    if not request.url:
+async def verify_cert_endpoint(request: Request, body: CertificateRequest):
+    if not body.url:
         raise HTTPException(status_code=400, detail="URL is required")
         
-    result = await verify_certificate(request.url)
-    return result
+    # Cheap interactive check: its own budget, served ahead of background work
+    async with admission.admit("scrape", PRIORITY_HIGH):
+        result = await verify_certificate(body.url)
+    # Tagged by body hash; only results the server itself caches are cacheable
+    cacheable = bot_service.certificate_cache.get(body.url.strip()) is not None
+    return json_response(request, result, max_age=int(config.CERT_CACHE_TTL_SECONDS), cacheable=cacheable)
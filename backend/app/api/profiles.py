@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from app.core.profiling import is_admin, list_profiles, profile_file
+
+router = APIRouter()
+
+def _require_admin(token: str):
+    if not is_admin(token):
+        # Same answer whether profiling is off or the token is wrong
+        raise HTTPException(status_code=404, detail="Not found")
+
+@router.get("/profiles")
+def get_profiles(request_id: str = None, x_admin_token: str = Header(None)):
+    """Recent profiles, newest first, optionally for one request id."""
+    _require_admin(x_admin_token)
+    return {"profiles": list_profiles(request_id)}
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, x_admin_token: str = Header(None)):
+    """Folded stacks: feed to flamegraph.pl or open in speedscope."""
+    _require_admin(x_admin_token)
+    path = profile_file(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -1,16 +1,55 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.media_router import route_media
+import hashlib
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.core.admission import admission
+from app.core.deadline import current_deadline
+from app.core.responses import json_response, not_modified, request_etag
+from app.services.decision_engine import get_engine
+from app.services.media_router import route_media_bytes, iter_media_stages
+from app.utils.file_utils import detect_file_type
+from app.utils.sse import stage_event_stream, SSE_HEADERS
 
 router = APIRouter()
 
 @router.post("/verify")
-async def verify_file(file: UploadFile = File(...)):
+async def verify_file(request: Request, file: UploadFile = File(...)):
     if not file:
         raise HTTPException(status_code=400, detail="No file uploaded")
 
-    result = await route_media(file)
-    return {
+    # Same bytes under the same rules give the same result: answer repeats with a 304
+    file_bytes = await file.read()
+    etag = request_etag(request, "verify", hashlib.sha256(file_bytes).hexdigest(), file.filename,
+                        get_engine().fingerprint)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    # Admission is per media type so large videos cannot starve images/PDFs
+    async with admission.admit(detect_file_type(file_bytes)):
+        result = await route_media_bytes(file_bytes)
+    payload = {
         "status": "RECEIVED",
         "filename": file.filename,
         "routing": result
     }
+    return json_response(request, payload, etag=etag, cacheable=not result["decision"].get("partial"))
+
+@router.post("/verify/stream")
+async def verify_file_stream(request: Request, file: UploadFile = File(...)):
+    """
+    Same pipeline as /verify, streamed as Server-Sent Events:
+    one `stage` event per finished stage, then a `result` event with the
+    routing payload. Closing the connection cancels pending stages.
+    """
+    if not file:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    file_bytes = await file.read()
+    ticket = await admission.acquire(detect_file_type(file_bytes))
+    # Released when the stream ends, or by the request cleanup if it never starts
+    current_deadline().add_done_callback(ticket.release)
+    return StreamingResponse(
+        stage_event_stream(request, iter_media_stages(file_bytes), on_close=ticket.release),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
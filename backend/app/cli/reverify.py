@@ -0,0 +1,303 @@
+"""
+Offline bulk re-verification.
+
+Walks a directory or tarball and runs every file through the same
+detect_file_type -> registered analyzers -> make_decision pipeline the
+API uses, in a process pool, without going over HTTP.
+
+    python -m app.cli.reverify /data/uploads --output results.jsonl
+    python -m app.cli.reverify archive.tar.gz --output results.parquet --workers 8
+
+The results file doubles as the checkpoint: every record is appended and
+flushed as soon as it is produced, so after a crash the same command resumes
+where it stopped. A file is skipped when a record with the same path, content
+hash and rules fingerprint already exists; a file whose content was already
+seen under another path reuses that decision. Changing decision_weights.json
+changes the fingerprint, so everything is re-scored.
+
+Network stages (QR certificate lookups, AI observations) are not run offline.
+Parquet output needs pyarrow (checked before any work starts); records are
+staged as JSONL next to the output and converted once the run completes.
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app.utils.file_utils import detect_file_type
+from app.services import analyzers
+from app.services.decision_engine import get_engine, make_decision
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def rules_fingerprint() -> str:
+    """Fingerprint of the loaded decision table (as in API ETags), stored with every record."""
+    return get_engine().fingerprint
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Sources ---
+# Each item is a dict with "path", "size", "mtime" and either "file" (a path
+# the worker reads itself) or "data" (bytes, for archive members).
+
+def iter_directory(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            stat = os.stat(full)
+            yield {
+                "path": os.path.relpath(full, root),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "file": full,
+            }
+
+
+def iter_tarball(path: str):
+    # Stream mode: members are read in archive order, never all at once
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            yield {
+                "path": member.name,
+                "size": member.size,
+                "mtime": member.mtime,
+                "data": tar.extractfile(member).read(),
+            }
+
+
+def iter_source(path: str):
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if tarfile.is_tarfile(path):
+        return iter_tarball(path)
+    raise ValueError(f"Not a directory or tar archive: {path}")
+
+
+# --- Worker side ---
+
+def verify_bytes(file_bytes: bytes, with_analysis: bool = False) -> dict:
+    """The API pipeline minus network stages."""
+    media_type = detect_file_type(file_bytes)
+    if analyzers.supports(media_type):
+        analysis = analyzers.plan(media_type, network=False).run_sync(file_bytes)
+    else:
+        return {"mediaType": "unknown", "decision": {
+            "status": "NOT_VERIFIED", "confidence": 0.0, "reasons": ["Unsupported file type"]
+        }}
+
+    result = {"mediaType": media_type, "decision": make_decision(media_type, analysis)}
+    if with_analysis:
+        result["analysis"] = analysis
+    return result
+
+
+def process_item(item: dict, with_analysis: bool = False) -> dict:
+    """Runs in a pool worker. Never raises: failures become error records."""
+    started = time.perf_counter()
+    record = {"path": item["path"], "sha256": item["sha256"], "size": item["size"], "mtime": item["mtime"]}
+    try:
+        data = item.get("data")
+        if data is None:
+            with open(item["file"], "rb") as f:
+                data = f.read()
+        record.update(verify_bytes(data, with_analysis))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+# --- Checkpoint / output ---
+
+def load_checkpoint(path: str) -> dict:
+    """path -> last successful record from a previous (possibly interrupted) run."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if "error" not in record:
+                done[record["path"]] = record
+    return done
+
+
+def compact(records_path: str, output: str):
+    """Keep the last record per path and write the final JSONL or Parquet file."""
+    latest = {}
+    with open(records_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            latest[record["path"]] = record
+    records = [latest[p] for p in sorted(latest)]
+
+    if output.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [
+            {**r, "decision": json.dumps(r.get("decision")), "analysis": json.dumps(r.get("analysis"))}
+            for r in records
+        ]
+        pq.write_table(pa.Table.from_pylist(rows), output)
+        return len(records)
+
+    tmp = output + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(tmp, output)
+    return len(records)
+
+
+class Progress:
+    def __init__(self, every_seconds: float = 2.0, stream=None):
+        self.every = every_seconds
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self.last = 0.0
+        self.counts = {"processed": 0, "skipped": 0, "reused": 0, "errors": 0}
+        self.bytes = 0
+
+    def add(self, kind: str, size: int = 0):
+        self.counts[kind] += 1
+        self.bytes += size
+        now = time.monotonic()
+        if now - self.last >= self.every:
+            self.last = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.counts["processed"] / elapsed
+        mb_rate = self.bytes / elapsed / (1024 * 1024)
+        label = "DONE" if final else "PROGRESS"
+        summary = " ".join(f"{k}={v}" for k, v in self.counts.items())
+        print(f"[{label}] {summary} | {rate:.1f} files/s {mb_rate:.1f} MB/s | {elapsed:.0f}s",
+              file=self.stream, flush=True)
+
+
+def run(source: str, output: str, workers: int = None, with_analysis: bool = False,
+        force: bool = False, progress: Progress = None) -> dict:
+    """
+    Re-verify everything under `source`. workers=0 runs inline (no pool).
+    Returns the final progress counts.
+    """
+    fingerprint = rules_fingerprint()
+    records_path = output if output.endswith(".jsonl") else output + ".jsonl"
+    done = {} if force else load_checkpoint(records_path)
+    by_hash = {r["sha256"]: r for r in done.values() if r.get("rules") == fingerprint}
+    progress = progress or Progress()
+    workers = os.cpu_count() if workers is None else workers
+
+    out = open(records_path, "a", encoding="utf-8")
+    if out.tell():
+        with open(records_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")  # terminate a line torn by a crash
+
+    def write(record):
+        record["rules"] = fingerprint
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        if "error" in record:
+            progress.add("errors")
+        else:
+            by_hash[record["sha256"]] = record
+            progress.add("processed", record["size"])
+
+    def pending_items():
+        """Files that need work; skipped and reused files are recorded here."""
+        for item in iter_source(source):
+            previous = done.get(item["path"])
+            # 1. Same size and mtime as the checkpoint: trust its hash
+            if previous and "file" in item and (previous["size"], previous["mtime"]) == (item["size"], item["mtime"]):
+                item["sha256"] = previous["sha256"]
+            elif "data" in item:
+                item["sha256"] = hashlib.sha256(item["data"]).hexdigest()
+            else:
+                item["sha256"] = hash_file(item["file"])
+
+            # 2. Unchanged file, unchanged rules
+            if previous and previous["sha256"] == item["sha256"] and previous.get("rules") == fingerprint:
+                progress.add("skipped")
+                continue
+
+            # 3. Same content seen under another path
+            known = by_hash.get(item["sha256"])
+            if known is not None:
+                reused = {k: v for k, v in known.items() if k not in ("path", "size", "mtime", "elapsed_ms")}
+                reused.update(path=item["path"], size=item["size"], mtime=item["mtime"], reused_from=known["path"])
+                reused["rules"] = fingerprint
+                out.write(json.dumps(reused) + "\n")
+                out.flush()
+                progress.add("reused")
+                continue
+
+            yield item
+
+    try:
+        if workers <= 0:
+            for item in pending_items():
+                write(process_item(item, with_analysis))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Bounded in-flight window so archives are streamed, not loaded whole
+                max_in_flight = workers * 4
+                in_flight = set()
+                for item in pending_items():
+                    if len(in_flight) >= max_in_flight:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            write(future.result())
+                    in_flight.add(pool.submit(process_item, item, with_analysis))
+                for future in wait(in_flight).done:
+                    write(future.result())
+    finally:
+        out.close()
+
+    compact(records_path, output)
+    progress.report(final=True)
+    return dict(progress.counts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-verify a directory or tarball of uploads offline.")
+    parser.add_argument("source", help="directory or .tar / .tar.gz archive")
+    parser.add_argument("--output", "-o", default="reverify.jsonl", help="results file (.jsonl or .parquet)")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="pool size (default: CPU count, 0 = inline)")
+    parser.add_argument("--with-analysis", action="store_true", help="include the raw analysis in each record")
+    parser.add_argument("--force", action="store_true", help="ignore the checkpoint and re-verify everything")
+    args = parser.parse_args(argv)
+    if args.output.endswith(".parquet") and importlib.util.find_spec("pyarrow") is None:
+        parser.error("Parquet output needs pyarrow (pip install pyarrow), or use a .jsonl output")
+
+    counts = run(args.source, args.output, args.workers, args.with_analysis, args.force)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Admission control and load shedding.
+
+Each kind of work (image, pdf, video, scrape, ai) has its own concurrency
+budget and a bounded, priority-ordered wait queue, so a few large videos
+cannot starve cheap certificate-URL checks. When a queue is full, or a
+request has waited longer than the class allows, it is shed immediately
+with 503 and a Retry-After estimate instead of piling up.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+
+from app.core import config
+from app.core.metrics import metrics
+
+PRIORITY_HIGH = 0      # interactive certificate-URL checks
+PRIORITY_NORMAL = 5    # image / pdf uploads, AI calls
+PRIORITY_LOW = 10      # video
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, work_class: str, retry_after: int, reason: str, status_code: int = 503):
+        super().__init__(f"{work_class} work rejected: {reason}")
+        self.work_class = work_class
+        self.retry_after = retry_after
+        self.reason = reason
+        self.status_code = status_code
+
+
+class Ticket:
+    """A granted slot. release() is idempotent."""
+
+    def __init__(self, budget):
+        self._budget = budget
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released or self._budget is None:
+            return
+        self._released = True
+        self._budget.release(time.monotonic() - self._started)
+
+
+class WorkBudget:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait_seconds: float,
+                 default_priority: int = PRIORITY_NORMAL, status_code: int = 503):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.default_priority = default_priority
+        self.status_code = status_code
+        self.active = 0
+        self.shed = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._avg_service = 1.0  # seconds, EWMA
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    def retry_after(self) -> int:
+        backlog = self.queue_depth() + self.active
+        return max(1, math.ceil(self._avg_service * backlog / max(self.max_concurrent, 1)))
+
+    def _reject(self, reason: str):
+        self.shed += 1
+        metrics.increment(f"admission.{self.name}.shed")
+        raise AdmissionRejected(self.name, self.retry_after(), reason, self.status_code)
+
+    async def acquire(self, priority: int = None) -> Ticket:
+        priority = self.default_priority if priority is None else priority
+
+        if self.active < self.max_concurrent and not self.queue_depth():
+            self.active += 1
+            metrics.increment(f"admission.{self.name}.admitted")
+            return Ticket(self)
+
+        if self.queue_depth() >= self.max_queue:
+            self._reject("queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not (future.done() and not future.cancelled()):
+                self._reject("queue wait exceeded")
+        except asyncio.CancelledError:
+            # Slot was handed to us just as we were cancelled: pass it on
+            if future.done() and not future.cancelled():
+                self.release(None)
+            raise
+
+        metrics.observe(f"admission.{self.name}.queue_wait", time.monotonic() - started)
+        metrics.increment(f"admission.{self.name}.admitted")
+        return Ticket(self)
+
+    def release(self, service_seconds: float = None):
+        if service_seconds is not None:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service_seconds
+
+        # Hand the slot straight to the best waiter, if any
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    def __init__(self, limits: dict):
+        self.budgets = {name: WorkBudget(name, **spec) for name, spec in limits.items()}
+
+    async def acquire(self, work_class: str, priority: int = None) -> Ticket:
+        """Unknown classes (e.g. unsupported media) are not limited."""
+        budget = self.budgets.get(work_class)
+        if budget is None:
+            return Ticket(None)
+        return await budget.acquire(priority)
+
+    @asynccontextmanager
+    async def admit(self, work_class: str, priority: int = None):
+        ticket = await self.acquire(work_class, priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "active": b.active,
+                "max_concurrent": b.max_concurrent,
+                "queue_depth": b.queue_depth(),
+                "max_queue": b.max_queue,
+                "shed": b.shed,
+            }
+            for name, b in self.budgets.items()
+        }
+
+
+admission = AdmissionController(config.ADMISSION_LIMITS)
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# --- OCR ---
+# Engine: "auto" (shared pool if OCR_SERVER_ADDRESS is set, else tesserocr if installed,
+# else pytesseract), "tesserocr", "pytesseract" or "remote"
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_PSM = int(os.getenv("OCR_PSM", "3"))
+# Number of persistent in-process Tesseract handles (tesserocr only)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+# OCR for /api/verify images: "full" reads the whole page, "regions" only the
+# detected title/name/ID blocks (faster, but much less text on documents and
+# photos). The certificate path (bot uploads) always reads regions.
+OCR_MODE = os.getenv("OCR_MODE", "full")
+
+# Per-engine overrides, e.g. OCR_TESSEROCR_LANG=eng+deu or OCR_PYTESSERACT_PSM=6
+OCR_ENGINE_OPTIONS = {
+    engine: {
+        "lang": os.getenv(f"OCR_{engine.upper()}_LANG", OCR_LANG),
+        "psm": int(os.getenv(f"OCR_{engine.upper()}_PSM", str(OCR_PSM))),
+    }
+    for engine in ("tesserocr", "pytesseract")
+}
+
+# --- Certificate URL verification ---
+CERT_CACHE_TTL_SECONDS = float(os.getenv("CERT_CACHE_TTL_SECONDS", "3600"))
+CERT_CACHE_MAX_ENTRIES = int(os.getenv("CERT_CACHE_MAX_ENTRIES", "2048"))
+
+# --- Outbound HTTP (static certificate fetch tier) ---
+HTTP_FETCH_TIMEOUT_SECONDS = float(os.getenv("HTTP_FETCH_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+# Upper bound for a Playwright navigation (further capped by the request deadline)
+BROWSER_TIMEOUT_MS = int(os.getenv("BROWSER_TIMEOUT_MS", "30000"))
+
+# --- Outbound scraping scheduler (per host) ---
+SCRAPE_RATE_PER_HOST = float(os.getenv("SCRAPE_RATE_PER_HOST", "1.0"))  # requests / second
+SCRAPE_BURST = float(os.getenv("SCRAPE_BURST", "3"))
+SCRAPE_MAX_IN_FLIGHT_PER_HOST = int(os.getenv("SCRAPE_MAX_IN_FLIGHT_PER_HOST", "2"))
+SCRAPE_BACKOFF_BASE_SECONDS = float(os.getenv("SCRAPE_BACKOFF_BASE_SECONDS", "2"))
+SCRAPE_BACKOFF_MAX_SECONDS = float(os.getenv("SCRAPE_BACKOFF_MAX_SECONDS", "60"))
+
+# --- AI gateway (Gemini) ---
+AI_MODEL = os.getenv("AI_MODEL", "gemini-2.0-flash")
+# Optional lower-cost first pass, e.g. gemini-2.0-flash-lite (must be listed in
+# models.txt). Off by default: when set, it answers every call it can parse.
+AI_FAST_MODEL = os.getenv("AI_FAST_MODEL", "")
+AI_MODELS_FILE = os.getenv(
+    "AI_MODELS_FILE",
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "models.txt")
+)
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "4096"))
+# Concurrent text analyses within this window are sent as one request
+AI_BATCH_WINDOW_MS = float(os.getenv("AI_BATCH_WINDOW_MS", "25"))
+AI_BATCH_MAX = int(os.getenv("AI_BATCH_MAX", "8"))
+
+# --- Request deadlines ---
+# Default budget per request in seconds; 0 (the default) means no limit unless
+# the client sends X-Request-Deadline. Long video analyses need a generous value.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+REQUEST_DEADLINE_MAX_SECONDS = float(os.getenv("REQUEST_DEADLINE_MAX_SECONDS", "300"))
+
+# --- Admission control (per work class) ---
+# ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _MAX_WAIT override the defaults below
+def _admission(name: str, concurrency: int, queue: int, max_wait: float, priority: int) -> dict:
+    prefix = f"ADMISSION_{name.upper()}"
+    return {
+        "max_concurrent": int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        "max_queue": int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+        "max_wait_seconds": float(os.getenv(f"{prefix}_MAX_WAIT", str(max_wait))),
+        "default_priority": priority,
+    }
+
+ADMISSION_LIMITS = {
+    "scrape": _admission("scrape", 8, 32, 10, 0),
+    "image": _admission("image", 4, 16, 15, 5),
+    "pdf": _admission("pdf", 4, 16, 15, 5),
+    "ai": _admission("ai", 4, 16, 20, 5),
+    "video": _admission("video", 1, 2, 30, 10),
+    "audio": _admission("audio", 2, 8, 20, 8),
+}
+
+# --- Decision engine ---
+DECISION_WEIGHTS_PATH = os.getenv(
+    "DECISION_WEIGHTS_PATH",
+    os.path.join(os.path.dirname(__file__), "decision_weights.json")
+)
+
+# --- Image decoding ---
+# Uploads above IMAGE_MAX_PIXELS are rejected before any pixel is decoded.
+# Decoding is planned to fit IMAGE_REQUEST_MEMORY_MB; JPEGs are decoded at a
+# reduced size (draft mode) instead, other formats are rejected.
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(100_000_000)))
+# Optional cap on the decoded longest side (0 = full resolution). QR and OCR
+# read the decoded image, so a cap loses small QR codes on large scans.
+IMAGE_DECODE_MAX_SIDE = int(os.getenv("IMAGE_DECODE_MAX_SIDE", "0"))
+IMAGE_REQUEST_MEMORY_MB = int(os.getenv("IMAGE_REQUEST_MEMORY_MB", "256"))
+
+# --- Profiling (admin only) ---
+# Empty token disables profiling entirely. Send X-Profile: 1 (or ?profile=1)
+# together with X-Admin-Token to profile one request.
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "trustlens-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# --- Multi-worker deployment (set by app/serve.py) ---
+# SQLite file shared by all workers for URL and upload-hash caches; empty = in-process
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+# Connect to one shared Chromium over CDP instead of launching one per scrape
+BROWSER_CDP_URL = os.getenv("BROWSER_CDP_URL", "")
+# Unix socket of the shared OCR pool process; empty = OCR engine per worker
+OCR_SERVER_ADDRESS = os.getenv("OCR_SERVER_ADDRESS", "")
+OCR_SERVER_AUTHKEY = os.getenv("OCR_SERVER_AUTHKEY", "")
+
+# --- PDF handling ---
+# Parsed text layer + first-page thumbnail per upload hash (per worker)
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "128"))
+PDF_CACHE_TTL_SECONDS = float(os.getenv("PDF_CACHE_TTL_SECONDS", "600"))
+PDF_THUMBNAIL_MAX_SIDE = int(os.getenv("PDF_THUMBNAIL_MAX_SIDE", "256"))
+# Pages sent to the model: the best keyword matches, at most this many
+PDF_AI_MAX_PAGES = int(os.getenv("PDF_AI_MAX_PAGES", "2"))
+
+# --- Analyzers ---
+# Process pool size for "heavy" analyzers (video); 0 runs them in threads
+ANALYZER_PROCESS_WORKERS = int(os.getenv("ANALYZER_PROCESS_WORKERS", "0"))
+
+# --- Responses ---
+# Cache lifetime (seconds) of verification results keyed by upload hash
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "3600"))
+# Bodies smaller than this are sent uncompressed
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
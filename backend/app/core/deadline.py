@@ -0,0 +1,178 @@
+"""
+Per-request deadlines and cancellation.
+
+Every HTTP request gets a Deadline (from the X-Request-Deadline header or
+REQUEST_DEADLINE_SECONDS, unlimited by default) stored in a context variable, so it follows the request
+into tasks and asyncio.to_thread workers without changing call signatures.
+Stages wrap their work in `deadline.run(stage, awaitable)`: when the budget
+runs out, or the client disconnects, the stage is cancelled and recorded in
+`cut_stages` so the response can say which parts of the decision are missing.
+
+X-Request-Deadline accepts either a budget in seconds ("15", "2.5") or an
+absolute Unix timestamp (anything above 1e9).
+"""
+import asyncio
+import contextvars
+import time
+
+from app.core import config
+
+DEADLINE_HEADER = b"x-request-deadline"
+MIN_STAGE_SECONDS = 0.001
+
+
+class Deadline:
+    def __init__(self, seconds: float = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.cancelled = False
+        self.reason = None
+        self.cut_stages = []
+        self._done_callbacks = []
+
+    def remaining(self):
+        """Seconds left, or None when unlimited."""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        # Under a millisecond left counts as expired: no stage can use it, and
+        # timeout_ms would round it down to 0 (which libraries read as "no limit")
+        remaining = self.remaining()
+        return self.cancelled or (remaining is not None and remaining < MIN_STAGE_SECONDS)
+
+    def timeout_ms(self, cap_ms: int) -> int:
+        """A stage timeout that never outlives the request; always at least 1 ms."""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap_ms
+        return max(int(min(cap_ms, remaining * 1000)), 1)
+
+    def cancel(self, reason: str = "cancelled"):
+        self.cancelled = True
+        self.reason = reason
+
+    def add_done_callback(self, fn):
+        """Run `fn()` when the request finishes (response sent or client gone)."""
+        self._done_callbacks.append(fn)
+
+    def finish(self):
+        callbacks, self._done_callbacks = self._done_callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[ERROR] Request cleanup failed: {e}")
+
+    def cut(self, stage: str):
+        if stage not in self.cut_stages:
+            self.cut_stages.append(stage)
+
+    async def run(self, stage: str, awaitable, default=None):
+        """Await `awaitable` within the remaining budget; on expiry return `default`."""
+        if self.expired():
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            elif isinstance(awaitable, asyncio.Future):
+                awaitable.cancel()
+            self.cut(stage)
+            return default
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            self.cut(stage)
+            return default
+
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Deadline:
+    """Deadline of the running request; unlimited outside a request."""
+    deadline = _current.get()
+    return deadline if deadline is not None else Deadline(None)
+
+
+def set_deadline(deadline: Deadline):
+    return _current.set(deadline)
+
+
+def reset_deadline(token):
+    _current.reset(token)
+
+
+def parse_deadline_header(value: str):
+    """Header value -> budget in seconds (clamped), or None if invalid."""
+    try:
+        number = float(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if number > 1e9:
+        number = number - time.time()
+    return min(max(number, 0.0), config.REQUEST_DEADLINE_MAX_SECONDS)
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware: attaches a Deadline to each HTTP request and
+    cancels the request's work as soon as the client disconnects.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = config.REQUEST_DEADLINE_SECONDS or None
+        for name, value in scope.get("headers", []):
+            if name == DEADLINE_HEADER:
+                parsed = parse_deadline_header(value.decode("latin-1"))
+                if parsed is not None:
+                    seconds = parsed
+                break
+
+        deadline = Deadline(seconds)
+        token = set_deadline(deadline)
+        disconnected = asyncio.Event()
+        body_done = False
+        watcher = None
+
+        async def watch_disconnect():
+            # Once the body is read, the only message left is http.disconnect
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                deadline.cancel("client disconnected")
+                app_task.cancel()
+
+        async def wrapped_receive():
+            nonlocal body_done, watcher
+            if body_done:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+                deadline.cancel("client disconnected")
+            elif not message.get("more_body", False):
+                body_done = True
+                watcher = asyncio.ensure_future(watch_disconnect())
+            return message
+
+        app_task = asyncio.ensure_future(self.app(scope, wrapped_receive, send))
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+            print(f"[DEBUG] Client disconnected, cancelled {scope.get('path')}")
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            deadline.finish()
+            reset_deadline(token)
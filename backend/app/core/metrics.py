@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class Metrics:
+    """
+    In-process counters and timings.
+    Exposed on /api/metrics; names are dotted, e.g. "fetch.fast_path".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timings = defaultdict(lambda: [0, 0.0])  # name -> [count, total_seconds]
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._timings[name]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {
+                        "count": count,
+                        "avg_ms": round(total / count * 1000, 2) if count else 0.0
+                    }
+                    for name, (count, total) in self._timings.items()
+                }
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+def process_memory() -> dict:
+    """Resident set size of this worker process (current and peak), in MB."""
+    result = {"pid": os.getpid(), "rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        result["rss_mb"] = round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in KB on Linux
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+metrics = Metrics()
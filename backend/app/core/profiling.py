@@ -0,0 +1,251 @@
+"""
+On-demand request profiling (admin only).
+
+Send `X-Profile: 1` (or `?profile=1`) with `X-Admin-Token` to profile one
+request. While a profiled stage runs, a sampling thread records the stack
+of every other thread in the process every PROFILE_INTERVAL_MS, so time
+spent in worker threads (Tesseract, pdfium, OpenCV, Playwright) shows
+up, not just the event loop. Each stage is stored as a folded-stack file
+(flamegraph.pl / speedscope input) plus a small JSON summary, named after
+the request id returned in the X-Profile-Id response header.
+
+When PROFILING_ADMIN_TOKEN is empty the middleware passes requests straight
+through, and `profile_stage` costs one context-variable lookup.
+
+Only one profile is sampled at a time; samples cover the whole process, so
+profiles are most readable on a quiet worker.
+"""
+import contextvars
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+from app.core import config
+from app.core.metrics import metrics
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+# Leaf frames of threads that are idle, not working
+_IDLE_LEAVES = {
+    ("thread.py", "_worker"),      # ThreadPoolExecutor waiting for a job
+    ("selectors.py", "select"),    # event loop waiting for I/O
+}
+_MAX_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> list:
+    """Root-first frame labels, or None for an idle thread."""
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES:
+        return None
+    labels = []
+    while frame is not None and len(labels) < _MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class StackSampler:
+    """Samples the stacks of all other threads at a fixed interval."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if stack:
+                    self.counts[";".join([names.get(ident, str(ident))] + stack)] += 1
+            self.samples += 1
+
+
+class ProfileSession:
+    def __init__(self, request_id: str, path: str):
+        self.request_id = request_id
+        self.path = path
+
+
+_session = contextvars.ContextVar("profile_session", default=None)
+_sampler_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def profile_stage(stage: str):
+    """Profile the enclosed block if the current request asked for it."""
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    if not _sampler_lock.acquire(blocking=False):
+        metrics.increment("profile.busy")
+        yield
+        return
+
+    sampler = StackSampler(config.PROFILE_INTERVAL_MS / 1000)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        _sampler_lock.release()
+        duration = time.perf_counter() - started
+        try:
+            save_profile(session, stage, sampler, duration)
+        except OSError as e:
+            print(f"[ERROR] Could not save profile: {e}")
+
+
+# --- Storage ---
+
+def _paths(profile_id: str):
+    base = os.path.join(config.PROFILE_DIR, profile_id)
+    return base + ".folded", base + ".json"
+
+
+def save_profile(session: ProfileSession, stage: str, sampler: StackSampler, duration: float) -> str:
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    profile_id = f"{session.request_id}-{stage}"
+    folded_path, meta_path = _paths(profile_id)
+
+    with open(folded_path, "w", encoding="utf-8") as f:
+        for stack, count in sampler.counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+    leaves = Counter()
+    for stack, count in sampler.counts.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    meta = {
+        "id": profile_id,
+        "request_id": session.request_id,
+        "stage": stage,
+        "path": session.path,
+        "created": time.time(),
+        "duration_ms": round(duration * 1000, 1),
+        "interval_ms": config.PROFILE_INTERVAL_MS,
+        "samples": sampler.samples,
+        "top_self": [{"frame": frame, "samples": n} for frame, n in leaves.most_common(15)],
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    metrics.increment("profile.saved")
+    _prune()
+    print(f"[DEBUG] Saved profile {profile_id} ({sampler.samples} samples)")
+    return profile_id
+
+
+def _prune():
+    metas = sorted(
+        (os.path.join(config.PROFILE_DIR, name) for name in os.listdir(config.PROFILE_DIR) if name.endswith(".json")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for meta_path in metas[config.PROFILE_KEEP:]:
+        for path in _paths(os.path.basename(meta_path)[:-len(".json")]):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(request_id: str = None) -> list:
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(config.PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(config.PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(config.PROFILE_DIR, name), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if request_id is None or meta.get("request_id") == request_id:
+            profiles.append(meta)
+    return sorted(profiles, key=lambda m: m["created"], reverse=True)
+
+
+def profile_file(profile_id: str):
+    """Path of the folded-stack file, or None if unknown / invalid id."""
+    if not _ID_RE.match(profile_id):
+        return None
+    folded_path, _ = _paths(profile_id)
+    return folded_path if os.path.exists(folded_path) else None
+
+
+def is_admin(token: str) -> bool:
+    expected = config.PROFILING_ADMIN_TOKEN
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware: marks admin requests that asked for a profile and
+    returns the profile id in X-Profile-Id. A no-op while profiling is
+    not configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.PROFILING_ADMIN_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        requested = headers.get(b"x-profile") in (b"1", b"true") or query.get("profile") == ["1"]
+        if not requested:
+            await self.app(scope, receive, send)
+            return
+
+        if not is_admin(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            print(f"[WARNING] Profile requested without a valid admin token: {scope.get('path')}")
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        if not re.match(r"^[A-Za-z0-9_.-]{1,64}$", request_id):
+            request_id = uuid.uuid4().hex[:12]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", request_id.encode())]
+            await send(message)
+
+        token = _session.set(ProfileSession(request_id, scope.get("path", "")))
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _session.reset(token)
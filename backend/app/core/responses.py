@@ -0,0 +1,247 @@
+"""
+Response layer for the verification endpoints.
+
+- JSON is encoded with orjson when it is installed (stdlib json otherwise).
+- `?fields=` trims the payload: `fields=routing.decision,filename` keeps
+  only those paths, `fields=-routing.analysis.metadata` drops one; both
+  forms can be mixed.
+- Complete results carry an ETag and Cache-Control. Uploads are tagged by
+  content hash (plus decision rules and projection), so a client sending
+  If-None-Match for a file it already verified gets a 304 before any work
+  is done. Partial results (deadline cut) are `no-store`.
+- CompressionMiddleware gzips (or brotli-compresses, if `brotli` is
+  installed and accepted) any JSON body over RESPONSE_COMPRESS_MIN_BYTES.
+  Every JSON response (and 304) says `Vary: Accept-Encoding`; when an
+  encoding was negotiated its ETag is weak, since the bytes differ from
+  the identity body with the same tag.
+"""
+import gzip
+import hashlib
+import json
+
+from starlette.responses import JSONResponse, Response
+
+from app.core import config
+from app.core.metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NO_STORE = "no-store"
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# --- fields= projection ---
+
+def _pick(obj, paths: list):
+    if not isinstance(obj, dict):
+        return obj
+    grouped = {}
+    for path in paths:
+        grouped.setdefault(path[0], []).append(path[1:])
+    picked = {}
+    for key, rests in grouped.items():
+        if key in obj:
+            picked[key] = obj[key] if any(not rest for rest in rests) else _pick(obj[key], rests)
+    return picked
+
+
+def _drop(obj, path: list):
+    # Copies along the path only: payloads may be shared with in-memory caches
+    if not isinstance(obj, dict) or path[0] not in obj:
+        return obj
+    if len(path) == 1:
+        return {k: v for k, v in obj.items() if k != path[0]}
+    return {**obj, path[0]: _drop(obj[path[0]], path[1:])}
+
+
+def project(payload, fields: str):
+    """Apply a `fields=` spec (comma separated dotted paths, `-` to exclude)."""
+    if not fields or not isinstance(payload, dict):
+        return payload
+    specs = [f.strip() for f in fields.split(",") if f.strip()]
+    include = [f.split(".") for f in specs if not f.startswith("-")]
+    if include:
+        payload = _pick(payload, include)
+    for spec in specs:
+        if spec.startswith("-") and len(spec) > 1:
+            payload = _drop(payload, spec[1:].split("."))
+    return payload
+
+
+# --- ETags ---
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def request_etag(request, *parts) -> str:
+    """ETag for a request's result: `parts` plus the fields= projection."""
+    return make_etag(*parts, request.query_params.get("fields", ""))
+
+
+def _matches(request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    # Weak comparison, as for GET (RFC 9110 13.1.2). No "*": on these POST
+    # endpoints a failed wildcard condition would be a 412, never a 304
+    return etag in tags or f"W/{etag}" in tags
+
+
+def not_modified(request, etag: str, max_age: int = None):
+    """A 304 response if the client already holds `etag`, else None."""
+    if not _matches(request, etag):
+        return None
+    metrics.increment("response.not_modified")
+    return Response(status_code=304, headers=_cache_headers(etag, max_age))
+
+
+def _cache_headers(etag: str, max_age: int = None) -> dict:
+    max_age = config.RESPONSE_CACHE_MAX_AGE if max_age is None else max_age
+    return {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+
+
+def json_response(request, payload, etag: str = None, max_age: int = None, cacheable: bool = True):
+    """
+    Projected, fast-encoded JSON with cache headers. Without `etag` the tag
+    is the hash of the body. `cacheable=False` (partial or failed results)
+    sends `no-store` and no tag.
+    """
+    body = dumps(project(payload, request.query_params.get("fields")))
+    if not cacheable:
+        return Response(body, media_type="application/json", headers={"Cache-Control": NO_STORE})
+
+    etag = etag or make_etag(body)
+    cached = not_modified(request, etag, max_age)
+    if cached is not None:
+        return cached
+    return Response(body, media_type="application/json", headers=_cache_headers(etag, max_age))
+
+
+# --- Compression ---
+
+def _choose_encoding(accept: str):
+    accepted = {}
+    for item in accept.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _negotiated(headers: list, encoding) -> list:
+    """Add Vary: Accept-Encoding and, if an encoding was chosen, weaken the ETag."""
+    out = []
+    vary = None
+    for key, value in headers:
+        if key == b"vary":
+            vary = value
+            continue
+        if key == b"etag" and encoding is not None and not value.startswith(b"W/"):
+            value = b"W/" + value
+        out.append((key, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower():
+        vary += b", Accept-Encoding"
+    out.append((b"vary", vary))
+    return out
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware: compresses complete JSON bodies above the size
+    threshold and marks every JSON response as negotiated. Streamed
+    responses (SSE) and already-encoded bodies pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = dict(scope.get("headers", [])).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = _choose_encoding(accept) if accept else None
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 304:
+                    message = {**message, "headers": _negotiated(message.get("headers", []), encoding)}
+                elif content_type.startswith(b"application/json") and b"content-encoding" not in headers:
+                    message = {**message, "headers": _negotiated(message.get("headers", []), encoding)}
+                    if encoding is not None:
+                        start = message  # held until the body is known
+                        return
+                await send(message)
+                return
+
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < config.RESPONSE_COMPRESS_MIN_BYTES:
+                await send(held)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            metrics.increment(f"response.{encoding}")
+            headers = [(k, v) for k, v in held.get("headers", []) if k != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ]
+            await send({**held, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,16 +1,65 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.api.verify import router as verify_router
 from app.api.bot import router as bot_router
+from app.api.profiles import router as profiles_router
+from app.core.admission import admission, AdmissionRejected
+from app.core.deadline import DeadlineMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.responses import CompressionMiddleware, FastJSONResponse
+from app.core.metrics import metrics, process_memory
+from app.services.image_decode import ImageRejected
+from app.services.scrape_scheduler import scheduler
+from app.services import analyzers, cert_fetcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: release pooled connections and the heavy-analyzer processes
+    await cert_fetcher.close_http_client()
+    await asyncio.to_thread(analyzers.shutdown_process_pool)
+
 
 app = FastAPI(
     title="TrustLens Backend",
     description="Image & Video Authenticity Verification API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(verify_router, prefix="/api")
 app.include_router(bot_router, prefix="/api")
+app.include_router(profiles_router, prefix="/api")
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": f"Server busy ({exc.work_class}): {exc.reason}. Retry later."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(ImageRejected)
+async def image_rejected_handler(request: Request, exc: ImageRejected):
+    return JSONResponse(status_code=exc.status_code, content={"detail": f"Image rejected: {exc.reason}"})
 
 @app.get("/")
 def health_check():
     return {"status": "Backend is running"}
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot["scrape_queue_depth"] = scheduler.queue_depth()
+    snapshot["admission"] = admission.snapshot()
+    snapshot["worker"] = process_memory()
+    return snapshot
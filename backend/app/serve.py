@@ -0,0 +1,258 @@
+"""
+Production launcher: pre-forked uvicorn workers that share warm state.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+1. Shared-state settings (SQLite cache file, OCR pool socket, shared
+   Chromium endpoint) are exported before any app module reads config.
+2. One OCR pool process and one headless Chromium are started; workers
+   reach them over a Unix socket and CDP instead of loading their own.
+   The pool needs tesserocr: with only the pytesseract CLI it would fork
+   per call anyway, so workers then run OCR themselves.
+3. cv2, numpy, Pillow, pypdfium2, google-genai and the app itself (with
+   its Gemini client) are imported once in the master, then gc.freeze()
+   keeps them out of later collections so forked workers share those pages
+   copy-on-write.
+4. The master binds the socket, forks the workers and restarts any that
+   die, and the OCR pool and Chromium too (workers fall back to local OCR
+   while the pool is down). SIGTERM / SIGINT stop everything.
+
+App modules are imported inside functions on purpose: config is read once,
+at first import, and must see the settings from step 1.
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PRELOAD_MODULES = ["numpy", "cv2", "PIL.Image", "pypdfium2", "exifread", "google.genai", "app.main"]
+
+
+def preload():
+    """Import heavy modules in the master so workers inherit them."""
+
+    started = time.monotonic()
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    # Objects created so far are never collected again: no refcount/GC writes
+    # to shared pages after fork
+    gc.collect()
+    gc.freeze()
+    print(f"[DEBUG] Preloaded {len(PRELOAD_MODULES)} modules in {time.monotonic() - started:.1f}s")
+
+
+def start_shared_browser(port: int, profile_dir: str):
+    """Launch one headless Chromium with a CDP endpoint. Returns (process, url) or (None, "")."""
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            executable = p.chromium.executable_path
+    except Exception as e:
+        print(f"[WARNING] Playwright unavailable, workers will launch their own browser: {e}")
+        return None, ""
+    if not os.path.exists(executable):
+        print("[WARNING] Chromium not installed (playwright install chromium), shared browser disabled")
+        return None, ""
+
+    process = subprocess.Popen([
+        executable, "--headless=new", "--disable-gpu", "--no-first-run", "--no-default-browser-check",
+        f"--remote-debugging-port={port}", "--remote-debugging-address=127.0.0.1",
+        f"--user-data-dir={profile_dir}",
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/json/version", timeout=1).close()
+            return process, url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    print("[WARNING] Shared browser did not start, workers will launch their own")
+    process.kill()
+    return None, ""
+
+
+class Helper:
+    """A shared helper process (OCR pool, Chromium) that the supervisor restarts if it dies."""
+
+    def __init__(self, name: str, start):
+        self.name = name
+        self._start = start  # () -> process with .pid / .terminate(), or None on failure
+        self.process = None
+
+    def start(self):
+        self.process = self._start()
+        return self.process
+
+    def terminate(self):
+        if self.process is not None:
+            try:
+                self.process.terminate()
+            except (ProcessLookupError, OSError):
+                pass
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str):
+    import uvicorn
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    RESTART_DELAY = 1.0
+
+    def __init__(self, sock: socket.socket, workers: int, log_level: str, helpers: list = ()):
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children = set()
+        # pid -> Helper; os.wait() reaps these too, so they are tracked by pid
+        self.helpers = {}
+        for helper in helpers:
+            if helper.process is not None:
+                self.helpers[helper.process.pid] = helper
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.sock, self.log_level)
+            except BaseException as e:
+                print(f"[ERROR] Worker {os.getpid()} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children.add(pid)
+        print(f"[DEBUG] Started worker {pid}")
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid in self.helpers:
+                self.restart_helper(self.helpers.pop(pid), pid, status)
+                continue
+            if pid not in self.children:
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                print(f"[WARNING] Worker {pid} exited ({status}), restarting")
+                time.sleep(self.RESTART_DELAY)
+                self.spawn()
+
+    def restart_helper(self, helper: Helper, pid: int, status: int):
+        if self.stopping:
+            return
+        print(f"[WARNING] {helper.name} {pid} exited ({status}), restarting")
+        time.sleep(self.RESTART_DELAY)
+        try:
+            process = helper.start()
+        except Exception as e:
+            process = None
+            print(f"[ERROR] Restarting {helper.name}: {e}")
+        if process is None:
+            print(f"[ERROR] {helper.name} is down; workers continue without it")
+            return
+        self.helpers[process.pid] = helper
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers sharing caches and pools.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--browser-port", type=int, default=9222, help="CDP port of the shared Chromium")
+    parser.add_argument("--no-browser", action="store_true", help="do not start a shared Chromium")
+    parser.add_argument("--no-ocr-pool", action="store_true", help="each worker runs its own OCR engine")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    runtime_dir = tempfile.mkdtemp(prefix="trustlens-")
+    helpers = []
+    try:
+        # 1. Shared state, exported before config is imported
+        os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(runtime_dir, "cache.sqlite3"))
+        if not args.no_ocr_pool and importlib.util.find_spec("tesserocr") is None:
+            print("[WARNING] tesserocr not installed, OCR pool disabled (workers fork tesseract per call)")
+            args.no_ocr_pool = True
+        if not args.no_ocr_pool:
+            os.environ.setdefault("OCR_SERVER_ADDRESS", os.path.join(runtime_dir, "ocr.sock"))
+            os.environ.setdefault("OCR_SERVER_AUTHKEY", secrets.token_hex(16))
+        if not args.no_browser and not os.getenv("BROWSER_CDP_URL"):
+            profile_dir = os.path.join(runtime_dir, "chromium")
+            # Same port on restart, so the CDP URL workers hold stays valid
+            browser = Helper("shared browser",
+                             lambda: start_shared_browser(args.browser_port, profile_dir)[0])
+            if browser.start() is not None:
+                helpers.append(browser)
+                os.environ["BROWSER_CDP_URL"] = f"http://127.0.0.1:{args.browser_port}"
+
+        # 2. Shared OCR pool (forked before the heavy imports, it loads its own engine)
+        from app.core import config
+
+        if config.OCR_SERVER_ADDRESS and not args.no_ocr_pool:
+            from app.services.ocr_pool import start_ocr_pool
+
+            pool = Helper("OCR pool", lambda: start_ocr_pool(config.OCR_SERVER_ADDRESS,
+                                                             config.OCR_SERVER_AUTHKEY.encode()))
+            pool.start()
+            helpers.append(pool)
+
+        # 3. Preload, then 4. fork and supervise
+        preload()
+        sock = bind_socket(args.host, args.port)
+        print(f"[DEBUG] Serving on {args.host}:{args.port} with {args.workers} workers "
+              f"(cache={config.SHARED_CACHE_PATH}, ocr={config.OCR_SERVER_ADDRESS or 'per-worker'}, "
+              f"browser={config.BROWSER_CDP_URL or 'per-scrape'})")
+        Supervisor(sock, args.workers, args.log_level, helpers).run()
+    finally:
+        for helper in helpers:
+            helper.terminate()
+        shutil.rmtree(runtime_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+AI gateway in front of the Gemini client.
+
+- Response cache keyed by (model, prompt template version, content hash),
+  so re-submitting the same certificate text or file costs nothing.
+- Micro-batching: concurrent text-only certificate analyses arriving within
+  a short window are sent as ONE generate_content request.
+- Tiered models: an opt-in lower-cost model (AI_FAST_MODEL) answers first;
+  the main model is only called when the fast answer is unusable.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+from google.genai import types
+
+from app.core import config
+from app.core.admission import admission
+from app.core.metrics import metrics
+from app.utils.cache import TTLCache, make_cache
+
+# Bump a version whenever its template text changes, so old cache entries miss
+PROMPTS = {
+    "certificate_text": {
+        "version": 1,
+        "template": """
+            You are a privacy-first assistant.
+            Analyze this certificate text from {platform}.
+
+            TEXT CONTEXT:
+            {text}
+
+            TASK:
+            - Provide observations on consistency and typical phrasing.
+            - Do NOT provide a verdict.
+
+            OUTPUT: JSON with 'observations' list.
+            """
+    },
+    "certificate_text_batch": {
+        "version": 1,
+        "template": """
+            You are a privacy-first assistant.
+            Analyze each of the {count} certificate texts below independently.
+
+            {items}
+
+            TASK:
+            - For each item, provide observations on consistency and typical phrasing.
+            - Do NOT provide a verdict.
+
+            OUTPUT: a JSON array with exactly {count} objects, in item order,
+            each with an 'observations' list.
+            """
+    },
+    "certificate_file": {
+        "version": 1,
+        "template": """
+            You are a privacy-first assistant for certificate analysis.
+
+            ROLE:
+            - Provide OBSERVATIONS ONLY.
+            - Do NOT declare "Real" or "Fake".
+            - Do NOT give scores.
+
+            TASK:
+            - Check for visual consistency with Udemy/Coursera.
+            - Note any formatting anomalies.
+
+            OUTPUT format: JSON with keys 'observations' (list) and 'concerns' (list).
+            """
+    },
+}
+
+
+def load_available_models(path: str = None) -> set:
+    """Model ids listed in models.txt (without the 'models/' prefix)."""
+    path = path or config.AI_MODELS_FILE
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return {line.strip().replace("models/", "") for line in f if line.strip()}
+
+
+def parse_model_json(text: str):
+    """Strip markdown fences and parse; falls back to raw notes."""
+    try:
+        clean = text.replace("```json", "").replace("```", "").strip()
+        return json.loads(clean)
+    except (ValueError, AttributeError):
+        return {"raw_notes": text}
+
+
+def _is_usable(result) -> bool:
+    # A file answer may carry only concerns; either list means the model answered
+    return isinstance(result, dict) and bool(result.get("observations") or result.get("concerns"))
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class AIGateway:
+    def __init__(self, client, model: str = None, fast_model: str = None, cache: TTLCache = None):
+        self.client = client
+        self.model = model or config.AI_MODEL
+        self.fast_model = config.AI_FAST_MODEL if fast_model is None else fast_model
+
+        available = load_available_models()
+        if self.fast_model and available and self.fast_model not in available:
+            print(f"[WARNING] AI fast model '{self.fast_model}' not in models.txt, fast pass disabled")
+            self.fast_model = ""
+
+        # Keyed by content hash, so identical uploads hit across workers too
+        self.cache = cache if cache is not None else make_cache("ai", config.AI_CACHE_MAX_ENTRIES, config.AI_CACHE_TTL_SECONDS)
+        self._batch = []
+        self._batch_timer = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Models and prompt versions: anything that changes the answers."""
+        prompts = ",".join(f"{name}:v{p['version']}" for name, p in sorted(PROMPTS.items()))
+        return f"{self.fast_model}|{self.model}|{prompts}"
+
+    # --- Low level ---
+
+    def _cache_key(self, model: str, prompt_name: str, digest: str) -> str:
+        return f"{model}:{prompt_name}:v{PROMPTS[prompt_name]['version']}:{digest}"
+
+    async def _generate(self, model: str, contents) -> str:
+        metrics.increment(f"ai.requests.{model}")
+        async with admission.admit("ai"):
+            response = await asyncio.to_thread(
+                self.client.models.generate_content, model=model, contents=contents
+            )
+        return response.text
+
+    async def _tiered(self, prompt_name: str, digest: str, contents) -> dict:
+        """Cached call; tries the fast model first when configured."""
+        models = [m for m in (self.fast_model, self.model) if m]
+        result = None
+        for model in models:
+            key = self._cache_key(model, prompt_name, digest)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.increment("ai.cache_hit")
+                result = cached
+            else:
+                result = parse_model_json(await self._generate(model, contents))
+                if _is_usable(result):
+                    self.cache.set(key, result)
+            if _is_usable(result):
+                return result
+            if model != models[-1]:
+                metrics.increment("ai.escalated")
+        return result
+
+    # --- File analysis (image / pdf) ---
+
+    async def analyze_certificate_file(self, file_bytes: bytes, mime: str, digest: str = None) -> dict:
+        """`digest` overrides the cache key, e.g. for page subsets whose bytes are not reproducible."""
+        prompt = PROMPTS["certificate_file"]["template"]
+        part = types.Part.from_bytes(data=file_bytes, mime_type=mime)
+        return await self._tiered("certificate_file", digest or content_hash(file_bytes), [prompt, part])
+
+    # --- Text analysis (micro-batched) ---
+
+    async def analyze_certificate_text(self, platform: str, text: str) -> dict:
+        digest = content_hash(f"{platform}\n{text}")
+        for model in (self.fast_model, self.model):
+            cached = self.cache.get(self._cache_key(model, "certificate_text", digest)) if model else None
+            if _is_usable(cached):
+                metrics.increment("ai.cache_hit")
+                return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((platform, text, digest, future))
+
+        if len(self._batch) >= config.AI_BATCH_MAX:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(config.AI_BATCH_WINDOW_MS / 1000, self._flush_batch)
+        return await future
+
+    def _flush_batch(self):
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    async def _run_single_text(self, platform: str, text: str, digest: str) -> dict:
+        prompt = PROMPTS["certificate_text"]["template"].format(platform=platform, text=text)
+        return await self._tiered("certificate_text", digest, prompt)
+
+    async def _run_batch(self, batch: list):
+        try:
+            if len(batch) == 1:
+                platform, text, digest, future = batch[0]
+                results = [await self._run_single_text(platform, text, digest)]
+            else:
+                results = await self._run_combined(batch)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (*_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_combined(self, batch: list) -> list:
+        """One request for the whole batch; unusable items fall back to single calls."""
+        metrics.increment("ai.batched_requests")
+        metrics.increment("ai.batched_items", len(batch))
+        items = "\n\n".join(
+            f"### ITEM {i + 1} ({platform})\n{text}" for i, (platform, text, _, _) in enumerate(batch)
+        )
+        prompt = PROMPTS["certificate_text_batch"]["template"].format(count=len(batch), items=items)
+        model = self.fast_model or self.model
+        parsed = parse_model_json(await self._generate(model, prompt))
+
+        if not isinstance(parsed, list) or len(parsed) != len(batch):
+            parsed = [None] * len(batch)
+
+        results = list(parsed)
+        retry = []
+        for i, ((platform, text, digest, _), result) in enumerate(zip(batch, parsed)):
+            if _is_usable(result):
+                self.cache.set(self._cache_key(model, "certificate_text", digest), result)
+            else:
+                retry.append(i)
+
+        if retry:
+            metrics.increment("ai.batch_fallbacks", len(retry))
+            singles = await asyncio.gather(*(self._run_single_text(*batch[i][:3]) for i in retry))
+            for i, result in zip(retry, singles):
+                results[i] = result
+        return results
@@ -0,0 +1,240 @@
+"""
+Analyzer registry.
+
+Each analyzer declares which media types it handles, which inputs it needs
+and how expensive it is; the function itself is named as "module:function"
+and looked up when it runs, so the registry imports none of them. In the
+API process that only defers video_service and audio_service: the router
+imports bot_service, which already loads image_service (and with it
+OpenCV, Tesseract and pdfium) at startup. The offline CLI, which never
+imports the router, loads each module on first use. For one upload the media router
+asks for a Plan: analyzers whose inputs are all available start at once and
+run concurrently, the rest start as soon as what they need has been
+produced (e.g. OCR and QR wait for the decoded image, EXIF does not).
+
+Inputs are the names other analyzers `provide`; "bytes" is the upload.
+Cost picks where an analyzer runs:
+    io     coroutine on the event loop (network lookups)
+    cpu    thread pool (OpenCV / Tesseract / pdfium release the GIL)
+    heavy  process pool when ANALYZER_PROCESS_WORKERS > 0, else thread pool
+
+A heavy job that the request deadline cuts is only dropped if it has not
+started yet: one already running in a pool process runs to completion and
+keeps that worker busy, so size ANALYZER_PROCESS_WORKERS for the jobs that
+outlive their requests too. Threads behave the same way.
+
+Adding an analyzer is one register() call below (or in the module that
+defines it, as long as that module is imported); the router needs no change.
+"""
+import asyncio
+import copy
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core import config
+
+COSTS = ("io", "cpu", "heavy")
+
+
+class Analyzer:
+    def __init__(self, name: str, target: str, media_types: tuple, requires: tuple = ("bytes",),
+                 provides: str = None, cost: str = "cpu", defaults: dict = None,
+                 report: bool = True, network: bool = False):
+        if cost not in COSTS:
+            raise ValueError(f"Unknown analyzer cost {cost!r} for {name}")
+        self.name = name
+        self.target = target
+        self.media_types = tuple(media_types)
+        self.requires = tuple(requires)
+        self.provides = provides or name
+        self.cost = cost
+        # Analysis fields this analyzer fills in, present even if it never runs
+        self.defaults = defaults or {}
+        # False for intermediate values (e.g. the decoded image): not merged, not streamed
+        self.report = report
+        # Needs the network; skipped by offline runs (bulk re-verification)
+        self.network = network
+
+    def resolve(self):
+        return _resolve(self.target)
+
+
+def _resolve(target: str):
+    # Looked up on every call so a monkeypatched function is honoured
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _call_target(target: str, *args):
+    """Process-pool entry point: the worker imports the analyzer itself."""
+    return _resolve(target)(*args)
+
+
+_registry = {}
+_process_pool = None
+
+
+def _check_acyclic(group: list):
+    """Raise ValueError if analyzers in `group` (one media type) wait on each other."""
+    # Inputs nobody provides are not a cycle: Plan drops those analyzers
+    provided = {a.provides for a in group}
+    produced = {"bytes"}
+    pending = list(group)
+    while pending:
+        ready = [a for a in pending if (set(a.requires) & provided) <= produced]
+        if not ready:
+            raise ValueError(f"Analyzer dependency cycle: {', '.join(a.name for a in pending)}")
+        produced |= {a.provides for a in ready}
+        pending = [a for a in pending if a not in ready]
+
+
+def register(analyzer: Analyzer) -> Analyzer:
+    """Add (or replace) an analyzer; rejected if it closes a dependency cycle."""
+    others = [a for a in _registry.values() if a.name != analyzer.name]
+    for media_type in analyzer.media_types:
+        _check_acyclic([a for a in others if media_type in a.media_types] + [analyzer])
+    _registry[analyzer.name] = analyzer
+    return analyzer
+
+
+def get(name: str) -> Analyzer:
+    return _registry[name]
+
+
+def media_types() -> set:
+    return {media_type for analyzer in _registry.values() for media_type in analyzer.media_types}
+
+
+def supports(media_type: str) -> bool:
+    return any(media_type in analyzer.media_types for analyzer in _registry.values())
+
+
+def process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=config.ANALYZER_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Drop queued heavy jobs and wait for running ones (app shutdown)."""
+    global _process_pool
+    pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class Plan:
+    """Dependency graph of the analyzers for one upload, consumed as they finish."""
+
+    def __init__(self, media_type: str, network: bool = True):
+        self.media_type = media_type
+        registered = [a for a in _registry.values() if media_type in a.media_types]
+        self.defaults = {}
+        for analyzer in registered:
+            self.defaults.update(analyzer.defaults)
+
+        candidates = [a for a in registered if network or not a.network]
+        # Drop analyzers whose inputs nobody produces, repeatedly (a chain may hang off one)
+        available = {"bytes"} | {a.provides for a in candidates}
+        while True:
+            runnable = [a for a in candidates if set(a.requires) <= available]
+            if len(runnable) == len(candidates):
+                break
+            candidates = runnable
+            available = {"bytes"} | {a.provides for a in candidates}
+        # Acyclic: register() refuses cycles
+        self.waiting = candidates
+        self.outputs = {}
+
+    def empty_analysis(self) -> dict:
+        return copy.deepcopy(self.defaults)
+
+    def reports(self, name: str) -> bool:
+        return _registry[name].report
+
+    def take_ready(self) -> list:
+        """Analyzers whose inputs are now available, cheapest first; removed from the plan."""
+        available = {"bytes"} | set(self.outputs)
+        ready = [a for a in self.waiting if set(a.requires) <= available]
+        self.waiting = [a for a in self.waiting if a not in ready]
+        return sorted(ready, key=lambda a: COSTS.index(a.cost))
+
+    def record(self, name: str, result):
+        """Store an analyzer's output; None means it produced nothing for its dependents."""
+        if result is not None:
+            self.outputs[_registry[name].provides] = result
+
+    def _args(self, analyzer: Analyzer, file_bytes: bytes) -> list:
+        return [file_bytes if name == "bytes" else self.outputs[name] for name in analyzer.requires]
+
+    def jobs(self, file_bytes: bytes) -> dict:
+        """name -> coroutine for every analyzer that can start now."""
+        return {a.name: self._invoke(a, self._args(a, file_bytes)) for a in self.take_ready()}
+
+    async def _invoke(self, analyzer: Analyzer, args: list):
+        if analyzer.cost == "io":
+            return await analyzer.resolve()(*args)
+        if analyzer.cost == "heavy" and config.ANALYZER_PROCESS_WORKERS > 0:
+            # Cancelling this await does not stop a job the worker already picked up
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(process_pool(), _call_target, analyzer.target, *args)
+        return await asyncio.to_thread(analyzer.resolve(), *args)
+
+    def run_sync(self, file_bytes: bytes) -> dict:
+        """All analyzers one after another in the calling thread (CLI / pool workers)."""
+        analysis = self.empty_analysis()
+        ready = self.take_ready()
+        while ready:
+            for analyzer in ready:
+                fn = analyzer.resolve()
+                args = self._args(analyzer, file_bytes)
+                result = asyncio.run(fn(*args)) if analyzer.cost == "io" else fn(*args)
+                self.record(analyzer.name, result)
+                if analyzer.report and result is not None:
+                    analysis.update(result)
+            ready = self.take_ready()
+        return analysis
+
+
+def plan(media_type: str, network: bool = True) -> Plan:
+    return Plan(media_type, network=network)
+
+
+# --- Built-in analyzers ---
+
+register(Analyzer(
+    "decode", "app.services.image_service:load_image", ("image",),
+    provides="gray", report=False
+))
+register(Analyzer(
+    "exif", "app.services.image_service:run_exif", ("image",),
+    defaults={"metadata": {}}
+))
+register(Analyzer(
+    "qr", "app.services.image_service:run_qr", ("image",), requires=("gray",),
+    defaults={"qr_detected": False, "qr_payloads": []}
+))
+register(Analyzer(
+    "ocr", "app.services.image_service:run_ocr", ("image",), requires=("gray",),
+    defaults={"ocr_text": None}
+))
+# PDFs have no QR pass (the analyzer is dropped from their plan) but keep the field
+register(Analyzer(
+    "qr_certificates", "app.services.media_router:qr_certificates_stage", ("image", "pdf"),
+    requires=("qr",), cost="io", network=True, defaults={"qr_certificates": []}
+))
+register(Analyzer(
+    "pdf_text", "app.services.image_service:run_pdf_text", ("pdf",),
+    defaults={"ocr_text": None, "qr_detected": False, "qr_payloads": [], "metadata": {}}
+))
+register(Analyzer(
+    "video", "app.services.video_service:process_video", ("video",), cost="heavy"
+))
+register(Analyzer(
+    "audio", "app.services.audio_service:process_audio", ("audio",), cost="heavy"
+))
@@ -0,0 +1,462 @@
+"""
+Audio analysis: streaming decode and vectorised features.
+
+Audio is decoded chunk by chunk (WAV with the standard library, other
+formats through ffmpeg when it is installed) and mixed down to mono float32.
+Each chunk is cut into fixed frames that are analysed in one NumPy pass.
+Only running sums and one number per 5-second segment are kept, so memory
+stays flat however long the recording is.
+
+Features:
+- spectral flatness (mean / std over non-silent frames)
+- silence ratio and digital-silence gaps: runs of exact zeros between
+  sounds, which a real microphone never produces
+- splices: single-sample jumps far above the surrounding slope, with no
+  other jump that size nearby (square waves and clipped music jump on
+  every edge; an edit jumps once)
+- sample-rate consistency: effective bandwidth against the declared rate
+  (telephone audio resampled to a studio rate) and bandwidth jumps between
+  segments (material from different sources)
+- codec consistency: container vs stream codec, declared vs decoded length,
+  and a lossy-encoder lowpass inside a lossless container
+"""
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import wave
+
+import filetype
+import numpy as np
+
+FRAME_SIZE = 2048
+# Frames decoded and analysed per step (~3 s at 44.1 kHz)
+CHUNK_FRAMES = 64
+SEGMENT_SECONDS = 5.0
+
+SILENCE_RMS = 10 ** (-60 / 20)
+DIGITAL_SILENCE_SECONDS = 0.01
+# A splice jumps at least this much (full scale = 1.0) and this many times the local mean slope
+SPLICE_MIN_JUMP = 0.25
+SPLICE_SLOPE_RATIO = 10
+# ...and no other jump above SPLICE_MIN_JUMP within this many seconds either side
+SPLICE_ISOLATION_SECONDS = 0.1
+# Bandwidth = highest frequency within this many dB of the spectral peak
+BANDWIDTH_FLOOR_DB = 60
+MIN_BANDWIDTH_FRACTION = 0.25
+BANDWIDTH_JUMP_RATIO = 0.5
+LOSSY_DROP_DB = 30
+LENGTH_TOLERANCE = 0.02
+MAX_REPORTED_EVENTS = 20
+
+CONTAINERS = {
+    "audio/x-wav": "wav",
+    "audio/mpeg": "mp3",
+    "audio/mp4": "m4a",
+    "audio/ogg": "ogg",
+    "audio/x-flac": "flac",
+    "audio/aac": "aac",
+    "audio/amr": "amr",
+    "audio/x-aiff": "aiff",
+}
+# "pcm" matches every pcm_* sample format
+EXPECTED_CODECS = {
+    "wav": {"pcm"},
+    "aiff": {"pcm"},
+    "mp3": {"mp3"},
+    "m4a": {"aac", "alac"},
+    "ogg": {"vorbis", "opus", "flac", "speex"},
+    "flac": {"flac"},
+    "aac": {"aac"},
+    "amr": {"amr_nb", "amr_wb"},
+}
+LOSSLESS_CODECS = {"pcm", "flac", "alac"}
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def _codec_family(codec: str) -> str:
+    return "pcm" if codec.startswith("pcm_") else codec
+
+
+# --- Decoders: (info, iterator of mono float32 chunks) ---
+
+def _pcm_to_mono(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    # A truncated data chunk can end mid-frame
+    raw = raw[:len(raw) - len(raw) % (sample_width * channels)]
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        value = np.where(value & 0x800000, value - 0x1000000, value)
+        samples = value.astype(np.float32) / 8388608
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise AudioDecodeError(f"Unsupported sample width {sample_width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return samples
+
+
+def _wav_stream(source):
+    try:
+        reader = wave.open(source)
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(str(e))
+    width, channels, rate = reader.getsampwidth(), reader.getnchannels(), reader.getframerate()
+    info = {
+        "container": "wav",
+        "codec": "pcm_u8" if width == 1 else f"pcm_s{8 * width}le",
+        "sample_rate": rate,
+        "channels": channels,
+        "declared_frames": reader.getnframes(),
+    }
+
+    def chunks():
+        try:
+            while True:
+                raw = reader.readframes(CHUNK_FRAMES * FRAME_SIZE)
+                if not raw:
+                    break
+                yield _pcm_to_mono(raw, width, channels)
+        finally:
+            reader.close()
+
+    return info, chunks()
+
+
+def _ffmpeg_stream(path: str, container: str):
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        raise AudioDecodeError(f"{container} needs ffmpeg, which is not installed")
+
+    probe = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=codec_name,sample_rate,channels:format=duration", "-of", "json", path],
+        capture_output=True, timeout=30
+    )
+    streams = json.loads(probe.stdout or b"{}").get("streams") or []
+    if probe.returncode != 0 or not streams:
+        raise AudioDecodeError("No audio stream found")
+    stream = streams[0]
+    rate = int(stream.get("sample_rate") or 0)
+    if not rate:
+        raise AudioDecodeError("Unknown sample rate")
+    duration = float(json.loads(probe.stdout).get("format", {}).get("duration") or 0)
+    info = {
+        "container": container,
+        "codec": stream.get("codec_name", "unknown"),
+        "sample_rate": rate,
+        "channels": int(stream.get("channels") or 1),
+        "declared_frames": round(duration * rate) if duration else None,
+    }
+
+    def chunks():
+        # Native rate, mono, float32 on stdout; read a chunk at a time
+        process = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-i", path, "-map", "0:a:0", "-ac", "1", "-f", "f32le", "pipe:1"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        step = CHUNK_FRAMES * FRAME_SIZE * 4
+        leftover = b""
+        try:
+            while True:
+                raw = process.stdout.read(step)
+                if not raw:
+                    break
+                raw = leftover + raw
+                usable = len(raw) - len(raw) % 4
+                leftover = raw[usable:]
+                if usable:
+                    yield np.frombuffer(raw[:usable], dtype="<f4")
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+
+    return info, chunks()
+
+
+# --- Features ---
+
+class AudioFeatures:
+    """Streaming feature accumulator; feed() mono float32 chunks, then result()."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.window = np.hanning(FRAME_SIZE).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(FRAME_SIZE, 1.0 / sample_rate)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.frames = 0
+        self.silent_frames = 0
+
+        self.sound_frames = 0
+        self.flatness_sum = 0.0
+        self.flatness_sq = 0.0
+        self.power = np.zeros(FRAME_SIZE // 2 + 1)
+
+        self.segment_frames = max(int(SEGMENT_SECONDS * sample_rate / FRAME_SIZE), 1)
+        self.segment_index = 0
+        self.segment_power = np.zeros(FRAME_SIZE // 2 + 1)
+        self.segment_sound = 0
+        self.segment_bandwidths = []
+
+        self.last_sample = None
+        self.splices = 0
+        self.splice_times = []
+        self.isolation = max(int(SPLICE_ISOLATION_SECONDS * sample_rate), 1)
+        # Absolute sample positions: recent large jumps, and candidates whose
+        # following window has not been decoded yet
+        self.recent_jumps = np.zeros(0, dtype=np.int64)
+        self.pending_splices = np.zeros(0, dtype=np.int64)
+
+        self.min_gap = max(int(DIGITAL_SILENCE_SECONDS * sample_rate), 1)
+        self.zero_carry = 0
+        self.carry_after_sound = False
+        self.seen_sound = False
+        self.gaps = 0
+        self.gap_times = []
+
+    def feed(self, chunk: np.ndarray):
+        if not len(chunk):
+            return
+        self._splices(chunk)
+        self._zero_runs(chunk)
+        self.samples += len(chunk)
+
+        x = np.concatenate([self.carry, chunk]) if len(self.carry) else chunk
+        count = len(x) // FRAME_SIZE
+        self.carry = x[count * FRAME_SIZE:].copy()
+        if count:
+            self._frames(x[:count * FRAME_SIZE].reshape(count, FRAME_SIZE))
+
+    def _splices(self, chunk: np.ndarray):
+        # d[i] is the jump into chunk[i] (the first one only when a previous sample exists)
+        if self.last_sample is None:
+            d, offset = np.abs(np.diff(chunk)), 1
+        else:
+            d, offset = np.abs(np.diff(chunk, prepend=self.last_sample)), 0
+        self.last_sample = chunk[-1]
+        if not len(d):
+            return
+        starts = np.arange(0, len(d), FRAME_SIZE)
+        local = np.add.reduceat(d, starts) / np.diff(np.append(starts, len(d)))
+        scale = np.repeat(local, np.diff(np.append(starts, len(d))))
+        large = d > SPLICE_MIN_JUMP
+        base = self.samples + offset
+        jumps = np.concatenate([self.recent_jumps, base + np.flatnonzero(large)])
+        candidates = np.concatenate([self.pending_splices,
+                                     base + np.flatnonzero(large & (d > SPLICE_SLOPE_RATIO * scale))])
+        end = self.samples + len(chunk)
+        self._settle_splices(jumps, candidates, end)
+        self.recent_jumps = jumps[jumps >= end - 2 * self.isolation]
+
+    def _settle_splices(self, jumps: np.ndarray, candidates: np.ndarray, end: int, final: bool = False):
+        # A candidate is decided once `isolation` samples after it have been seen
+        decided = candidates if final else candidates[candidates + self.isolation < end]
+        self.pending_splices = candidates[len(decided):]
+        if not len(decided):
+            return
+        # Isolated: the candidate is the only large jump in its window
+        neighbours = (np.searchsorted(jumps, decided + self.isolation, side="right")
+                      - np.searchsorted(jumps, decided - self.isolation, side="left"))
+        hits = decided[neighbours == 1]
+        self.splices += len(hits)
+        room = MAX_REPORTED_EVENTS - len(self.splice_times)
+        for i in hits[:max(room, 0)]:
+            self.splice_times.append(round(float(i) / self.sample_rate, 3))
+
+    def _zero_runs(self, chunk: np.ndarray):
+        n = len(chunk)
+        zero = chunk == 0
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], zero, [False])).astype(np.int8)))
+        starts, ends = edges[::2], edges[1::2]
+        # Only long runs and runs touching the chunk edges (continued across chunks) matter
+        keep = (ends - starts >= self.min_gap) | (starts == 0) | (ends == n)
+        carried = False
+        for start, end in zip(starts[keep], ends[keep]):
+            if start == 0:
+                length = end + self.zero_carry
+                after_sound = self.carry_after_sound if self.zero_carry else self.seen_sound
+            else:
+                length, after_sound = end - start, True
+            if end == n:
+                self.zero_carry, self.carry_after_sound, carried = length, after_sound, True
+            elif after_sound and length >= self.min_gap:
+                # Sound on both sides: inserted silence, not a leading / trailing pad
+                self.gaps += 1
+                if len(self.gap_times) < MAX_REPORTED_EVENTS:
+                    self.gap_times.append(round(float(self.samples + end - length) / self.sample_rate, 3))
+        if not carried:
+            self.zero_carry = 0
+        self.seen_sound = self.seen_sound or bool(np.any(~zero))
+
+    def _frames(self, frames: np.ndarray):
+        count = len(frames)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        sound = rms >= SILENCE_RMS
+        segment_ids = (self.frames + np.arange(count)) // self.segment_frames
+        self.frames += count
+        self.silent_frames += int(count - sound.sum())
+        if not sound.any():
+            self._add_segments(segment_ids, None, sound)
+            return
+
+        power = np.square(np.abs(np.fft.rfft(frames[sound] * self.window, axis=1))).astype(np.float64)
+        eps = 1e-12
+        flatness = np.exp(np.mean(np.log(power + eps), axis=1)) / (np.mean(power, axis=1) + eps)
+        self.sound_frames += len(flatness)
+        self.flatness_sum += float(flatness.sum())
+        self.flatness_sq += float(np.square(flatness).sum())
+        self.power += power.sum(axis=0)
+        self._add_segments(segment_ids, power, sound)
+
+    def _add_segments(self, segment_ids, power, sound):
+        sound_ids = segment_ids[sound]
+        for segment in np.unique(segment_ids):
+            if segment != self.segment_index:
+                self._close_segment()
+                self.segment_index = segment
+            if power is not None:
+                mask = sound_ids == segment
+                self.segment_power += power[mask].sum(axis=0)
+                self.segment_sound += int(mask.sum())
+
+    def _close_segment(self):
+        # Mostly-silent segments say nothing about the source's bandwidth
+        if self.segment_sound >= self.segment_frames // 4:
+            self.segment_bandwidths.append(self._bandwidth(self.segment_power))
+        self.segment_power = np.zeros_like(self.segment_power)
+        self.segment_sound = 0
+
+    def _bandwidth(self, power: np.ndarray) -> float:
+        if not power.any():
+            return 0.0
+        db = 10 * np.log10(power + 1e-20)
+        above = np.flatnonzero(db > db.max() - BANDWIDTH_FLOOR_DB)
+        return float(self.freqs[above[-1]])
+
+    def _band_db(self, low: float, high: float) -> float:
+        band = (self.freqs >= low) & (self.freqs < high)
+        return float(np.mean(10 * np.log10(self.power[band] + 1e-20))) if band.any() else 0.0
+
+    def lossy_cutoff(self):
+        """Brick-wall lowpass typical of MP3 / AAC encoders (14-20 kHz), or None."""
+        cutoff = self._bandwidth(self.power)
+        nyquist = self.sample_rate / 2
+        if cutoff < 14000 or cutoff > 0.95 * nyquist:
+            return None
+        drop = self._band_db(cutoff - 1500, cutoff - 500) - self._band_db(cutoff + 500, min(cutoff + 1500, nyquist))
+        return cutoff if drop > LOSSY_DROP_DB else None
+
+    def result(self) -> dict:
+        self._close_segment()
+        self._settle_splices(self.recent_jumps, self.pending_splices, self.samples, final=True)
+        nyquist = self.sample_rate / 2
+        bandwidth = self._bandwidth(self.power)
+        bands = self.segment_bandwidths
+        changes = sum(
+            1 for a, b in zip(bands, bands[1:])
+            if max(a, b) and min(a, b) / max(a, b) < BANDWIDTH_JUMP_RATIO
+        )
+        rate_issues = []
+        if self.sound_frames and bandwidth < MIN_BANDWIDTH_FRACTION * nyquist:
+            rate_issues.append(f"Content stops at {bandwidth:.0f} Hz of a {nyquist:.0f} Hz band (resampled)")
+        if changes:
+            rate_issues.append(f"Bandwidth changes {changes} time(s) between segments")
+
+        mean = self.flatness_sum / self.sound_frames if self.sound_frames else 0.0
+        variance = self.flatness_sq / self.sound_frames - mean ** 2 if self.sound_frames else 0.0
+        return {
+            "duration_seconds": round(self.samples / self.sample_rate, 2),
+            "spectral_flatness_mean": round(mean, 4),
+            "spectral_flatness_std": round(float(np.sqrt(max(variance, 0.0))), 4),
+            "silence_ratio": round(self.silent_frames / self.frames, 4) if self.frames else 1.0,
+            "digital_silence_gaps": self.gaps,
+            "digital_silence_times": self.gap_times,
+            "splice_count": self.splices,
+            "splice_times": self.splice_times,
+            "effective_bandwidth_hz": round(bandwidth),
+            "bandwidth_changes": changes,
+            "sample_rate_consistent": not rate_issues,
+            "rate_issues": rate_issues,
+        }
+
+
+def _codec_issues(info: dict, mime: str, decoded: int, features: AudioFeatures) -> list:
+    issues = []
+    container, family = info["container"], _codec_family(info["codec"])
+    expected = CONTAINERS.get(mime)
+    if expected and expected != container:
+        issues.append(f"File signature says {expected}, stream parsed as {container}")
+    if family not in EXPECTED_CODECS.get(container, {family}):
+        issues.append(f"{info['codec']} stream in a {container} container")
+
+    declared = info.get("declared_frames")
+    if declared and abs(declared - decoded) > LENGTH_TOLERANCE * declared:
+        issues.append(f"Header declares {declared} frames, {decoded} decoded")
+
+    if family in LOSSLESS_CODECS:
+        cutoff = features.lossy_cutoff()
+        if cutoff:
+            issues.append(f"Lossless {container} with a lossy-encoder lowpass at {cutoff:.0f} Hz")
+    return issues
+
+
+def analyze_audio(source, mime: str = None) -> dict:
+    """
+    `source` is the upload bytes, a path or a binary file object.
+    Raises AudioDecodeError when the stream cannot be decoded.
+    """
+    if mime is None:
+        kind = filetype.guess(source.read(261) if hasattr(source, "read") else source)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        mime = kind.mime if kind else "application/octet-stream"
+    container = CONTAINERS.get(mime, mime.split("/")[-1])
+
+    with tempfile.TemporaryDirectory() as scratch:
+        info = None
+        if container == "wav":
+            try:
+                info, chunks = _wav_stream(io.BytesIO(source) if isinstance(source, bytes) else source)
+            except AudioDecodeError:
+                # e.g. float or WAVE_FORMAT_EXTENSIBLE data: ffmpeg's job
+                if hasattr(source, "seek"):
+                    source.seek(0)
+        if info is None:
+            # ffmpeg reads from disk; bytes are spilled once (like video_service)
+            path = source if isinstance(source, str) else f"{scratch}/upload.{container}"
+            if not isinstance(source, str):
+                with open(path, "wb") as f:
+                    if isinstance(source, bytes):
+                        f.write(source)
+                    else:
+                        shutil.copyfileobj(source, f)
+            info, chunks = _ffmpeg_stream(path, container)
+
+        features = AudioFeatures(info["sample_rate"])
+        for chunk in chunks:
+            features.feed(chunk)
+
+    result = {key: info[key] for key in ("container", "codec", "sample_rate", "channels")}
+    result.update(features.result())
+    issues = _codec_issues(info, mime, features.samples, features)
+    result["codec_consistent"] = not issues
+    result["codec_issues"] = issues
+    return result
+
+
+def process_audio(file_bytes: bytes) -> dict:
+    """Analyzer entry point (see analyzers.py)."""
+    try:
+        return analyze_audio(file_bytes)
+    except AudioDecodeError as e:
+        return {"error": f"Unable to read audio: {e}"}
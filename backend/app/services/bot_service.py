@@ -1,31 +1,55 @@
 import os
-import io
 import json
 import asyncio
 import filetype
-import pdfplumber
 import re
-from PIL import Image
+import time
 from dotenv import load_dotenv
 from google import genai
-from google.genai import types
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+from app.core import config
+from app.core.deadline import current_deadline
+from app.core.metrics import metrics
+from app.core.profiling import profile_stage
+from app.services import cert_fetcher
+from app.services import image_service
+from app.services.ai_gateway import AIGateway
+from app.services.certificate_ocr import read_certificate_image
+from app.services.image_decode import ImageRejected
+from app.services.pdf_handle import close_soon, open_pdf
+from app.utils.cache import make_cache
 
 # Load environment variables
 load_dotenv()
 
 # --- Configuration & State ---
+# Returned by deadline.run when a stage was cut, to tell it apart from a real None
+_CUT = object()
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 client = None
+ai_gateway = None
+
+# URL -> verify_certificate result. Transient fetch failures are not cached.
+# Shared across workers when SHARED_CACHE_PATH is set.
+certificate_cache = make_cache(
+    "certificate", config.CERT_CACHE_MAX_ENTRIES, config.CERT_CACHE_TTL_SECONDS
+)
 
 # Initialize AI Client if Key is Present
 if GEMINI_API_KEY:
     try:
         client = genai.Client(api_key=GEMINI_API_KEY)
+        ai_gateway = AIGateway(client)
     except Exception as e:
         print(f"[WARNING] AI Client Initialization Failed: {e}")
 
+
+def ai_fingerprint() -> str:
+    """Identifies the AI side of an answer (for validators); "no-ai" without a client."""
+    return ai_gateway.fingerprint if ai_gateway is not None else "no-ai"
+
 # --- Helper Logic (Rule-Based) ---
 
 class RuleEngine:
@@ -61,9 +85,10 @@ class RuleEngine:
         return "Unknown"
 
     @staticmethod
-    def verify_rules(text: str, platform: str) -> dict:
+    def verify_rules(text: str, platform: str, certificate_id: str = None) -> dict:
         """
         Apply structural and content rules. 
+        `certificate_id` is an ID already extracted from the file (image OCR).
         Returns status and reasons list.
         """
         reasons = []
@@ -88,7 +113,10 @@ class RuleEngine:
         # ID Check (Heuristic)
         # Udemy: UC-xxxx, Coursera: 12+ chars alphanumeric
         id_found = False
-        if platform == "Udemy" and "UC-" in text:
+        if certificate_id:
+            id_found = True
+            reasons.append(f"Certificate ID {certificate_id} extracted.")
+        elif platform == "Udemy" and "UC-" in text:
             id_found = True
             reasons.append("Certificate ID pattern (UC-) detected.")
         elif platform == "Coursera" and re.search(r"[a-zA-Z0-9]{10,}", text):
@@ -111,13 +139,23 @@ class RuleEngine:
 
 # --- Core Service Functions ---
 
-def _scrape_with_playwright(url: str) -> str:
+def _scrape_with_playwright(url: str, timeout_ms: int = 30000) -> tuple:
     """
     Synchronous helper to scrape with Playwright.
     Must be run in a thread to avoid blocking the async event loop.
+    `timeout_ms` bounds navigation plus settle time (callers pass what is
+    left of the request deadline).
+    Returns (status_code, text); status_code is None if navigation failed.
+    With BROWSER_CDP_URL set (multi-worker launcher) it opens a context in
+    the shared Chromium instead of launching a browser per call.
     """
+    started = time.monotonic()
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
+        if config.BROWSER_CDP_URL:
+            browser = p.chromium.connect_over_cdp(config.BROWSER_CDP_URL)
+        else:
+            browser = p.chromium.launch(headless=True)
+        context = None
         try:
             # Mimic real user agent
             context = browser.new_context(
@@ -125,15 +163,16 @@ def _scrape_with_playwright(url: str) -> str:
             )
             page = context.new_page()
             try:
-                response = page.goto(url, timeout=30000)
+                response = page.goto(url, timeout=timeout_ms)
                 status_code = response.status
             except Exception as e:
                 # If navigation fails (e.g. invalid domain), return generic error text
-                return ""
+                return None, ""
 
             if status_code == 200:
                 try:
-                    page.wait_for_timeout(2000)
+                    left_ms = timeout_ms - (time.monotonic() - started) * 1000
+                    page.wait_for_timeout(max(min(2000, left_ms), 0))
                 except:
                     pass
                 
@@ -141,16 +180,36 @@ def _scrape_with_playwright(url: str) -> str:
                 soup = BeautifulSoup(content, 'html.parser')
                 # Extract clean text
                 text = soup.get_text(separator=' ', strip=True)[:5000]
-                return text
+                return status_code, text
             else:
-                 return ""
+                 return status_code, ""
         except Exception as e:
             print(f"[ERROR] Playwright Scraping: {e}")
-            return ""
+            return None, ""
         finally:
-            browser.close()
+            if config.BROWSER_CDP_URL:
+                # Shared browser: close only our context, leave Chromium running
+                if context is not None:
+                    context.close()
+            else:
+                browser.close()
 
 async def verify_certificate(url: str):
+    """
+    Cached entry point for certificate URL verification.
+    Used by the bot endpoint and by QR payloads found in uploads.
+    """
+    url = url.strip()
+    cached = certificate_cache.get(url)
+    if cached is not None:
+        return cached
+
+    result = await _verify_certificate_uncached(url)
+    if not result.get("partial") and ("structured_analysis" in result or result["provider"] == "Unknown"):
+        certificate_cache.set(url, result)
+    return result
+
+async def _verify_certificate_uncached(url: str):
     """
     Verifies a certificate URL using RuleEngine + Optional AI.
     """
@@ -172,46 +231,44 @@ async def verify_certificate(url: str):
                  "details": "URL does not match supported platforms (Udemy, Coursera)."
              }
 
-    # 2. Scrape Text
-    scraped_text = await asyncio.to_thread(_scrape_with_playwright, url)
+    # 2. Fetch Text (static HTTP first, browser only if required fields are missing)
+    deadline = current_deadline()
+    page = await deadline.run(
+        "fetch", cert_fetcher.fetch_certificate_page(url, matched_platform, _scrape_with_playwright)
+    )
+    if page is None:
+        return {
+            "valid": False, "provider": matched_platform,
+            "details": "Verification was cut by the request deadline before the page could be fetched.",
+            "partial": True, "cut_stages": ["fetch"]
+        }
+    scraped_text = page["text"]
 
     if not scraped_text:
-         return {
+         result = {
              "valid": False, "provider": matched_platform,
              "details": "Could not retrieve page content. The link may be invalid or expired."
          }
+         # The provider says the certificate does not exist (vs. a network failure)
+         if page["status"] in cert_fetcher.DEFINITIVE_MISS:
+             result["not_found"] = True
+         return result
 
     # 3. Rule-Based Verification
     rule_result = RuleEngine.verify_rules(scraped_text, matched_platform)
     
-    # 4. Optional AI Analysis
+    # 4. Optional AI Analysis (cached + micro-batched by the gateway)
     ai_analysis = None
-    if client:
+    ai_cut = False
+    if ai_gateway:
         try:
-            prompt = f"""
-            You are a privacy-first assistant.
-            Analyze this certificate text from {matched_platform}.
-            
-            TEXT CONTEXT:
-            {scraped_text}
-            
-            TASK:
-            - Provide observations on consistency and typical phrasing.
-            - Do NOT provide a verdict.
-            
-            OUTPUT: JSON with 'observations' list.
-            """
-            response = client.models.generate_content(
-                model='gemini-2.0-flash',
-                contents=prompt
+            ai_analysis = await deadline.run(
+                "ai", ai_gateway.analyze_certificate_text(matched_platform, scraped_text), default=_CUT
             )
-            try:
-                clean = response.text.replace("```json", "").replace("```", "").strip()
-                ai_analysis = json.loads(clean)
-            except:
-                ai_analysis = {"raw_notes": response.text}
-        except:
+        except Exception:
             pass # Fail open/silently for AI
+        if ai_analysis is _CUT:
+            ai_analysis, ai_cut = None, True
 
     # 5. Construct Response (Backwards Compatible)
     is_valid = rule_result["status"] in ["Consistent", "Partial Match"]
@@ -225,114 +282,166 @@ async def verify_certificate(url: str):
         if obs:
             details += "\n\nAI Observations:\n" + "\n".join([f"- {o}" for o in obs])
 
-    return {
+    result = {
         "valid": is_valid,
         "provider": matched_platform,
         "details": details,
         # New structure included for future frontend updates:
         "structured_analysis": {
             "platform": matched_platform,
+            "fetch_tier": page["tier"],
+            "fetch_timing": page["timing"],
+            "extracted_fields": page["fields"],
             "rule_result": rule_result,
             "ai_analysis": ai_analysis
         }
     }
+    if ai_cut:
+        result["partial"] = True
+        result["cut_stages"] = ["ai"]
+    return result
+
+def extract_text_from_image(file_bytes: bytes) -> dict:
+    """
+    Two-pass certificate OCR (see certificate_ocr). Returns None when the
+    image cannot be read, so the caller falls back to AI only.
+    """
+    try:
+        gray = image_service.load_image(file_bytes)
+        return read_certificate_image(gray, RuleEngine.identify_platform)
+    except ImageRejected as e:
+        print(f"[WARNING] Image OCR skipped: {e.reason}")
+    except Exception as e:
+        print(f"[ERROR] Image OCR: {e}")
+    return None
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract text from PDF using pdfplumber."""
+def extract_text_from_pdf(pdf) -> str:
+    """Text layer of a PDF (bytes or an open PDFHandle), parsed once per upload."""
     try:
-        text = ""
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            for page in pdf.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
-        return text.strip()
+        if isinstance(pdf, (bytes, bytearray, memoryview)):
+            with open_pdf(pdf) as handle:
+                return handle.text
+        return pdf.text
     except Exception as e:
         print(f"[ERROR] PDF Extraction: {e}")
         return ""
 
-async def analyze_file_upload(file_content: bytes):
+def pdf_pages_for_ai(pdf, platform: str):
     """
-    Main Entry Point for File Upload Verification.
+    (bytes, cache digest) of the pages worth sending to the model: those with
+    the platform's keywords, or any platform's keywords when it is unknown.
+    """
+    rules = RuleEngine.PLATFORMS.get(platform)
+    keywords = rules["keywords"] if rules else [
+        kw for rules in RuleEngine.PLATFORMS.values() for kw in rules["keywords"]
+    ]
+    try:
+        pages = pdf.relevant_pages(keywords)
+        digest = f"{pdf.digest}:pages={','.join(map(str, pages))}"
+        return pdf.page_subset(pages), digest
+    except Exception as e:
+        # Unparseable locally: let the model look at the whole file
+        print(f"[WARNING] PDF page selection failed: {e}")
+        return bytes(pdf.data), None
+
+async def iter_file_upload_stages(file_content: bytes):
+    """
+    File upload verification as a stream of (stage, data) events.
     Orchestrates: Extract -> Rules -> Optional AI.
+    The last event is always ("result", <final response>).
     """
     # 1. File Type Detection
     kind = filetype.guess(file_content)
     mime = kind.mime if kind else "application/octet-stream"
     is_pdf = "pdf" in mime
+    yield "file_type", {"mime": mime}
     
     extracted_text = ""
+    ocr = None
+    # One handle for the text layer and the AI page subset. A stage cut by the
+    # deadline may still be reading it in its thread, so it is closed when the
+    # request finishes (or below, once nothing was cut).
+    deadline = current_deadline()
+    pdf = open_pdf(file_content) if is_pdf else None
+    if pdf is not None:
+        deadline.add_done_callback(lambda: close_soon(pdf))
     
-    # 2. Text Extraction (PDF Only for now)
+    # 2. Text Extraction (PDF text layer, or two-pass OCR for images)
     if is_pdf:
-        extracted_text = await asyncio.to_thread(extract_text_from_pdf, file_content)
-    else:
-        # If image, we assume we cannot do Rule-Based without OCR. 
-        # For this architecture, we skip Rule-Based text checks for images or handle minimally.
-        extracted_text = "" 
+        extracted_text = await deadline.run(
+            "pdf_text", asyncio.to_thread(extract_text_from_pdf, pdf), default=""
+        )
+    elif "image" in mime:
+        ocr = await deadline.run("ocr", asyncio.to_thread(extract_text_from_image, file_content))
+        if ocr:
+            extracted_text = ocr["text"]
+            yield "ocr", {k: ocr[k] for k in ("platform", "certificate_id", "certificate_url", "passes")}
 
     # 3. Rule-Based Verification (No API Key Required)
     platform = RuleEngine.identify_platform(extracted_text)
-    rule_result = RuleEngine.verify_rules(extracted_text, platform)
+    certificate_id = ocr["certificate_id"] if ocr else None
+    rule_result = RuleEngine.verify_rules(extracted_text, platform, certificate_id)
+    yield "rules", {"platform": platform, "rule_based_result": rule_result}
+
+    # An image whose keywords and ID all check out needs no AI round-trip
+    settled = ocr is not None and rule_result["status"] == "Consistent"
 
     # 4. AI Assist (Optional)
     ai_analysis = None
     ai_message = "AI analysis skipped (API Key missing)."
 
+    if settled:
+        metrics.increment("bot.settled_locally")
+        ai_message = "AI analysis skipped: settled by local rules."
     # Only call AI if we have a client AND (it's a PDF OR an Image)
-    if client:
+    elif ai_gateway:
         try:
             ai_message = "AI analysis performed."
-            
-            # Prepare content for Gemini
-            media_part = None
-            if is_pdf:
-                media_part = types.Part.from_bytes(data=file_content, mime_type="application/pdf")
-            elif "image" in mime:
-                img = Image.open(io.BytesIO(file_content))
-                media_part = img
-            
-            if media_part:
-                prompt = """
-                You are a privacy-first assistant for certificate analysis.
-                
-                ROLE:
-                - Provide OBSERVATIONS ONLY.
-                - Do NOT declare "Real" or "Fake".
-                - Do NOT give scores.
-                
-                TASK:
-                - Check for visual consistency with Udemy/Coursera.
-                - Note any formatting anomalies.
-                
-                OUTPUT format: JSON with keys 'observations' (list) and 'concerns' (list).
-                """
-                
-                response = client.models.generate_content(
-                    model='gemini-2.0-flash',
-                    contents=[prompt, media_part]
+            if is_pdf or "image" in mime:
+                file_bytes, digest = file_content, None
+                if is_pdf:
+                    file_bytes, digest = await asyncio.to_thread(pdf_pages_for_ai, pdf, platform)
+                ai_analysis = await deadline.run(
+                    "ai", ai_gateway.analyze_certificate_file(file_bytes, mime, digest=digest), default=_CUT
                 )
-                
-                # Try to parse strict JSON if model followed instructions, else raw text
-                try:
-                    # Clean markdown code blocks if present
-                    clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                    ai_analysis = json.loads(clean_text)
-                except:
-                    ai_analysis = {"raw_notes": response.text}
-
+                if ai_analysis is _CUT:
+                    ai_analysis = None
+                    ai_message = "AI analysis cut by the request deadline."
         except Exception as e:
             print(f"[ERROR] AI Call Failed: {e}")
             ai_message = "AI analysis failed/skipped due to error."
             ai_analysis = None
+        yield "ai", {"ai_analysis": ai_analysis, "message": ai_message}
 
     # 5. Construct Final Response
-    return {
+    result = {
         "platform": platform,
         "rule_based_result": rule_result,
         "ai_analysis": ai_analysis,
         "message": ai_message
     }
+    if ocr:
+        result["certificate_id"] = ocr["certificate_id"]
+        result["certificate_url"] = ocr["certificate_url"]
+        result["settled_locally"] = settled
+    if deadline.cut_stages:
+        result["partial"] = True
+        result["cut_stages"] = list(deadline.cut_stages)
+    elif pdf is not None:
+        close_soon(pdf)  # every stage finished with it (also covers calls outside a request)
+    yield "result", result
+
+async def analyze_file_upload(file_content: bytes):
+    """
+    Main Entry Point for File Upload Verification.
+    Non-streaming view of iter_file_upload_stages.
+    """
+    result = None
+    async with profile_stage("analyze_file_upload"):
+        async for stage, data in iter_file_upload_stages(file_content):
+            if stage == "result":
+                result = data
+    return result
 
 
 # Backwards compatibility wrapper for API router if needed
@@ -0,0 +1,111 @@
+"""
+Two-pass OCR for certificate images on the bot path.
+
+1. A cheap full-page pass on a downscaled copy is enough to spot the
+   platform keywords (RuleEngine.identify_platform).
+2. Only then is full-resolution OCR run, and only on the band where that
+   platform prints the certificate ID and verification URL (top right for
+   Udemy, footer for Coursera). If nothing is found there, the general
+   certificate regions (title, name, footer) are read instead.
+
+The extracted ID and URL let RuleEngine settle most Udemy / Coursera
+images without the AI call.
+"""
+import re
+
+import cv2
+import numpy as np
+
+from app.services import ocr_service
+from app.services.cert_fetcher import PROVIDER_SELECTORS
+
+# Longest side of the platform-detection pass
+LOWRES_MAX_SIDE = 960
+
+# Where each platform prints the ID / verify URL, as (x0, y0, x1, y1) fractions
+CERTIFICATE_ROIS = {
+    "Udemy": (0.45, 0.0, 1.0, 0.3),
+    "Coursera": (0.0, 0.7, 1.0, 1.0),
+}
+
+# OCR'd URLs usually lack the scheme and Udemy prints the ude.my short link
+URL_PATTERNS = {
+    "Udemy": r"(?:udemy\.com/certificate/|ude\.my/)(UC-[a-zA-Z0-9-]+)",
+    "Coursera": r"coursera\.org/(?:verify|account/accomplishments/(?:verify|certificate))/([a-zA-Z0-9]+)",
+}
+CANONICAL_URLS = {
+    "Udemy": "https://www.udemy.com/certificate/{id}/",
+    "Coursera": "https://www.coursera.org/account/accomplishments/verify/{id}",
+}
+
+
+def _downscale(gray: np.ndarray, max_side: int) -> np.ndarray:
+    longest = max(gray.shape[:2])
+    if longest <= max_side:
+        return gray
+    scale = max_side / float(longest)
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def extract_fields(text: str, platform: str) -> dict:
+    """Certificate ID and canonical verification URL found in OCR text."""
+    fields = {"certificate_id": None, "certificate_url": None}
+    if platform not in URL_PATTERNS:
+        return fields
+
+    # OCR tends to insert spaces around punctuation in small print
+    compact = re.sub(r"\s*([/.:-])\s*", r"\1", text)
+    url_match = re.search(URL_PATTERNS[platform], compact, re.IGNORECASE)
+    if url_match:
+        fields["certificate_id"] = url_match.group(1)
+        fields["certificate_url"] = CANONICAL_URLS[platform].format(id=url_match.group(1))
+    elif platform == "Udemy":
+        id_match = re.search(PROVIDER_SELECTORS["Udemy"]["id_regex"], compact)
+        if id_match:
+            fields["certificate_id"] = id_match.group(0)
+    return fields
+
+
+def _roi_boxes(gray: np.ndarray, platform: str) -> list:
+    """Text lines inside the platform's ID / URL band, in full-image coordinates."""
+    height, width = gray.shape[:2]
+    x0, y0, x1, y1 = CERTIFICATE_ROIS[platform]
+    left, top = int(x0 * width), int(y0 * height)
+    band = gray[top:int(y1 * height), left:int(x1 * width)]
+    if band.size == 0:
+        return []
+    return [(x + left, y + top, w, h) for x, y, w, h in ocr_service.detect_text_regions(band)]
+
+
+def read_certificate_image(gray: np.ndarray, identify_platform, engine=None) -> dict:
+    """
+    Returns {"platform", "text", "certificate_id", "certificate_url", "passes"}.
+    `identify_platform(text) -> str` is RuleEngine.identify_platform.
+    """
+    engine = engine or ocr_service.get_ocr_engine()
+
+    # 1. Low resolution, full page: just enough to read the big keywords
+    text = engine.image_to_string(_downscale(gray, LOWRES_MAX_SIDE)).strip()
+    platform = identify_platform(text)
+    passes = ["lowres"]
+
+    # 2. Full resolution, only where the ID and URL are printed
+    fields = extract_fields(text, platform)
+    if platform in CERTIFICATE_ROIS and not fields["certificate_url"]:
+        roi_text = ocr_service.ocr_regions(gray, _roi_boxes(gray, platform), engine=engine)
+        passes.append("roi")
+        text = f"{text}\n{roi_text}".strip()
+        fields = extract_fields(text, platform)
+
+    # 3. Nothing usable yet: the general certificate regions at full resolution
+    if platform == "Unknown" or not fields["certificate_id"]:
+        boxes = ocr_service.detect_text_regions(gray)
+        regions = ocr_service.select_certificate_regions(boxes, gray.shape[0])
+        region_text = ocr_service.ocr_regions(gray, regions, engine=engine)
+        passes.append("regions")
+        text = f"{text}\n{region_text}".strip()
+        if platform == "Unknown":
+            platform = identify_platform(text)
+        fields = extract_fields(text, platform)
+
+    return {"platform": platform, "text": text, "passes": passes, **fields}
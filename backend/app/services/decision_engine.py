@@ -1,111 +1,255 @@
+"""
+Table-driven decision engine.
+
+Signals, weights and thresholds live in a JSON table (see
+app/core/decision_weights.json, override with DECISION_WEIGHTS_PATH) that is
+loaded once. Each media type is a list of signals; a signal names an
+extractor, the analysis field it reads, a weight and an optional reason
+template. A report is lowercased once, however many terms and term signals
+read it.
+
+Loading compiles every signal into a closure over its field, weight,
+parameters and reason, so scoring one analysis is a plain loop of closure
+calls: no lookups into the table, no per-call contexts, and reason strings
+are only formatted for signals that fire.
+tests/bench_decision.py compares it with the hand-written rules it replaced.
+"""
+import hashlib
+import json
+import threading
+
+from app.core import config
+
+# --- Signal extractors ---
+# Each compiles one signal into extract(analysis, lowered, reasons) -> score
+# contribution (0 when the signal does not fire), appending its reason.
+# `lowered` maps each term field to its lowercased text.
+
+def _truthy(signal):
+    field, weight, reason = signal["field"], signal["weight"], signal.get("reason")
+
+    def extract(analysis, lowered, reasons):
+        if not analysis.get(field):
+            return 0
+        if reason:
+            reasons.append(reason)
+        return weight
+    return extract
+
+def _in_set(signal):
+    field, weight, reason = signal["field"], signal["weight"], signal.get("reason")
+    default, values = signal.get("default"), tuple(signal["values"])
+
+    def extract(analysis, lowered, reasons):
+        value = analysis.get(field, default)
+        if value not in values:
+            return 0
+        if reason:
+            reasons.append(reason.format(value=value))
+        return weight
+    return extract
+
+def _length_above(signal):
+    field, weight, reason, minimum = signal["field"], signal["weight"], signal.get("reason"), signal["min"]
+
+    def extract(analysis, lowered, reasons):
+        value = analysis.get(field)
+        if not value or len(value) <= minimum:
+            return 0
+        if reason:
+            reasons.append(reason)
+        return weight
+    return extract
+
+def _above(signal):
+    field, weight, reason, minimum = signal["field"], signal["weight"], signal.get("reason"), signal["min"]
+
+    def extract(analysis, lowered, reasons):
+        value = analysis.get(field)
+        if not value or value <= minimum:
+            return 0
+        if reason:
+            reasons.append(reason)
+        return weight
+    return extract
+
+def _at_least(signal):
+    field, weight, reason, minimum = signal["field"], signal["weight"], signal.get("reason"), signal["min"]
+
+    def extract(analysis, lowered, reasons):
+        value = analysis.get(field) or 0
+        if value < minimum:
+            return 0
+        if reason:
+            reasons.append(reason.format(value=value))
+        return weight
+    return extract
+
+def _any_valid(signal):
+    field, weight, reason = signal["field"], signal["weight"], signal.get("reason")
+
+    def extract(analysis, lowered, reasons):
+        for item in analysis.get(field) or ():
+            if item.get("valid"):
+                if reason:
+                    reasons.append(reason.format(value=item.get("provider", "")))
+                return weight
+        return 0
+    return extract
+
+def _none_valid(signal):
+    field, weight, reason = signal["field"], signal["weight"], signal.get("reason")
+
+    def extract(analysis, lowered, reasons):
+        # Links that could not be checked (valid None) count neither way
+        checked = False
+        for item in analysis.get(field) or ():
+            valid = item.get("valid")
+            if valid:
+                return 0
+            checked = checked or valid is not None
+        if not checked:
+            return 0
+        if reason:
+            reasons.append(reason)
+        return weight
+    return extract
+
+def _terms(signal):
+    field, weight, reason = signal["field"], signal["weight"], signal.get("reason")
+    terms = tuple((t, t.lower()) for t in signal["terms"])
+
+    def extract(analysis, lowered, reasons):
+        # C-level substring search on text lowercased once; in CPython this
+        # measured several times faster than a case-insensitive regex alternation
+        text = lowered.get(field)
+        if not text:
+            return 0
+        matches = [t for t, low in terms if low in text]
+        if not matches:
+            return 0
+        if reason:
+            reasons.append(reason.format(matches=", ".join(matches), count=len(matches)))
+        return weight * len(matches)
+    return extract
+
+EXTRACTORS = {
+    "truthy": _truthy,
+    "in_set": _in_set,
+    "length_above": _length_above,
+    "above": _above,
+    "at_least": _at_least,
+    "any_valid": _any_valid,
+    "none_valid": _none_valid,
+    "terms": _terms,
+}
+
+
+class _MediaTable:
+    """Compiled signals for one media type."""
+
+    def __init__(self, signals: list):
+        for signal in signals:
+            if signal["extractor"] not in EXTRACTORS:
+                raise ValueError(f"Unknown signal extractor: {signal['extractor']}")
+        self.signals = signals
+        self.extractors = tuple(EXTRACTORS[s["extractor"]](s) for s in signals)
+        # Fields read by term signals: lowercased once per analysis, however many signals share them
+        self.term_fields = tuple(dict.fromkeys(s["field"] for s in signals if s["extractor"] == "terms"))
+
+    def score(self, analysis: dict) -> tuple:
+        """(score, reasons) for one analysis."""
+        lowered = {}
+        for field in self.term_fields:
+            text = analysis.get(field)
+            if text:
+                lowered[field] = text.lower()
+
+        score = 0
+        reasons = []
+        for extract in self.extractors:
+            score += extract(analysis, lowered, reasons)
+        return score, reasons
+
+
+class DecisionEngine:
+    def __init__(self, table: dict):
+        # Short hash of the canonical table
+        self.fingerprint = hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()[:16]
+        self.version = table.get("version", 1)
+        self.verified_at = table["thresholds"]["VERIFIED"]
+        self.suspicious_at = table["thresholds"]["SUSPICIOUS"]
+
+        media = table["media_types"]
+        self.tables = {}
+        for media_type, signals in media.items():
+            if not isinstance(signals, str):
+                self.tables[media_type] = _MediaTable(signals)
+        # String entries alias another media type, e.g. "pdf": "image"
+        for media_type, signals in media.items():
+            if isinstance(signals, str):
+                self.tables[media_type] = self.tables[signals]
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def decide(self, media_type: str, analysis: dict) -> dict:
+        table = self.tables.get(media_type)
+        score, reasons = table.score(analysis) if table is not None else (0, [])
+        if score >= self.verified_at:
+            status = "VERIFIED"
+        elif score >= self.suspicious_at:
+            status = "SUSPICIOUS"
+        else:
+            status = "NOT_VERIFIED"
+        return {"status": status, "confidence": round(score / 100, 2), "reasons": reasons}
+
+    def score_batch(self, media_type: str, analyses: list) -> list:
+        """Score many analyses of one media type (re-scoring stored results)."""
+        decide = self.decide
+        return [decide(media_type, analysis) for analysis in analyses]
+
+    def score_many(self, items: list) -> list:
+        """Score (media_type, analysis) pairs of mixed types, preserving order."""
+        by_type = {}
+        for i, (media_type, analysis) in enumerate(items):
+            by_type.setdefault(media_type, []).append(i)
+
+        results = [None] * len(items)
+        for media_type, indexes in by_type.items():
+            decisions = self.score_batch(media_type, [items[i][1] for i in indexes])
+            for i, decision in zip(indexes, decisions):
+                results[i] = decision
+        return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DecisionEngine:
+    """Engine built from the configured weights file, loaded once."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DecisionEngine.from_file(config.DECISION_WEIGHTS_PATH)
+    return _engine
+
+
+def reload_engine(path: str = None) -> DecisionEngine:
+    """Swap in new weights (e.g. before re-scoring stored results)."""
+    global _engine
+    engine = DecisionEngine.from_file(path or config.DECISION_WEIGHTS_PATH)
+    with _engine_lock:
+        _engine = engine
+    return engine
+
+
 def make_decision(media_type: str, analysis: dict):
     """
     Combines signals and produces a final verification decision.
     """
-
-    score = 0
-    reasons = []
-
-    # -------- CERTIFICATE LOGIC (New) --------
-    if media_type == "certificate":
-        # 1. Base Validation (Regex/URL check from bot_service)
-        if analysis.get("url_valid"):
-            score += 40
-            reasons.append("Valid Platform URL Pattern")
-        
-        # 2. Provider Check
-        provider = analysis.get("provider", "Unknown")
-        if provider in ["Udemy", "Coursera"]:
-             score += 10
-             reasons.append(f"Recognized Provider: {provider}")
-
-        # 3. Forensic Text Analysis
-        forensic_report = analysis.get("forensic_report", "")
-        if forensic_report:
-            # Positive Indicators in the report
-            positive_terms = ["typical layout", "expected phrases", "format consistency", 
-                            "certificate id present", "branding present", "logical consistency"]
-            
-            for term in positive_terms:
-                 if term.lower() in forensic_report.lower():
-                      score += 5
-
-            # Negative Indicators (Concerns)
-            negative_terms = ["spelling anomaly", "mismatched styles", "manual editing", 
-                            "inconsistent font", "layout incoherence"]
-            
-            concerns = []
-            for term in negative_terms:
-                 if term.lower() in forensic_report.lower():
-                      score -= 15
-                      concerns.append(term)
-            
-            if concerns:
-                 reasons.append(f"Visual anomalies detected: {', '.join(concerns)}")
-
-    # -------- IMAGE / PDF LOGIC --------
-    if media_type in ["image", "pdf"]:
-        # 1. Forensic Text Analysis (New Logic)
-        forensic_report = analysis.get("forensic_report", "")
-        if forensic_report:
-            # Heuristic: Scan for negative indicators in the report
-            # The LLM is neutral, but if it mentions these terms, it's a signal.
-            indicators = [
-                "over-smoothing", "plastic-like", "inconsistent sharpness",
-                "warped edges", "unnatural transitions", "asymmetric shapes",
-                "mismatched light", "inconsistent reflections", "implausible details",
-                "checkerboard", "grid-like artifacts", "repeating micro-patterns", 
-                "abrupt texture boundaries", "inconsistent proportions"
-            ]
-            
-            detected_indicators = []
-            for indicator in indicators:
-                if indicator.lower() in forensic_report.lower():
-                    score += 15 # Each indicator adds to the AI score
-                    detected_indicators.append(indicator)
-            
-            if detected_indicators:
-                 reasons.append(f"Forensic anomalies detected ({len(detected_indicators)})")
-
-        # 2. Existing Metadata Logic
-        if analysis.get("qr_detected"):
-            score += 40
-            reasons.append("QR code detected")
-
-        ocr_text = analysis.get("ocr_text", "")
-        if ocr_text and len(ocr_text) > 100:
-            score += 30
-            reasons.append("Readable text extracted")
-
-        metadata = analysis.get("metadata", {})
-        if metadata:
-            score += 10
-            reasons.append("Metadata present")
-
-    # -------- VIDEO LOGIC --------
-    if media_type == "video":
-        duration = analysis.get("duration_seconds", 0)
-        if duration and duration > 5:
-            score += 40
-            reasons.append("Sufficient video duration")
-
-        frames = analysis.get("sample_frames_extracted", 0)
-        if frames >= 3:
-            score += 30
-            reasons.append("Multiple frames extracted")
-
-    # -------- FINAL DECISION --------
-    if score >= 70:
-        status = "VERIFIED"
-    elif score >= 40:
-        status = "SUSPICIOUS"
-    else:
-        status = "NOT_VERIFIED"
-
-    confidence = round(score / 100, 2)
-
-    return {
-        "status": status,
-        "confidence": confidence,
-        "reasons": reasons
-    }
+    return get_engine().decide(media_type, analysis)
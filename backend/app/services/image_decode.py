@@ -0,0 +1,126 @@
+"""
+Memory-bounded image decoding.
+
+The header is read first and nothing is decoded until the pixel count and
+an estimate of the decode cost have been checked against the limits in
+config. JPEGs are decoded straight to grayscale and, when a full decode
+would not fit the per-request budget, at a reduced DCT scale (Pillow draft
+mode). Other formats cannot be decoded at reduced size, so they are
+rejected instead.
+
+OCR and QR detection both work on grayscale, so by default no RGB copy is
+ever made, and they get the full resolution unless a max side is set.
+
+The pixel limit is checked here per decode; Pillow's process-wide
+MAX_IMAGE_PIXELS is left alone (its hard limit, about 179 MP by default,
+still rejects anything larger at Image.open).
+"""
+import io
+import math
+import time
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from app.core import config
+from app.core.metrics import metrics
+
+# Bytes per pixel Pillow uses internally for each mode (RGB is stored as 4)
+_MODE_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "I;16L": 2}
+_OUTPUT_CHANNELS = {"L": 1, "RGB": 3}
+# JPEG source modes that draft() can decode directly into L or RGB
+_JPEG_DRAFT_MODES = ("L", "RGB", "YCbCr")
+_JPEG_MAX_SCALE = 8
+
+
+class ImageRejected(Exception):
+    def __init__(self, reason: str, status_code: int = 413):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+
+
+def _reject(kind: str, reason: str, status_code: int = 413):
+    metrics.increment(f"image.rejected.{kind}")
+    print(f"[WARNING] Image rejected: {reason}")
+    raise ImageRejected(reason, status_code)
+
+
+def _mode_bytes(mode: str) -> int:
+    return _MODE_BYTES.get(mode, 4)
+
+
+def estimate_decode_bytes(width: int, height: int, source_mode: str, mode: str = "L", scale: int = 1) -> int:
+    """
+    Peak bytes for decoding at 1/scale: the decoded image, the converted
+    copy (when the modes differ) and the numpy array handed to callers.
+    """
+    pixels = math.ceil(width / scale) * math.ceil(height / scale)
+    convert = 0 if source_mode == mode else _mode_bytes(mode)
+    return pixels * (_mode_bytes(source_mode) + convert + _OUTPUT_CHANNELS[mode])
+
+
+def decode_image(file_bytes: bytes, mode: str = "L", max_pixels: int = None,
+                 max_side: int = None, memory_mb: int = None) -> np.ndarray:
+    """
+    Decode an upload into a uint8 array (H x W for "L", H x W x 3 for "RGB").
+    The longest side is capped at `max_side` (IMAGE_DECODE_MAX_SIDE when None,
+    0 for no cap). Raises ImageRejected when the image is too large or unreadable.
+    """
+    max_pixels = max_pixels or config.IMAGE_MAX_PIXELS
+    max_side = config.IMAGE_DECODE_MAX_SIDE if max_side is None else max_side
+    max_side = max_side or math.inf
+    budget = (memory_mb or config.IMAGE_REQUEST_MEMORY_MB) * 1024 * 1024
+    started = time.perf_counter()
+
+    # 1. Header only: no pixel data is read yet
+    try:
+        img = Image.open(io.BytesIO(file_bytes))
+    except Image.DecompressionBombError:
+        _reject("pixels", "image dimensions exceed the decompression-bomb limit")
+    except (UnidentifiedImageError, OSError) as e:
+        _reject("unreadable", f"unreadable image ({e})", 422)
+
+    width, height = img.size
+    if width * height > max_pixels:
+        _reject("pixels", f"image is {width}x{height} ({width * height / 1e6:.0f} MP), "
+                          f"limit is {max_pixels / 1e6:.0f} MP")
+
+    # 2. Plan the decode: JPEGs can be decoded at 1/2, 1/4 or 1/8 scale
+    is_jpeg = img.format == "JPEG" and img.mode in _JPEG_DRAFT_MODES
+    source_mode = mode if is_jpeg else img.mode
+    scale = 1
+    if is_jpeg:
+        while scale < _JPEG_MAX_SCALE and (
+            max(width, height) / (scale * 2) >= max_side
+            or estimate_decode_bytes(width, height, source_mode, mode, scale) > budget
+        ):
+            scale *= 2
+
+    needed = estimate_decode_bytes(width, height, source_mode, mode, scale)
+    if needed > budget:
+        _reject("memory", f"decoding this {width}x{height} {img.format} image needs about "
+                          f"{needed // (1024 * 1024)} MB, the per-request limit is "
+                          f"{budget // (1024 * 1024)} MB")
+
+    if is_jpeg:
+        img.draft(mode, (math.ceil(width / scale), math.ceil(height / scale)))
+
+    # 3. Decode, converting only when the source is not already in `mode`
+    try:
+        img.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        _reject("unreadable", f"image could not be decoded ({e})", 422)
+    if img.mode != mode:
+        img = img.convert(mode)
+
+    # 4. Formats without reduced decode: shrink before the numpy copy
+    longest = max(img.size)
+    if longest > max_side:
+        img = img.reduce(math.ceil(longest / max_side))
+
+    if scale > 1 or img.size != (width, height):
+        metrics.increment("image.decode.reduced")
+    array = np.asarray(img)
+    metrics.observe("image.decode", time.perf_counter() - started)
+    return array
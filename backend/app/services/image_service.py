@@ -1,47 +1,40 @@
 import io
-import cv2
-import pytesseract
-import pdfplumber
 import exifread
-from PIL import Image
 import numpy as np
-
-def process_image_pdf(file_bytes: bytes, media_type: str):
-    result = {
-        "ocr_text": None,
-        "qr_detected": False,
-        "metadata": {},
-    }
-
-    
-    if media_type == "image":
-        image = Image.open(io.BytesIO(file_bytes)).convert("RGB")
-        img_np = np.array(image)
-
-        
-        result["ocr_text"] = pytesseract.image_to_string(image)
-
-        
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(img_np)
-        result["qr_detected"] = bool(data)
-
-        
-        try:
-            tags = exifread.process_file(io.BytesIO(file_bytes))
-            result["metadata"] = {k: str(v) for k, v in tags.items()}
-        except Exception:
-            result["metadata"] = {}
-
-    
-    if media_type == "pdf":
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-            result["ocr_text"] = text
-
-        result["qr_detected"] = False  
-        result["metadata"] = {}
-
-    return result
+from app.services import ocr_service, qr_service
+from app.services.image_decode import decode_image
+from app.services.pdf_handle import open_pdf
+
+# --- Individual stages ---
+# Each stage returns the slice of the analysis dict it owns. They are
+# registered as analyzers (app.services.analyzers), which decide what runs
+# concurrently and merge the slices.
+
+def load_image(file_bytes: bytes) -> np.ndarray:
+    # Grayscale is all OCR and QR need; raises ImageRejected when over budget
+    return decode_image(file_bytes, mode="L")
+
+def run_ocr(img_np: np.ndarray) -> dict:
+    return {"ocr_text": ocr_service.extract_text(img_np)}
+
+def run_qr(img_np: np.ndarray) -> dict:
+    payloads = qr_service.decode_qr_codes(img_np)
+    return {"qr_payloads": payloads, "qr_detected": bool(payloads)}
+
+def run_exif(file_bytes: bytes) -> dict:
+    try:
+        tags = exifread.process_file(io.BytesIO(file_bytes))
+        return {"metadata": {k: str(v) for k, v in tags.items()}}
+    except Exception:
+        return {"metadata": {}}
+
+def run_pdf_text(file_bytes: bytes) -> dict:
+    # Parsed once per upload hash; the bot path reuses the same text layer
+    with open_pdf(file_bytes) as pdf:
+        return {
+            "ocr_text": pdf.text,
+            "qr_detected": False,
+            "metadata": {},
+            "pdf_pages": pdf.page_count,
+            "pdf_thumbnail_hash": pdf.thumbnail_hash,
+        }
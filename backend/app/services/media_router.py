@@ -1,36 +1,145 @@
+import asyncio
+import copy
+from app.core.deadline import current_deadline
+from app.core.profiling import profile_stage
 from app.utils.file_utils import detect_file_type
-from app.services.image_service import process_image_pdf
-from app.services.video_service import process_video
+from app.services import analyzers
 from app.services.decision_engine import make_decision
+from app.services.qr_service import certificate_urls
+from app.services.bot_service import verify_certificate
 
-async def route_media(file):
-    file_bytes = await file.read()
-    media_type = detect_file_type(file_bytes)
+UNSUPPORTED_RESULT = {
+    "mediaType": "unknown",
+    "analysis": None,
+    "decision": {
+        "status": "NOT_VERIFIED",
+        "confidence": 0.0,
+        "reasons": ["Unsupported file type"]
+    }
+}
 
-    if media_type in ["image", "pdf"]:
-        analysis = process_image_pdf(file_bytes, media_type)
-        decision = make_decision(media_type, analysis)
-        return {
-            "mediaType": media_type,
-            "analysis": analysis,
-            "decision": decision
-        }
+async def verify_qr_certificates(payloads: list) -> list:
+    """
+    Runs certificate URLs found in QR codes through the cached
+    verify_certificate path, so one upload also gives a linked online check.
+    `valid` is None for links that could not be checked.
+    """
+    urls = certificate_urls(payloads)
+    if not urls:
+        return []
 
-    if media_type == "video":
-        analysis = process_video(file_bytes)
-        decision = make_decision("video", analysis)
-        return {
-            "mediaType": "video",
-            "analysis": analysis,
-            "decision": decision
+    results = await asyncio.gather(*(verify_certificate(url) for url in urls), return_exceptions=True)
+    return [
+        {
+            "url": url,
+            "valid": _link_validity(res),
+            "provider": res.get("provider", "Unknown") if isinstance(res, dict) else "Unknown",
+            "details": res.get("details", "") if isinstance(res, dict) else "Certificate check failed."
         }
+        for url, res in zip(urls, results)
+    ]
 
-    return {
-        "mediaType": "unknown",
-        "analysis": None,
-        "decision": {
-            "status": "NOT_VERIFIED",
-            "confidence": 0.0,
-            "reasons": ["Unsupported file type"]
-        }
-    }
\ No newline at end of file
+def _link_validity(res):
+    """
+    True/False once the link was actually checked (page rules applied, or the
+    provider answered 404/410). None when the check itself failed (network
+    error, deadline cut): that says nothing about the certificate.
+    """
+    if not isinstance(res, dict) or res.get("partial"):
+        return None
+    if "structured_analysis" in res or res.get("not_found") or res.get("provider") == "Unknown":
+        return bool(res.get("valid"))
+    return None
+
+async def qr_certificates_stage(qr: dict):
+    """Analyzer for the linked online check; None when no QR code is a certificate URL."""
+    if not certificate_urls(qr.get("qr_payloads", [])):
+        return None
+    return {"qr_certificates": await verify_qr_certificates(qr["qr_payloads"])}
+
+async def _as_completed(jobs: dict, deadline=None, follow_up=None):
+    """
+    Run named coroutines concurrently and yield (name, result) as each one
+    finishes. `follow_up(name, result)` may return more named coroutines to
+    start (analyzers waiting on that result). Anything still running is
+    cancelled if the consumer stops early or the deadline runs out (those
+    stages are recorded as cut).
+    """
+    tasks = {asyncio.ensure_future(coro): name for name, coro in jobs.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = deadline.remaining() if deadline else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                for task in pending:
+                    deadline.cut(tasks[task])
+                break
+            for task in done:
+                result = task.result()
+                if follow_up:
+                    for name, coro in follow_up(tasks[task], result).items():
+                        new_task = asyncio.ensure_future(coro)
+                        tasks[new_task] = name
+                        pending.add(new_task)
+                yield tasks[task], result
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _mark_partial(decision: dict, deadline) -> dict:
+    """Flag a decision made without every stage (deadline hit or client gone)."""
+    if deadline.cut_stages:
+        decision["partial"] = True
+        decision["cut_stages"] = list(deadline.cut_stages)
+        reason = deadline.reason or "deadline exceeded"
+        decision["reasons"].append(f"Partial decision: {', '.join(deadline.cut_stages)} not completed ({reason})")
+    return decision
+
+async def iter_media_stages(file_bytes: bytes):
+    """
+    Verification pipeline as a stream of (stage, data) events.
+    The registered analyzers for the media type run as a dependency graph:
+    independent ones concurrently, each reported as soon as it finishes.
+    The last event is always ("result", <routing dict>).
+    """
+    deadline = current_deadline()
+    media_type = detect_file_type(file_bytes)
+    yield "file_type", {"mediaType": media_type}
+
+    if not analyzers.supports(media_type):
+        yield "result", copy.deepcopy(UNSUPPORTED_RESULT)
+        return
+
+    plan = analyzers.plan(media_type)
+    analysis = plan.empty_analysis()
+
+    def follow_up(name, result):
+        plan.record(name, result)
+        return plan.jobs(file_bytes)
+
+    # Errors (e.g. ImageRejected from decode) propagate; pending stages are cancelled
+    async for stage, data in _as_completed(plan.jobs(file_bytes), deadline, follow_up):
+        if data is None or not plan.reports(stage):
+            continue
+        analysis.update(data)
+        yield stage, data
+
+    decision = _mark_partial(make_decision(media_type, analysis), deadline)
+    yield "result", {
+        "mediaType": media_type,
+        "analysis": analysis,
+        "decision": decision
+    }
+
+async def route_media(file):
+    file_bytes = await file.read()
+    return await route_media_bytes(file_bytes)
+
+async def route_media_bytes(file_bytes: bytes):
+    result = None
+    async with profile_stage("route_media"):
+        async for stage, data in iter_media_stages(file_bytes):
+            if stage == "result":
+                result = data
+    return result
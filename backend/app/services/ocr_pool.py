@@ -0,0 +1,141 @@
+"""
+Shared OCR pool for multi-worker deployments.
+
+One process owns the Tesseract handles (OCR_WORKERS of them) and serves
+image_to_string calls over a Unix socket, so N web workers share one pool
+instead of each loading its own. Web workers use RemoteOCREngine, picked
+by create_engine() whenever OCR_SERVER_ADDRESS is set.
+
+Images cross the socket as one 8-bit grayscale array (what Tesseract
+binarises anyway), a third of an RGB frame and no PIL pickling. The pool
+is only worth it with tesserocr: the launcher does not start it otherwise.
+
+If the pool is unreachable (process died, being restarted by the launcher)
+RemoteOCREngine drops its connection, serves calls from a local engine and
+tries the pool again after RECONNECT_SECONDS.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core import config
+from app.core.metrics import metrics
+from app.services.ocr_service import OCREngine
+
+RECONNECT_SECONDS = 5.0
+# Connection-level failures: socket gone or refused, pool died mid-call, auth handshake
+_POOL_ERRORS = (OSError, EOFError, multiprocessing.ProcessError)
+
+
+def _wire_image(image) -> np.ndarray:
+    """Contiguous uint8 grayscale array: the cheapest form to pickle."""
+    if isinstance(image, Image.Image):
+        image = image if image.mode == "L" else image.convert("L")
+    array = np.asarray(image)
+    if array.ndim == 3:
+        array = cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY if array.shape[2] == 4 else cv2.COLOR_RGB2GRAY)
+    return np.ascontiguousarray(array, dtype=np.uint8)
+
+
+class _OCRManager(BaseManager):
+    pass
+
+
+def serve_ocr_pool(address: str, authkey: bytes, engine_factory=None):
+    """Process entry point: build the local engine and serve it until killed."""
+    from app.services.ocr_service import create_engine
+
+    # A pool restarted by the launcher is forked from the supervisor loop: drop its handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # The pool itself must use a local engine, never another remote one
+    config.OCR_SERVER_ADDRESS = ""
+    engine = (engine_factory or create_engine)()
+    _OCRManager.register("engine", callable=lambda: engine, exposed=("image_to_string",))
+    manager = _OCRManager(address=address, authkey=authkey)
+    print(f"[DEBUG] OCR pool ({engine.name}) listening on {address}")
+    manager.get_server().serve_forever()
+
+
+def start_ocr_pool(address: str, authkey: bytes, engine_factory=None):
+    """Start the pool process and wait until its socket exists."""
+    if os.path.exists(address):
+        os.remove(address)
+    process = multiprocessing.Process(
+        target=serve_ocr_pool, args=(address, authkey, engine_factory), name="ocr-pool", daemon=True
+    )
+    process.start()
+    for _ in range(200):
+        if os.path.exists(address) or not process.is_alive():
+            break
+        process.join(0.05)
+    if not process.is_alive():
+        raise RuntimeError("OCR pool process failed to start")
+    return process
+
+
+class RemoteOCREngine(OCREngine):
+    """Client side: forwards calls to the shared pool. Safe to use after fork."""
+
+    name = "remote"
+
+    def __init__(self, address: str, authkey: bytes, lang: str = "eng", psm: int = 3, fallback=None):
+        super().__init__(lang, psm)
+        self.address = address
+        self.authkey = authkey
+        self._lock = threading.Lock()
+        self._pid = None
+        self._engine = None
+        # Local engine factory used while the pool is down (built on first need)
+        self._fallback = fallback
+        self._local = None
+        self._retry_at = 0.0
+
+    def _proxy(self):
+        # Proxies use one connection per thread; rebuild after a fork
+        with self._lock:
+            if self._pid != os.getpid():
+                manager = _OCRManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._engine = manager.engine()
+                self._pid = os.getpid()
+            return self._engine
+
+    def _drop(self, error):
+        with self._lock:
+            self._pid = None
+            self._engine = None
+            self._retry_at = time.monotonic() + RECONNECT_SECONDS
+        metrics.increment("ocr.pool_fallback")
+        print(f"[WARNING] OCR pool unreachable ({error!r}), using a local engine")
+
+    def _local_engine(self) -> OCREngine:
+        with self._lock:
+            if self._local is None:
+                if self._fallback is not None:
+                    self._local = self._fallback()
+                else:
+                    from app.services import ocr_service
+                    # Same choice as "auto" without a pool: never "remote" again
+                    local = "tesserocr" if ocr_service.tesserocr is not None else "pytesseract"
+                    self._local = ocr_service.create_engine(local)
+            return self._local
+
+    def image_to_string(self, image, psm: int = None) -> str:
+        if time.monotonic() >= self._retry_at:
+            try:
+                return self._proxy().image_to_string(_wire_image(image), psm)
+            except _POOL_ERRORS as e:
+                self._drop(e)
+        return self._local_engine().image_to_string(image, psm)
+
+
+_OCRManager.register("engine")
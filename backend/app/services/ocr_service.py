@@ -0,0 +1,225 @@
+"""
+OCR service layer.
+
+Wraps the OCR backend behind a small engine interface so callers do not care
+whether text comes from an in-process Tesseract API (tesserocr) or from the
+pytesseract CLI wrapper, and adds region-of-interest OCR: text blocks are
+located with a cheap OpenCV pass and only the blocks that certificate rules
+need (title, recipient name, certificate ID / verify URL) are recognised.
+"""
+import queue
+import threading
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from app.core import config
+from app.core.deadline import current_deadline
+
+try:
+    import tesserocr
+except ImportError:  # Optional dependency
+    tesserocr = None
+
+# Single text line, used for cropped regions
+PSM_SINGLE_LINE = 7
+
+
+class OCREngine:
+    """Base interface for OCR providers."""
+
+    name = "base"
+
+    def __init__(self, lang: str = "eng", psm: int = 3):
+        self.lang = lang
+        self.psm = psm
+
+    def image_to_string(self, image, psm: int = None) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Persistent in-process Tesseract.
+    Keeps a pool of initialised PyTessBaseAPI handles, so no process is forked
+    and no temp files are written per call. Each handle is used by one thread
+    at a time.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", psm: int = 3, workers: int = 2):
+        super().__init__(lang, psm)
+        self._handles = queue.Queue()
+        for _ in range(max(workers, 1)):
+            self._handles.put(tesserocr.PyTessBaseAPI(lang=lang, psm=psm))
+
+    def image_to_string(self, image, psm: int = None) -> str:
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+
+        api = self._handles.get()
+        try:
+            api.SetPageSegMode(psm if psm is not None else self.psm)
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self._handles.put(api)
+
+    def close(self):
+        while not self._handles.empty():
+            self._handles.get_nowait().End()
+
+
+class PytesseractEngine(OCREngine):
+    """Fallback engine: forks the tesseract binary on every call."""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image, psm: int = None) -> str:
+        psm = psm if psm is not None else self.psm
+        return pytesseract.image_to_string(image, lang=self.lang, config=f"--psm {psm}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def create_engine(name: str = None) -> OCREngine:
+    """
+    Build an engine from config. 'auto' uses the shared OCR pool when
+    OCR_SERVER_ADDRESS is set, otherwise prefers tesserocr when installed.
+    """
+    name = name or config.OCR_ENGINE
+    if name == "auto" and config.OCR_SERVER_ADDRESS:
+        name = "remote"
+    if name == "auto":
+        if tesserocr is None:
+            print("[WARNING] tesserocr not installed (see requirements.txt), every OCR call forks tesseract")
+        name = "tesserocr" if tesserocr is not None else "pytesseract"
+
+    options = config.OCR_ENGINE_OPTIONS.get(name, {})
+    lang = options.get("lang", config.OCR_LANG)
+    psm = options.get("psm", config.OCR_PSM)
+
+    if name == "remote":
+        from app.services.ocr_pool import RemoteOCREngine
+        return RemoteOCREngine(config.OCR_SERVER_ADDRESS, config.OCR_SERVER_AUTHKEY.encode(), lang, psm)
+
+    if name == "tesserocr":
+        if tesserocr is None:
+            print("[WARNING] tesserocr not installed, falling back to pytesseract")
+            return PytesseractEngine(lang, psm)
+        return TesserocrEngine(lang, psm, workers=config.OCR_WORKERS)
+
+    return PytesseractEngine(lang, psm)
+
+
+def get_ocr_engine() -> OCREngine:
+    """Process-wide engine, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine()
+    return _engine
+
+
+# --- Region-of-interest OCR ---
+
+def detect_text_regions(gray: np.ndarray, max_width: int = 1200) -> list:
+    """
+    Locate text lines with a morphological gradient pass.
+    Returns (x, y, w, h) boxes in original image coordinates, top-to-bottom.
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, max_width / float(width))
+    small = gray
+    if scale < 1.0:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, kernel)
+    _, binary = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Smear horizontally so characters of one line join into a single blob
+    line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1))
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, line_kernel)
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    small_h = small.shape[0]
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 6 or w < 12 or h > small_h * 0.5:
+            continue
+        fill = cv2.countNonZero(binary[y:y + h, x:x + w]) / float(w * h)
+        if fill < 0.2:
+            continue
+        boxes.append((
+            int(x / scale), int(y / scale),
+            int(round(w / scale)), int(round(h / scale)),
+        ))
+
+    return sorted(boxes, key=lambda b: (b[1], b[0]))
+
+
+def select_certificate_regions(boxes: list, image_height: int, max_regions: int = 6) -> list:
+    """
+    Pick the blocks certificate rules need:
+    - the largest type on the page (title and recipient name)
+    - the footer lines (certificate ID / verification URL)
+    """
+    if len(boxes) <= max_regions:
+        return list(boxes)
+
+    chosen = sorted(boxes, key=lambda b: b[3], reverse=True)[:3]
+    footer = [b for b in boxes if b[1] > image_height * 0.7 and b not in chosen]
+    footer.sort(key=lambda b: b[1], reverse=True)
+    chosen += footer[:max_regions - len(chosen)]
+
+    return sorted(chosen, key=lambda b: (b[1], b[0]))
+
+
+def ocr_regions(image, boxes: list, engine: OCREngine = None, pad: int = 4) -> str:
+    """OCR each box as a single text line and join the results top-to-bottom."""
+    engine = engine or get_ocr_engine()
+    img_np = np.asarray(image)
+    height, width = img_np.shape[:2]
+
+    # Runs in a worker thread; the request deadline is visible via contextvars
+    deadline = current_deadline()
+    lines = []
+    for x, y, w, h in boxes:
+        if deadline.expired():
+            break
+        crop = img_np[max(y - pad, 0):min(y + h + pad, height), max(x - pad, 0):min(x + w + pad, width)]
+        text = engine.image_to_string(crop, psm=PSM_SINGLE_LINE).strip()
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def extract_text(image, mode: str = None, engine: OCREngine = None) -> str:
+    """
+    OCR entry point used by image_service (mode defaults to OCR_MODE, "full").
+    In "regions" mode only the certificate blocks are recognised; if no text
+    blocks are found we fall back to a full-page pass.
+    """
+    mode = mode or config.OCR_MODE
+    engine = engine or get_ocr_engine()
+
+    if mode == "regions":
+        img_np = np.asarray(image)
+        gray = img_np if img_np.ndim == 2 else cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
+        boxes = detect_text_regions(gray)
+        if boxes:
+            regions = select_certificate_regions(boxes, gray.shape[0])
+            return ocr_regions(img_np, regions, engine=engine)
+
+    return engine.image_to_string(image)
@@ -0,0 +1,195 @@
+"""
+PDF handle: parse an upload once, share the results.
+
+The upload is wrapped without copying (bytes are handed to pdfium as-is,
+files are memory-mapped) and parsed with pdfium a single time. The text
+layer, the page count and a thumbnail of the first page (with a
+difference hash for near-duplicate / forensic checks) are cached by
+content hash, so /api/verify and the bot path reuse each other's work.
+For the model, only the pages that matter are cut out into a smaller PDF.
+
+pdfium is not thread-safe, not even across separate documents, so every
+call into it goes through one process-wide lock.
+"""
+import ctypes
+import hashlib
+import io
+import mmap
+import threading
+
+import cv2
+import numpy as np
+import pypdfium2 as pdfium
+
+from app.core import config
+from app.core.metrics import metrics
+from app.utils.cache import TTLCache
+
+# digest -> {"page_count", "pages_text", "thumbnail", "thumbnail_hash"}
+_parsed = TTLCache(max_entries=config.PDF_CACHE_MAX_ENTRIES, ttl_seconds=config.PDF_CACHE_TTL_SECONDS)
+# Serialises all pdfium access (open, parse, page import, close)
+_pdfium_lock = threading.RLock()
+
+
+def difference_hash(gray: np.ndarray, size: int = 8) -> str:
+    """64-bit dHash as hex; close images differ in only a few bits."""
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):0{size * size // 4}x}"
+
+
+class PDFHandle:
+    def __init__(self, data, digest: str = None):
+        self.data = data
+        self._digest = digest
+        self._doc = None
+        self._mmap = None
+        self._closed = False
+
+    @property
+    def digest(self) -> str:
+        # Hashed on first use, i.e. in the worker thread that parses, not on the event loop
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    @classmethod
+    def open(cls, source):
+        """bytes / bytearray are used in place; a path or file object is memory-mapped."""
+        if isinstance(source, (bytes, bytearray)):
+            return cls(source)
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_COPY)
+        handle = cls(mapped)
+        handle._mmap = mapped
+        return handle
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the document and mapping. Blocks while another thread is in pdfium."""
+        with _pdfium_lock:
+            self._closed = True
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def _document(self):
+        # Callers hold _pdfium_lock
+        if self._closed:
+            raise ValueError("PDF handle is closed")
+        if self._doc is None:
+            data = self.data
+            if not isinstance(data, bytes):
+                # pdfium takes bytes or a ctypes array; view mmap / bytearray
+                # memory in place (copy-on-write map, so it is writable)
+                data = (ctypes.c_char * len(data)).from_buffer(data)
+            self._doc = pdfium.PdfDocument(data)
+        return self._doc
+
+    def _info(self) -> dict:
+        info = _parsed.get(self.digest)
+        if info is not None:
+            return info
+        with _pdfium_lock:
+            info = _parsed.get(self.digest)
+            if info is None:
+                info = self._parse()
+                _parsed.set(self.digest, info)
+        return info
+
+    def _parse(self) -> dict:
+        # Callers hold _pdfium_lock
+        metrics.increment("pdf.parsed")
+        doc = self._document()
+        pages_text = []
+        for page in doc:
+            textpage = page.get_textpage()
+            pages_text.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+
+        thumbnail = None
+        if len(doc):
+            page = doc[0]
+            width, height = page.get_size()
+            scale = config.PDF_THUMBNAIL_MAX_SIDE / max(width, height, 1)
+            thumbnail = page.render(scale=scale, grayscale=True).to_numpy().copy()
+            page.close()
+
+        return {
+            "page_count": len(doc),
+            "pages_text": pages_text,
+            "thumbnail": thumbnail,
+            "thumbnail_hash": difference_hash(thumbnail) if thumbnail is not None else None,
+        }
+
+    # --- Cached views ---
+
+    @property
+    def page_count(self) -> int:
+        return self._info()["page_count"]
+
+    @property
+    def pages_text(self) -> list:
+        return self._info()["pages_text"]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(t.strip() for t in self.pages_text if t.strip())
+
+    @property
+    def thumbnail(self):
+        """First page, grayscale, longest side PDF_THUMBNAIL_MAX_SIDE."""
+        return self._info()["thumbnail"]
+
+    @property
+    def thumbnail_hash(self):
+        return self._info()["thumbnail_hash"]
+
+    # --- Pages for the model ---
+
+    def relevant_pages(self, keywords: list, max_pages: int = None) -> list:
+        """Pages with the most keyword hits (first page if none), in document order."""
+        max_pages = max_pages or config.PDF_AI_MAX_PAGES
+        if not self.page_count:
+            return []
+        lowered = [k.lower() for k in keywords]
+        hits = [sum(1 for k in lowered if k in text.lower()) for text in self.pages_text]
+        ranked = sorted(range(len(hits)), key=lambda i: (-hits[i], i))
+        pages = [i for i in ranked[:max_pages] if hits[i]] or [0]
+        return sorted(pages)
+
+    def page_subset(self, pages: list) -> bytes:
+        """A PDF with only `pages`; the original bytes when that is every page."""
+        if sorted(pages) == list(range(self.page_count)):
+            return bytes(self.data)
+        with _pdfium_lock:
+            subset = pdfium.PdfDocument.new()
+            try:
+                subset.import_pages(self._document(), pages)
+                buf = io.BytesIO()
+                subset.save(buf)
+            finally:
+                subset.close()
+        metrics.increment("pdf.subset_pages_sent", len(pages))
+        return buf.getvalue()
+
+
+def open_pdf(source) -> PDFHandle:
+    return PDFHandle.open(source)
+
+
+def close_soon(handle: PDFHandle):
+    """Close from a short-lived thread, so an event-loop caller never waits on the pdfium lock."""
+    threading.Thread(target=handle.close, name="pdf-close", daemon=True).start()
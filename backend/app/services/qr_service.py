@@ -0,0 +1,89 @@
+"""
+Multi-scale QR detection.
+
+Tries a cheap downscaled pass first and only escalates to full resolution and
+then to overlapping tiles when nothing was decoded, so large photos stay fast
+and small codes are still found.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from app.services.verification_rules import VerificationRules
+
+# Longest side used for the first (cheap) pass
+QR_FAST_MAX_SIDE = 1000
+# Tile grid used for the last-resort pass on large images
+QR_TILE_GRID = 2
+QR_TILE_OVERLAP = 0.2
+
+# cv2 detectors keep internal state, so each thread gets its own
+_local = threading.local()
+
+
+def _detector():
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = cv2.QRCodeDetector()
+        _local.detector = detector
+    return detector
+
+
+def _decode(img: np.ndarray) -> list:
+    try:
+        ok, decoded, _, _ = _detector().detectAndDecodeMulti(img)
+    except cv2.error:
+        return []
+    if not ok:
+        return []
+    return [d for d in decoded if d]
+
+
+def _tiles(img: np.ndarray):
+    height, width = img.shape[:2]
+    tile_h = int(height / QR_TILE_GRID * (1 + QR_TILE_OVERLAP))
+    tile_w = int(width / QR_TILE_GRID * (1 + QR_TILE_OVERLAP))
+    for row in range(QR_TILE_GRID):
+        for col in range(QR_TILE_GRID):
+            y = min(int(row * height / QR_TILE_GRID), height - tile_h)
+            x = min(int(col * width / QR_TILE_GRID), width - tile_w)
+            yield img[max(y, 0):y + tile_h, max(x, 0):x + tile_w]
+
+
+def decode_qr_codes(img: np.ndarray) -> list:
+    """
+    Returns the list of distinct decoded payloads (possibly empty).
+    Accepts grayscale or RGB arrays.
+    """
+    height, width = img.shape[:2]
+    longest = max(height, width)
+
+    if longest <= QR_FAST_MAX_SIDE:
+        return list(dict.fromkeys(_decode(img)))
+
+    # 1. Downscaled pass
+    scale = QR_FAST_MAX_SIDE / float(longest)
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    payloads = _decode(small)
+
+    # 2. Full resolution
+    if not payloads:
+        payloads = _decode(img)
+
+    # 3. Overlapping tiles (small codes on large images)
+    if not payloads:
+        for tile in _tiles(img):
+            payloads.extend(_decode(tile))
+
+    return list(dict.fromkeys(payloads))
+
+
+def certificate_urls(payloads: list) -> list:
+    """Payloads that are Udemy/Coursera certificate URLs."""
+    urls = []
+    for payload in payloads:
+        is_valid, _, _ = VerificationRules.validate_url(payload)
+        if is_valid:
+            urls.append(payload.strip())
+    return urls
@@ -0,0 +1,174 @@
+"""
+Outbound request scheduler for certificate scraping.
+
+- Per-host token buckets so a burst of verifications does not hammer
+  udemy.com / coursera.org and get us throttled.
+- A priority queue per host (interactive checks before background ones).
+- Coalescing: identical pending fetches share one request.
+- Adaptive backoff: 429 (and 403 from the browser tier) halve the host
+  rate and pause it briefly, successes recover the rate step by step.
+  A 403 on the static tier is the provider's bot wall, which the browser
+  fallback exists to get past; slowing the host would only delay it.
+- Queue wait and fetch time are reported separately.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from urllib.parse import urlsplit
+
+from app.core import config
+from app.core.metrics import metrics
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+THROTTLE_STATUSES = {429}
+# Per job kind, where it differs from THROTTLE_STATUSES
+KIND_THROTTLE_STATUSES = {"browser": {403, 429}}
+
+
+class TokenBucket:
+    """Token bucket with adaptive rate and a block window for backoff."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now: float = None) -> float:
+        """Take a token. Returns 0.0 on success, otherwise seconds to wait."""
+        now = time.monotonic() if now is None else now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def penalize(self, now: float = None):
+        """Host answered 429/403: slow down and pause."""
+        now = time.monotonic() if now is None else now
+        self.strikes = min(self.strikes + 1, 4)
+        self.rate = self.base_rate / (2 ** self.strikes)
+        backoff = min(config.SCRAPE_BACKOFF_BASE_SECONDS * 2 ** (self.strikes - 1), config.SCRAPE_BACKOFF_MAX_SECONDS)
+        self.blocked_until = now + backoff
+        self.tokens = 0
+        self.updated = now
+
+    def reward(self):
+        """Successful response: recover one step of the rate."""
+        if self.strikes:
+            self.strikes -= 1
+            self.rate = self.base_rate / (2 ** self.strikes)
+
+
+class _HostQueue:
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.heap = []
+        self.in_flight = 0
+        self.timer = None
+
+
+class OutboundScheduler:
+    def __init__(self, rate_per_host: float = None, burst: float = None, max_in_flight: int = None):
+        self.rate_per_host = rate_per_host or config.SCRAPE_RATE_PER_HOST
+        self.burst = burst or config.SCRAPE_BURST
+        self.max_in_flight = max_in_flight or config.SCRAPE_MAX_IN_FLIGHT_PER_HOST
+        self._hosts = {}
+        self._pending = {}
+        self._seq = itertools.count()
+
+    def _host(self, host: str) -> _HostQueue:
+        if host not in self._hosts:
+            self._hosts[host] = _HostQueue(self.rate_per_host, self.burst)
+        return self._hosts[host]
+
+    def queue_depth(self) -> dict:
+        return {host: len(q.heap) for host, q in self._hosts.items() if q.heap}
+
+    async def submit(self, url: str, fetch, priority: int = PRIORITY_INTERACTIVE, kind: str = "page"):
+        """
+        Schedule `await fetch(url)`, which must return (status, payload).
+        Returns (status, payload, timing) where timing has queue_ms / fetch_ms.
+        """
+        key = (kind, url)
+        pending = self._pending.get(key)
+        if pending is not None:
+            metrics.increment("scrape.coalesced")
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+
+        host = urlsplit(url).hostname or ""
+        job = (priority, next(self._seq), url, fetch, future, time.monotonic(), key)
+        heapq.heappush(self._host(host).heap, job)
+        self._pump(host)
+
+        # Shield so one caller giving up does not cancel a fetch others wait on
+        return await asyncio.shield(future)
+
+    def _pump(self, host: str):
+        queue = self._hosts[host]
+        # At most one wake-up per host: a newer pump replaces a pending one
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        loop = asyncio.get_running_loop()
+
+        while queue.heap and queue.in_flight < self.max_in_flight:
+            wait = queue.bucket.try_acquire()
+            if wait > 0:
+                queue.timer = loop.call_later(wait, self._pump, host)
+                return
+            job = heapq.heappop(queue.heap)
+            queue.in_flight += 1
+            loop.create_task(self._run(host, job))
+
+    async def _run(self, host: str, job):
+        _, _, url, fetch, future, enqueued, key = job
+        queue = self._hosts[host]
+        started = time.monotonic()
+        queue_wait = started - enqueued
+        metrics.observe("scrape.queue_wait", queue_wait)
+
+        try:
+            status, payload = await fetch(url)
+            fetch_time = time.monotonic() - started
+            metrics.observe("scrape.fetch", fetch_time)
+
+            if status in KIND_THROTTLE_STATUSES.get(key[0], THROTTLE_STATUSES):
+                metrics.increment("scrape.throttled")
+                queue.bucket.penalize()
+            elif status is not None and status < 400:
+                queue.bucket.reward()
+
+            timing = {"queue_ms": round(queue_wait * 1000, 1), "fetch_ms": round(fetch_time * 1000, 1)}
+            if not future.done():
+                future.set_result((status, payload, timing))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            # Cancelled fetch (or anything else that escaped): release coalesced waiters
+            if not future.done():
+                future.cancel()
+            self._pending.pop(key, None)
+            queue.in_flight -= 1
+            if queue.timer is None:
+                self._pump(host)
+
+
+scheduler = OutboundScheduler()
@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.core import config
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with per-entry expiry.
+    Used for URL verification results and other repeatable lookups.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    TTLCache-compatible cache backed by one SQLite file, so every worker
+    process sees the same entries. Values are stored as JSON. Connections are
+    opened lazily per process and thread (safe across fork). Reads never
+    write: when full, the oldest-written entries are evicted. Any database
+    error is treated as a miss, a cache must never fail a request.
+    """
+
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT, key TEXT, expires_at REAL, written_at REAL, value TEXT,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_written ON cache (namespace, written_at)")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def get(self, key, default=None):
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared cache read failed: {e}")
+            return default
+        if row is None or row[1] < time.time():
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, str(key), now + ttl, now, json.dumps(value, default=str))
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared cache write failed: {e}")
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY written_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"[WARNING] Shared cache clear failed: {e}")
+
+    def __len__(self):
+        try:
+            return self._conn().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at >= ?",
+                (self.namespace, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+def make_cache(namespace: str, max_entries: int, ttl_seconds: float):
+    """Shared SQLite cache when SHARED_CACHE_PATH is set (multi-worker), else in-process."""
+    if config.SHARED_CACHE_PATH:
+        return SQLiteCache(config.SHARED_CACHE_PATH, namespace, max_entries, ttl_seconds)
+    return TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
@@ -2,7 +2,7 @@ import filetype
 
 def detect_file_type(file_bytes: bytes) -> str:
     """
-    Detects whether the uploaded file is an image, pdf, or video.
+    Detects whether the uploaded file is an image, pdf, video or audio.
     """
     kind = filetype.guess(file_bytes)
 
@@ -20,4 +20,8 @@ def detect_file_type(file_bytes: bytes) -> str:
     if mime.startswith("video"):
         return "video"
 
+    # MIDI is a score, not a recording
+    if mime.startswith("audio") and mime != "audio/midi":
+        return "audio"
+
     return "unknown"
@@ -0,0 +1,38 @@
+from app.core.responses import dumps
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Event."""
+    payload = dumps(data).decode("utf-8")
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def stage_event_stream(request, stages, on_close=None):
+    """
+    Turn a (stage, data) async generator into SSE text.
+    Stage events are sent as `event: stage`, the final one as `event: result`.
+    Stops (and closes the pipeline, cancelling pending work) as soon as the
+    client disconnects. `on_close()` runs once the stream is finished.
+    """
+    try:
+        async for stage, data in stages:
+            if await request.is_disconnected():
+                print("[DEBUG] Client disconnected, cancelling pipeline")
+                break
+            if stage == "result":
+                yield format_sse("result", data)
+            else:
+                yield format_sse("stage", {"stage": stage, "data": data})
+    except Exception as e:
+        print(f"[ERROR] Streaming pipeline failed: {e}")
+        yield format_sse("error", {"detail": str(e)})
+    finally:
+        await stages.aclose()
+        if on_close:
+            on_close()
@@ -0,0 +1,51 @@
+"""
+Audio analysis benchmark: throughput and peak memory on multi-minute WAV files.
+
+Usage: python tests/bench_audio.py [minutes ...]   (default: 1 5 15)
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import time
+import tracemalloc
+import wave
+import numpy as np
+from app.services.audio_service import analyze_audio
+
+SR = 44100
+
+
+def write_wav(path, minutes):
+    """Voice-like test signal, written a minute at a time."""
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(SR)
+        for minute in range(int(minutes)):
+            t = np.arange(SR * 60) / SR + minute * 60
+            tone = sum(0.15 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 20))
+            x = tone * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) ** 2 + 0.003 * rng.standard_normal(len(t))
+            pcm = (np.clip(x, -1, 1) * 32767).astype("<i2")
+            w.writeframes(np.repeat(pcm[:, None], 2, axis=1).tobytes())
+
+
+if __name__ == "__main__":
+    minutes_list = [float(m) for m in sys.argv[1:]] or [1, 5, 15]
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in minutes_list:
+            path = os.path.join(tmp, f"{minutes}.wav")
+            write_wav(path, minutes)
+            size_mb = os.path.getsize(path) / 1e6
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = analyze_audio(path)
+            elapsed = time.perf_counter() - start
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            print(f"{minutes:>5g} min  {size_mb:7.1f} MB  {elapsed:6.2f}s  "
+                  f"({result['duration_seconds'] / elapsed:6.0f}x realtime)  peak {peak_mb:5.1f} MB")
@@ -0,0 +1,118 @@
+"""
+Decision engine benchmark: the hand-written image rules the table engine
+replaced vs per-call make_decision vs one score_batch call. Outputs are
+checked to match before timing.
+
+Usage: python tests/bench_decision.py [count]
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import gc
+import random
+import time
+from app.services.decision_engine import get_engine, make_decision
+
+TERMS = ["warped edges", "checkerboard", "plastic-like", "mismatched light", "grid-like artifacts"]
+
+
+INDICATORS = [
+    "over-smoothing", "plastic-like", "inconsistent sharpness",
+    "warped edges", "unnatural transitions", "asymmetric shapes",
+    "mismatched light", "inconsistent reflections", "implausible details",
+    "checkerboard", "grid-like artifacts", "repeating micro-patterns",
+    "abrupt texture boundaries", "inconsistent proportions"
+]
+
+
+def legacy_image_decision(analysis):
+    """Image branch of make_decision before the table engine, for comparison."""
+    score = 0
+    reasons = []
+
+    forensic_report = analysis.get("forensic_report", "")
+    if forensic_report:
+        detected_indicators = []
+        for indicator in INDICATORS:
+            if indicator.lower() in forensic_report.lower():
+                score += 15
+                detected_indicators.append(indicator)
+        if detected_indicators:
+            reasons.append(f"Forensic anomalies detected ({len(detected_indicators)})")
+
+    if analysis.get("qr_detected"):
+        score += 40
+        reasons.append("QR code detected")
+
+    qr_certificates = analysis.get("qr_certificates", [])
+    if qr_certificates:
+        valid_links = [c for c in qr_certificates if c.get("valid")]
+        if valid_links:
+            score += 20
+            reasons.append(f"QR code links to a valid {valid_links[0]['provider']} certificate")
+        else:
+            score -= 20
+            reasons.append("QR certificate link could not be verified")
+
+    ocr_text = analysis.get("ocr_text", "")
+    if ocr_text and len(ocr_text) > 100:
+        score += 30
+        reasons.append("Readable text extracted")
+
+    if analysis.get("metadata", {}):
+        score += 10
+        reasons.append("Metadata present")
+
+    if score >= 70:
+        status = "VERIFIED"
+    elif score >= 40:
+        status = "SUSPICIOUS"
+    else:
+        status = "NOT_VERIFIED"
+    return {"status": status, "confidence": round(score / 100, 2), "reasons": reasons}
+
+
+def timed(fn, analyses):
+    gc.disable()  # result lists are the same size for every contender
+    try:
+        start = time.perf_counter()
+        fn(analyses)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def make_analyses(count):
+    random.seed(0)
+    analyses = []
+    for _ in range(count):
+        report = " ".join(random.sample(TERMS, random.randint(0, 3))) + " " + "lorem ipsum " * 40
+        analyses.append({
+            "forensic_report": report,
+            "qr_detected": random.random() < 0.5,
+            "qr_certificates": [{"valid": random.random() < 0.7, "provider": "Udemy"}] if random.random() < 0.3 else [],
+            "ocr_text": "x" * random.randint(0, 300),
+            "metadata": {"Image Make": "Canon"} if random.random() < 0.5 else {},
+        })
+    return analyses
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    analyses = make_analyses(count)
+    engine = get_engine()
+    assert [legacy_image_decision(a) for a in analyses[:1000]] == engine.score_batch("image", analyses[:1000])
+
+    runs = {
+        "legacy rules": lambda items: [legacy_image_decision(a) for a in items],
+        "make_decision loop": lambda items: [make_decision("image", a) for a in items],
+        "score_batch": lambda items: engine.score_batch("image", items),
+    }
+    print(f"{count} decisions")
+    baseline = None
+    for name, run in runs.items():
+        elapsed = min(timed(run, analyses) for _ in range(5))
+        baseline = baseline or elapsed
+        print(f"{name:<19}: {elapsed:.3f}s  ({elapsed / count * 1e6:.1f} us/decision, "
+              f"{baseline / elapsed:.2f}x legacy)")
@@ -0,0 +1,40 @@
+"""
+OCR benchmark: per-call pytesseract fork vs the ocr_service engine.
+
+Usage: python tests/bench_ocr.py [image_path] [iterations]
+Needs the tesseract binary; tesserocr is used when installed.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import numpy as np
+import pytesseract
+from PIL import Image
+from app.services import ocr_service
+from test_ocr_service import make_certificate_image
+
+
+def bench(label, fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"{label:<40} {elapsed * 1000:8.1f} ms/call")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        img = np.array(Image.open(sys.argv[1]).convert("RGB"))
+    else:
+        img = make_certificate_image()
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    engine = ocr_service.create_engine()
+    print(f"Engine: {engine.name}, image: {img.shape[1]}x{img.shape[0]}")
+
+    bench("pytesseract.image_to_string (baseline)", lambda: pytesseract.image_to_string(img), iterations)
+    bench(f"{engine.name} full page", lambda: ocr_service.extract_text(img, mode="full", engine=engine), iterations)
+    bench(f"{engine.name} regions", lambda: ocr_service.extract_text(img, mode="regions", engine=engine), iterations)
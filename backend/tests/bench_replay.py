@@ -0,0 +1,138 @@
+"""
+End-to-end certificate verification benchmark, fully offline.
+
+Certificate pages come from the replay server (tests/recordings), Gemini is
+FakeGenAIClient with a fixed latency, so numbers only move when our code
+does. Every round starts from empty result and AI caches.
+
+The recordings are currently synthetic (hand-written to match our
+selectors), so these numbers measure our own overhead, not fast-path
+behaviour on real provider pages; the standalone run says so.
+
+With pytest-benchmark installed:
+    python -m pytest tests/bench_replay.py --benchmark-only
+Without it (prints p50/p95 latency and throughput):
+    python tests/bench_replay.py [rounds]
+
+BENCH_HTTP_LATENCY, BENCH_BROWSER_LATENCY and BENCH_AI_LATENCY (seconds)
+set the simulated page, render and model latencies.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import importlib.util
+import statistics
+import time
+import pytest
+from app.services import bot_service
+from fake_genai import FakeGenAIClient
+from replay import ReplayServer, install
+from test_pdf_handle import make_pdf
+
+HTTP_LATENCY = float(os.getenv("BENCH_HTTP_LATENCY", "0.02"))
+BROWSER_LATENCY = float(os.getenv("BENCH_BROWSER_LATENCY", "0.2"))
+AI_LATENCY = float(os.getenv("BENCH_AI_LATENCY", "0.05"))
+CONCURRENCY = 32
+
+STATIC_URL = "https://www.udemy.com/certificate/UC-3f1c9a52-8d4e-4b7a-9c61-2e0f5a7b8c90/"
+JS_URL = "https://www.udemy.com/certificate/UC-9b2e7d04-61a3-4f0e-b8d2-7c5e1a9f3d26/"
+COURSERA_URL = "https://www.coursera.org/account/accomplishments/verify/K7QXH2M9PLRT"
+PDF = make_pdf(["Certificate of Completion Udemy Instructor UC-3f1c9a52 Priya Raman"])
+
+
+class Harness:
+    """One replay server, fake client and event loop shared by all rounds."""
+
+    def __init__(self, monkeypatch):
+        self.server = ReplayServer(latency=HTTP_LATENCY, browser_latency=BROWSER_LATENCY).start()
+        self.client = FakeGenAIClient(latency=AI_LATENCY)
+        self.gateway = install(monkeypatch, self.server, self.client)
+        # One loop, so the pooled HTTP client keeps its connections between rounds
+        self.loop = asyncio.new_event_loop()
+
+    def run(self, coro_fn):
+        bot_service.certificate_cache.clear()
+        self.gateway.cache.clear()
+        return self.loop.run_until_complete(coro_fn())
+
+    def close(self):
+        self.loop.close()
+        self.server.stop()
+
+
+def verify(url):
+    return lambda: bot_service.verify_certificate(url)
+
+
+def upload_pdf():
+    return bot_service.analyze_file_upload(PDF)
+
+
+def burst():
+    urls = [STATIC_URL, JS_URL, COURSERA_URL]
+
+    async def main():
+        return await asyncio.gather(*(
+            bot_service.verify_certificate(urls[i % len(urls)]) for i in range(CONCURRENCY)
+        ))
+    return main()
+
+
+SCENARIOS = {
+    "verify_static": verify(STATIC_URL),
+    "verify_browser": verify(JS_URL),
+    "verify_coursera": verify(COURSERA_URL),
+    "upload_pdf": upload_pdf,
+    f"burst_{CONCURRENCY}": burst,
+}
+
+
+# --- pytest-benchmark suite ---
+
+pytestmark = pytest.mark.skipif(importlib.util.find_spec("pytest_benchmark") is None,
+                                reason="pytest-benchmark not installed")
+
+
+@pytest.fixture
+def harness(monkeypatch):
+    h = Harness(monkeypatch)
+    yield h
+    h.close()
+
+
+@pytest.mark.parametrize("name", list(SCENARIOS))
+def test_replay(benchmark, harness, name):
+    result = benchmark(harness.run, SCENARIOS[name])
+    results = result if isinstance(result, list) else [result]
+    assert all(r.get("valid", True) and not r.get("partial") for r in results)
+
+
+# --- Standalone ---
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"http {HTTP_LATENCY * 1000:.0f} ms, browser {BROWSER_LATENCY * 1000:.0f} ms, "
+          f"ai {AI_LATENCY * 1000:.0f} ms, {rounds} rounds")
+    with pytest.MonkeyPatch.context() as mp:
+        h = Harness(mp)
+        if h.server.synthetic:
+            print(f"[WARNING] {len(h.server.synthetic)} of {len(h.server.recordings)} pages are synthetic "
+                  f"fixtures, not provider captures (tests/recordings/README.md)")
+        try:
+            for name, scenario in SCENARIOS.items():
+                h.run(scenario)  # warm-up: imports, pdfium, connection pool
+                times = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    h.run(scenario)
+                    times.append(time.perf_counter() - start)
+                times.sort()
+                per_round = CONCURRENCY if name.startswith("burst") else 1
+                print(f"{name:<16} p50 {statistics.median(times) * 1000:7.1f} ms  "
+                      f"p95 {times[min(len(times) - 1, int(len(times) * 0.95))] * 1000:7.1f} ms  "
+                      f"{per_round * len(times) / sum(times):7.1f} req/s")
+            print(f"model calls: {len(h.client.models.calls)}")
+        finally:
+            h.close()
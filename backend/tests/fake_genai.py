@@ -0,0 +1,77 @@
+"""
+Local stand-in for google.genai.Client used by tests.
+Mirrors the small surface we use: client.models.generate_content(...).text
+
+Latency and failures are configurable so benchmarks and resilience tests
+are repeatable offline:
+    latency      seconds per call, or a callable (model, contents) -> seconds
+    fail_every   every Nth call raises (deterministic)
+    error_rate   fraction of calls that raise, drawn from a seeded RNG
+    error        exception factory (model, contents) -> Exception
+"""
+import json
+import random
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    """Shaped like the SDK's server errors: a status code and a message."""
+
+    def __init__(self, code: int = 503, message: str = "The model is overloaded. Please try again later."):
+        super().__init__(f"{code} UNAVAILABLE. {message}")
+        self.code = code
+
+
+def default_error(model, contents):
+    return FakeAPIError()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, responder, latency=0.0, fail_every: int = 0, error_rate: float = 0.0,
+                 seed: int = 0, error=default_error):
+        self._responder = responder
+        self._latency = latency
+        self._fail_every = fail_every
+        self._error_rate = error_rate
+        self._error = error
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = []
+        self.failures = 0
+
+    def generate_content(self, model, contents):
+        # Failure decisions are taken under the lock, in call order, so a run is reproducible
+        with self._lock:
+            self.calls.append({"model": model, "contents": contents})
+            n = len(self.calls)
+            fail = (self._fail_every and n % self._fail_every == 0) or \
+                (self._error_rate and self._rng.random() < self._error_rate)
+            if fail:
+                self.failures += 1
+
+        delay = self._latency(model, contents) if callable(self._latency) else self._latency
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise self._error(model, contents)
+        return FakeResponse(self._responder(model, contents))
+
+
+def default_responder(model, contents):
+    """Answers single prompts with an object and batch prompts with an array."""
+    prompt = contents if isinstance(contents, str) else contents[0]
+    if "JSON array with exactly" in prompt:
+        count = prompt.count("### ITEM ")
+        return json.dumps([{"observations": [f"{model} item {i + 1}"]} for i in range(count)])
+    return "```json\n" + json.dumps({"observations": [f"{model} observation"], "concerns": []}) + "\n```"
+
+
+class FakeGenAIClient:
+    def __init__(self, responder=default_responder, **behaviour):
+        self.models = FakeModels(responder, **behaviour)
@@ -0,0 +1,220 @@
+"""
+Record/replay harness for certificate verification.
+
+Certificate pages live in tests/recordings: manifest.json maps each URL
+to the status and raw HTML the HTTP tier saw and, for JS-rendered pages,
+the text the browser tier extracted. Entries marked "synthetic" (all of
+the current ones, see tests/recordings/README.md) are hand-written pages,
+not provider captures; ReplayServer.synthetic lists them.
+ReplayServer serves them from 127.0.0.1 and install() wires a run to it:
+
+    HTTP tier   cert_fetcher._http_get is pointed at the local server (the
+                real pooled httpx client and HTML parse still run)
+    browser     Playwright is replaced by the recorded rendered text
+    Gemini      FakeGenAIClient behind a fresh AIGateway (or no AI at all)
+
+so verify_certificate and analyze_file_upload run end to end offline, with
+fixed, configurable latencies instead of whatever the network does today.
+
+Recording (needs network, and Playwright for JS-rendered pages):
+    python tests/replay.py record https://www.udemy.com/certificate/UC-.../ ...
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from app.services import bot_service, cert_fetcher, scrape_scheduler
+from app.services.ai_gateway import AIGateway
+from app.utils.cache import TTLCache
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+MANIFEST = "manifest.json"
+
+
+def load_manifest(directory: str = RECORDINGS_DIR) -> dict:
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read(directory: str, name: str) -> str:
+    if not name:
+        return ""
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _local_path(url: str) -> str:
+    # Host is kept in the path so recordings from different providers never collide
+    parts = urlsplit(url)
+    return f"/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+class ReplayServer:
+    """
+    Serves recorded certificate pages. `latency` (seconds) is added to every
+    HTTP response, `browser_latency` to every browser_fetch, standing in for
+    page load plus render time.
+    """
+
+    def __init__(self, directory: str = RECORDINGS_DIR, latency: float = 0.0, browser_latency: float = 0.0):
+        self.directory = directory
+        self.latency = latency
+        self.browser_latency = browser_latency
+        self.recordings = load_manifest(directory)
+        self._by_path = {_local_path(url): entry for url, entry in self.recordings.items()}
+        # Hand-written fixtures: results on them say nothing about real provider pages
+        self.synthetic = sorted(url for url, entry in self.recordings.items() if entry.get("synthetic"))
+        self._lock = threading.Lock()
+        self.hits = []
+        self.browser_hits = []
+        self._server = None
+        self.base = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                replay._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self._server.server_port}"
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Serving ---
+
+    def url_for(self, url: str) -> str:
+        return self.base + _local_path(url)
+
+    def _serve(self, handler):
+        with self._lock:
+            self.hits.append(handler.path)
+        entry = self._by_path.get(handler.path)
+        if entry is None:
+            status, body = 404, "Not Found"
+        else:
+            status, body = entry["status"], _read(self.directory, entry.get("page")) or "Not Found"
+        if self.latency:
+            time.sleep(self.latency)
+        data = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def browser_fetch(self, url: str, timeout_ms: int = 30000) -> tuple:
+        """Drop-in for bot_service._scrape_with_playwright: (status, rendered text)."""
+        with self._lock:
+            self.browser_hits.append(url)
+        entry = self.recordings.get(url)
+        if self.browser_latency:
+            time.sleep(min(self.browser_latency, timeout_ms / 1000))
+        if entry is None:
+            return 404, ""
+        if entry["status"] != 200:
+            return entry["status"], ""
+        text = _read(self.directory, entry.get("rendered")).strip()
+        if not text:
+            text = cert_fetcher.extract_fields(_read(self.directory, entry.get("page")), url, "")["text"]
+        return 200, text[:5000]
+
+
+def install(monkeypatch, server: ReplayServer, client=None):
+    """
+    Route certificate verification through `server` and, if given, the fake
+    Gemini `client`. Caches and the outbound scheduler are fresh and the
+    scheduler unthrottled, so each run starts from the same state.
+    Returns the AIGateway in use (None without a client).
+    """
+    real_get = cert_fetcher._http_get
+
+    async def replay_get(url: str, timeout: float = None) -> tuple:
+        return await real_get(server.url_for(url), timeout)
+
+    monkeypatch.setattr(cert_fetcher, "_http_get", replay_get)
+    monkeypatch.setattr(scrape_scheduler.config, "SCRAPE_BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(cert_fetcher, "scheduler", scrape_scheduler.OutboundScheduler(rate_per_host=1000, burst=1000))
+    monkeypatch.setattr(bot_service, "_scrape_with_playwright", server.browser_fetch)
+
+    gateway = AIGateway(client, fast_model="", cache=TTLCache()) if client is not None else None
+    monkeypatch.setattr(bot_service, "client", client)
+    monkeypatch.setattr(bot_service, "ai_gateway", gateway)
+    monkeypatch.setattr(bot_service, "certificate_cache", TTLCache())
+    return gateway
+
+
+# --- Recording ---
+
+def _provider(url: str) -> str:
+    if "udemy.com" in url:
+        return "Udemy"
+    if "coursera.org" in url:
+        return "Coursera"
+    return ""
+
+
+def record(urls: list, directory: str = RECORDINGS_DIR) -> dict:
+    """Fetch each URL live and add it to the manifest (existing entries are replaced)."""
+    import httpx
+
+    manifest = load_manifest(directory) if os.path.exists(os.path.join(directory, MANIFEST)) else {}
+    with httpx.Client(headers={"User-Agent": cert_fetcher.USER_AGENT}, follow_redirects=True,
+                      timeout=30) as http:
+        for url in urls:
+            name = f"{urlsplit(url).netloc.split('.')[-2]}_{hashlib.sha256(url.encode()).hexdigest()[:12]}"
+            response = http.get(url)
+            entry = {"status": response.status_code, "page": None, "synthetic": False}
+            if response.status_code == 200:
+                entry["page"] = f"{name}.html"
+                with open(os.path.join(directory, entry["page"]), "w", encoding="utf-8") as f:
+                    f.write(response.text)
+                provider = _provider(url)
+                fields = cert_fetcher.extract_fields(response.text, url, provider)["fields"]
+                if not cert_fetcher.has_required_fields(fields, provider):
+                    # Page needs JavaScript: keep what the browser tier would have seen
+                    status, text = bot_service._scrape_with_playwright(url)
+                    if status == 200 and text:
+                        entry["rendered"] = f"{name}.rendered.txt"
+                        with open(os.path.join(directory, entry["rendered"]), "w", encoding="utf-8") as f:
+                            f.write(text + "\n")
+            manifest[url] = entry
+            print(f"[DEBUG] Recorded {url}: {entry}")
+
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "record":
+        print("Usage: python tests/replay.py record URL [URL ...]")
+        sys.exit(2)
+    record(sys.argv[2:])
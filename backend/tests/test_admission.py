@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import admission as admission_module
+from app.core.admission import AdmissionController, AdmissionRejected, PRIORITY_HIGH, PRIORITY_LOW
+from test_streaming import png_bytes
+
+
+def make_controller(concurrency=1, queue=2, max_wait=1.0):
+    return AdmissionController({
+        "video": {"max_concurrent": concurrency, "max_queue": queue, "max_wait_seconds": max_wait, "default_priority": PRIORITY_LOW},
+        "scrape": {"max_concurrent": 1, "max_queue": 2, "max_wait_seconds": max_wait, "default_priority": PRIORITY_HIGH},
+    })
+
+
+def test_queue_full_is_shed_with_retry_after():
+    async def main():
+        controller = make_controller(concurrency=1, queue=1)
+        held = await controller.acquire("video")
+        waiter = asyncio.ensure_future(controller.acquire("video"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("video")
+        assert exc.value.retry_after >= 1
+        assert controller.snapshot()["video"]["queue_depth"] == 1
+        assert controller.snapshot()["video"]["shed"] == 1
+
+        held.release()
+        (await waiter).release()
+        assert controller.snapshot()["video"]["active"] == 0
+
+    asyncio.run(main())
+
+
+def test_budgets_are_independent():
+    async def main():
+        controller = make_controller()
+        held = await controller.acquire("video")
+        # Video is saturated but scrape work is admitted straight away
+        ticket = await asyncio.wait_for(controller.acquire("scrape"), 0.1)
+        ticket.release()
+        held.release()
+
+    asyncio.run(main())
+
+
+def test_waiters_served_by_priority_and_wait_timeout():
+    async def main():
+        controller = make_controller(concurrency=1, queue=5, max_wait=0.2)
+        budget = controller.budgets["video"]
+        held = await controller.acquire("video")
+        order = []
+
+        async def take(name, priority):
+            ticket = await budget.acquire(priority)
+            order.append(name)
+            ticket.release()
+
+        low = asyncio.ensure_future(take("low", PRIORITY_LOW))
+        high = asyncio.ensure_future(take("high", PRIORITY_HIGH))
+        await asyncio.sleep(0)
+        held.release()
+        await asyncio.gather(low, high)
+        assert order == ["high", "low"]
+
+        held = await controller.acquire("video")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("video")
+        held.release()
+        assert budget.active == 0
+
+    asyncio.run(main())
+
+
+def test_endpoint_returns_503_when_shed(monkeypatch):
+    controller = make_controller()
+    controller.budgets["image"] = admission_module.WorkBudget("image", max_concurrent=0, max_queue=0, max_wait_seconds=1)
+    monkeypatch.setattr("app.api.verify.admission", controller)
+
+    client = TestClient(app)
+    response = client.post("/api/verify", files={"file": ("a.png", png_bytes(), "image/png")})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+    metrics = client.get("/api/metrics").json()
+    assert "admission" in metrics
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+from app.services.ai_gateway import AIGateway, PROMPTS, parse_model_json
+from fake_genai import FakeGenAIClient, default_responder
+
+
+def test_parse_model_json_strips_fences():
+    assert parse_model_json('```json\n{"observations": ["a"]}\n```') == {"observations": ["a"]}
+    assert parse_model_json("not json") == {"raw_notes": "not json"}
+
+
+def test_file_analysis_is_cached_by_content_hash():
+    client = FakeGenAIClient()
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="")
+
+    async def main():
+        first = await gateway.analyze_certificate_file(b"%PDF-1.4 fake", "application/pdf")
+        second = await gateway.analyze_certificate_file(b"%PDF-1.4 fake", "application/pdf")
+        third = await gateway.analyze_certificate_file(b"%PDF-1.4 other", "application/pdf")
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert first == second == third == {"observations": ["gemini-2.0-flash observation"], "concerns": []}
+    assert len(client.models.calls) == 2
+
+
+def test_concurrent_text_analyses_share_one_request():
+    client = FakeGenAIClient()
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="")
+
+    async def main():
+        return await asyncio.gather(*(
+            gateway.analyze_certificate_text("Udemy", f"certificate text {i}") for i in range(3)
+        ))
+
+    results = asyncio.run(main())
+    assert len(client.models.calls) == 1
+    assert [r["observations"] for r in results] == [["gemini-2.0-flash item 1"], ["gemini-2.0-flash item 2"], ["gemini-2.0-flash item 3"]]
+
+    # Cached now: no new request
+    asyncio.run(gateway.analyze_certificate_text("Udemy", "certificate text 1"))
+    assert len(client.models.calls) == 1
+
+
+def test_fast_model_first_and_escalation():
+    def responder(model, contents):
+        if model == "gemini-2.0-flash-lite":
+            return "I cannot answer in JSON"
+        return default_responder(model, contents)
+
+    client = FakeGenAIClient(responder)
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="gemini-2.0-flash-lite")
+    result = asyncio.run(gateway.analyze_certificate_text("Coursera", "some text"))
+    assert result == {"observations": ["gemini-2.0-flash observation"], "concerns": []}
+    assert [c["model"] for c in client.models.calls] == ["gemini-2.0-flash-lite", "gemini-2.0-flash"]
+
+    client = FakeGenAIClient()
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="gemini-2.0-flash-lite")
+    asyncio.run(gateway.analyze_certificate_text("Coursera", "some text"))
+    assert [c["model"] for c in client.models.calls] == ["gemini-2.0-flash-lite"]
+
+
+def test_unusable_batch_falls_back_to_single_calls():
+    def responder(model, contents):
+        if "JSON array with exactly" in contents:
+            return "[]"
+        return default_responder(model, contents)
+
+    client = FakeGenAIClient(responder)
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="")
+
+    async def main():
+        return await asyncio.gather(
+            gateway.analyze_certificate_text("Udemy", "a"),
+            gateway.analyze_certificate_text("Udemy", "b"),
+        )
+
+    results = asyncio.run(main())
+    assert all(r["observations"] for r in results)
+    assert len(client.models.calls) == 3
+
+
+def test_prompt_version_is_part_of_cache_key():
+    gateway = AIGateway(FakeGenAIClient(), model="m", fast_model="")
+    key = gateway._cache_key("m", "certificate_text", "abc")
+    assert key == f"m:certificate_text:v{PROMPTS['certificate_text']['version']}:abc"
+
+
+def test_fast_model_is_opt_in_and_concerns_only_answers_are_kept(monkeypatch):
+    from app.core import config
+    monkeypatch.setattr(config, "AI_FAST_MODEL", "")
+    assert AIGateway(FakeGenAIClient(), model="m").fast_model == ""
+
+    client = FakeGenAIClient(lambda model, contents: '{"concerns": ["date looks edited"]}')
+    gateway = AIGateway(client, model="gemini-2.0-flash", fast_model="gemini-2.0-flash-lite")
+
+    async def main():
+        first = await gateway.analyze_certificate_file(b"%PDF-1.4 x", "application/pdf")
+        second = await gateway.analyze_certificate_file(b"%PDF-1.4 x", "application/pdf")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == {"concerns": ["date looks edited"]}
+    # Not escalated, and cached
+    assert [c["model"] for c in client.models.calls] == ["gemini-2.0-flash-lite"]
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import time
+import pytest
+from app.services import analyzers, media_router
+from app.services.analyzers import Analyzer
+
+MODULE = "tests_fake_tone_analyzer"
+
+
+def sleepy_a(data):
+    time.sleep(0.2)
+    return {"a": len(data)}
+
+
+def sleepy_b(data):
+    time.sleep(0.2)
+    return {"b": True}
+
+
+def combine(a):
+    return {"combined": a["a"] * 2}
+
+
+def register_fake(monkeypatch, *entries):
+    for analyzer in entries:
+        monkeypatch.setitem(analyzers._registry, analyzer.name, analyzer)
+
+
+def test_independent_analyzers_run_concurrently_dependents_follow(monkeypatch):
+    register_fake(
+        monkeypatch,
+        Analyzer("a", "test_analyzers:sleepy_a", ("fake",), defaults={"a": 0}),
+        Analyzer("b", "test_analyzers:sleepy_b", ("fake",)),
+        Analyzer("combined", "test_analyzers:combine", ("fake",), requires=("a",)),
+    )
+    plan = analyzers.plan("fake")
+
+    def follow_up(name, result):
+        plan.record(name, result)
+        return plan.jobs(b"abc")
+
+    async def main():
+        return [e async for e in media_router._as_completed(plan.jobs(b"abc"), follow_up=follow_up)]
+
+    started = time.monotonic()
+    events = asyncio.run(main())
+    assert time.monotonic() - started < 0.35
+    assert events[-1] == ("combined", {"combined": 6})
+    assert {name for name, _ in events[:2]} == {"a", "b"}
+
+
+def test_new_media_type_needs_no_router_change(tmp_path, monkeypatch):
+    (tmp_path / f"{MODULE}.py").write_text(
+        "def analyze(data):\n    return {'tone_hz': 440, 'size': len(data)}\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    register_fake(monkeypatch, Analyzer("tone", f"{MODULE}:analyze", ("tone",), defaults={"tone_hz": None}))
+    monkeypatch.setattr(media_router, "detect_file_type", lambda data: "tone")
+
+    assert MODULE not in sys.modules
+    assert analyzers.supports("tone")
+    assert MODULE not in sys.modules  # declared, not imported
+
+    async def main():
+        return [e async for e in media_router.iter_media_stages(b"1234")]
+
+    events = asyncio.run(main())
+    assert MODULE in sys.modules
+    assert events[1] == ("tone", {"tone_hz": 440, "size": 4})
+    stage, result = events[-1]
+    assert result["mediaType"] == "tone"
+    assert result["analysis"] == {"tone_hz": 440, "size": 4}
+
+
+def test_plan_drops_unreachable_and_offline_analyzers():
+    pdf = analyzers.plan("pdf")
+    assert [a.name for a in pdf.waiting] == ["pdf_text"]
+    # Fields of dropped analyzers are still present
+    assert pdf.empty_analysis()["qr_certificates"] == []
+
+    online = {a.name for a in analyzers.plan("image").waiting}
+    offline = {a.name for a in analyzers.plan("image", network=False).waiting}
+    assert online - offline == {"qr_certificates"}
+    assert [a.name for a in analyzers.plan("image").take_ready()] == ["decode", "exif"]
+
+
+def test_dependency_cycle_rejected_at_register(monkeypatch):
+    monkeypatch.setattr(analyzers, "_registry", dict(analyzers._registry))
+    analyzers.register(Analyzer("x", "test_analyzers:combine", ("loop",), requires=("y",)))
+    analyzers.register(Analyzer("z", "test_analyzers:sleepy_b", ("loop",), requires=("bytes", "x")))
+    with pytest.raises(ValueError, match="cycle"):
+        analyzers.register(Analyzer("y", "test_analyzers:combine", ("loop",), requires=("x",)))
+    assert "y" not in analyzers._registry
+    # Same names under another media type are a separate graph
+    analyzers.register(Analyzer("y", "test_analyzers:combine", ("other",), requires=("x",)))
+    assert [a.name for a in analyzers.plan("loop").waiting] == []
+
+
+def test_process_pool_shut_down(monkeypatch):
+    monkeypatch.setattr(analyzers.config, "ANALYZER_PROCESS_WORKERS", 1)
+    pool = analyzers.process_pool()
+    assert pool.submit(analyzers._call_target, "test_analyzers:combine", {"a": 2}).result(30) == {"combined": 4}
+    analyzers.shutdown_process_pool()
+    assert analyzers._process_pool is None
+    with pytest.raises(RuntimeError):
+        pool.submit(combine, {"a": 1})
+
+
+def test_run_sync_matches_defaults_shape(monkeypatch):
+    register_fake(
+        monkeypatch,
+        Analyzer("a", "test_analyzers:sleepy_a", ("fake",), defaults={"a": 0, "missing": None}),
+        Analyzer("combined", "test_analyzers:combine", ("fake",), requires=("a",)),
+    )
+    assert analyzers.plan("fake").run_sync(b"xy") == {"a": 2, "missing": None, "combined": 4}
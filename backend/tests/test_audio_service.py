@@ -0,0 +1,140 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import io
+import shutil
+import tracemalloc
+import wave
+import numpy as np
+import pytest
+from app.services import audio_service, media_router
+from app.services.audio_service import analyze_audio, process_audio
+from app.services.decision_engine import make_decision
+from app.utils.file_utils import detect_file_type
+
+SR = 44100
+
+
+def voice(seconds, seed=0):
+    """Harmonic, amplitude-modulated tone over a microphone noise floor."""
+    t = np.arange(int(SR * seconds)) / SR
+    tone = sum(0.15 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 40))
+    envelope = (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) ** 2
+    return tone * envelope + 0.003 * np.random.default_rng(seed).standard_normal(len(t))
+
+
+def lowpass(x, hz):
+    spectrum = np.fft.rfft(x)
+    spectrum[np.fft.rfftfreq(len(x), 1 / SR) > hz] = 0
+    return np.fft.irfft(spectrum, len(x))
+
+
+def wav_bytes(x, channels=1):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(SR)
+        w.writeframes((np.clip(x, -1, 1) * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def test_clean_recording_is_consistent_and_verified():
+    data = wav_bytes(voice(12))
+    assert detect_file_type(data) == "audio"
+    result = analyze_audio(data)
+    assert result["codec"] == "pcm_s16le" and result["duration_seconds"] == 12.0
+    assert result["splice_count"] == 0 and result["digital_silence_gaps"] == 0
+    assert result["sample_rate_consistent"] and result["codec_consistent"]
+    assert make_decision("audio", result)["status"] == "VERIFIED"
+
+
+def test_splice_and_inserted_silence_found():
+    x = voice(12)
+    source = x.copy()
+    x[SR * 5:] = np.roll(source, 12345)[SR * 5:]
+    x[SR * 10:] = np.roll(source, 10000)[SR * 10:]
+    x[SR * 8:SR * 8 + 4410] = 0
+    result = analyze_audio(wav_bytes(x))
+    assert result["splice_times"] == [5.0, 10.0]
+    assert result["digital_silence_times"] == [8.0]
+
+    decision = make_decision("audio", result)
+    assert decision["status"] != "VERIFIED"
+    assert "Abrupt splices detected (2)" in decision["reasons"]
+
+
+def test_square_waves_and_clipped_music_are_not_splices():
+    t = np.arange(SR * 10) / SR
+    square = 0.4 * np.sign(np.sin(2 * np.pi * 110 * t))
+    clipped = np.clip(6 * voice(10) + 0.5 * np.sign(np.sin(2 * np.pi * 55 * t)), -1, 1)
+    for x in (square, clipped):
+        result = analyze_audio(wav_bytes(x))
+        assert result["splice_count"] == 0
+        assert make_decision("audio", result)["status"] == "VERIFIED"
+
+
+def test_resampled_and_mixed_sources():
+    x = voice(12)
+    narrow = analyze_audio(wav_bytes(lowpass(x, 3800)))
+    assert not narrow["sample_rate_consistent"]
+    assert narrow["effective_bandwidth_hz"] < 4000
+
+    mixed = x.copy()
+    mixed[SR * 6:] = lowpass(x, 3800)[SR * 6:]
+    assert analyze_audio(wav_bytes(mixed))["bandwidth_changes"] == 1
+
+
+def test_codec_consistency():
+    noisy = voice(8) + 0.01 * np.random.default_rng(1).standard_normal(SR * 8)
+    transcoded = analyze_audio(wav_bytes(lowpass(noisy, 16000)))
+    assert any("lossy-encoder lowpass" in issue for issue in transcoded["codec_issues"])
+
+    data = wav_bytes(voice(8))
+    truncated = analyze_audio(data[:len(data) // 2 + 1])
+    assert not truncated["codec_consistent"]
+    assert truncated["codec_issues"][0].startswith("Header declares 352800 frames")
+
+
+def test_results_do_not_depend_on_chunking(monkeypatch):
+    x = voice(9)
+    x[SR * 3:] = np.roll(x, 12345)[SR * 3:]
+    x[SR * 6 - 300:SR * 6 + 600] = 0
+    data = wav_bytes(np.repeat(x[:, None], 2, axis=1).ravel(), channels=2)
+    whole = analyze_audio(data)
+    monkeypatch.setattr(audio_service, "CHUNK_FRAMES", 1)
+    assert analyze_audio(data) == whole
+    assert whole["channels"] == 2 and whole["splice_count"] == 1 and whole["digital_silence_gaps"] == 1
+
+
+def test_memory_does_not_grow_with_length(tmp_path):
+    peaks = []
+    for seconds in (30, 120):
+        path = tmp_path / f"{seconds}.wav"
+        path.write_bytes(wav_bytes(voice(seconds)))
+        tracemalloc.start()
+        analyze_audio(str(path))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert peaks[1] < peaks[0] * 1.5
+    assert peaks[1] < 16 * 1024 * 1024
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is not None, reason="ffmpeg installed")
+def test_compressed_audio_without_ffmpeg_is_reported():
+    mp3 = b"ID3\x03\x00\x00\x00\x00\x00\x00" + b"\xff\xfb\x90\x00" * 100
+    assert process_audio(mp3) == {"error": "Unable to read audio: mp3 needs ffmpeg, which is not installed"}
+
+
+def test_media_router_runs_audio_analyzer():
+    async def main():
+        return [e async for e in media_router.iter_media_stages(wav_bytes(voice(4)))]
+
+    events = asyncio.run(main())
+    assert events[0] == ("file_type", {"mediaType": "audio"})
+    assert events[1][0] == "audio"
+    result = events[-1][1]
+    assert result["mediaType"] == "audio"
+    assert result["decision"]["status"] == "VERIFIED"
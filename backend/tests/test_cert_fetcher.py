@@ -0,0 +1,124 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services import cert_fetcher, scrape_scheduler
+from app.core.metrics import metrics
+
+STATIC_PAGE = """<html><head>
+<meta property="og:title" content="Python for Everybody">
+<meta property="og:description" content="Certificate of Completion issued by Udemy">
+</head><body>
+<h1>Certificate of Completion</h1>
+<span data-purpose="certificate-recipient-name">Jane Doe</span>
+<p>Instructor: John Smith. Udemy</p>
+</body></html>"""
+
+JS_ONLY_PAGE = "<html><head><title>Udemy</title></head><body><div id='root'></div></body></html>"
+
+PAGES = {
+    "/certificate/UC-static-1/": (200, STATIC_PAGE),
+    "/certificate/UC-js-1/": (200, JS_ONLY_PAGE),
+    "/certificate/UC-blocked-1/": (403, "Forbidden"),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, body = PAGES.get(self.path, (404, "Not Found"))
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fast_scheduler(monkeypatch):
+    """Fresh, effectively unthrottled scheduler so tests stay fast and isolated."""
+    monkeypatch.setattr(scrape_scheduler.config, "SCRAPE_BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(cert_fetcher, "scheduler", scrape_scheduler.OutboundScheduler(rate_per_host=1000, burst=1000))
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_fetch(url):
+    browser_calls = []
+
+    def fake_browser(u, timeout_ms):
+        browser_calls.append(u)
+        return 200, "Certificate of Completion Udemy Instructor rendered"
+
+    result = asyncio.run(cert_fetcher.fetch_certificate_page(url, "Udemy", fake_browser))
+    return result, browser_calls
+
+
+def test_fast_path_is_enough_for_static_page():
+    server, base = start_stub_server()
+    try:
+        metrics.reset()
+        result, browser_calls = run_fetch(base + "/certificate/UC-static-1/")
+        assert result["tier"] == "http"
+        assert browser_calls == []
+        assert result["fields"] == {"name": "Jane Doe", "course": "Python for Everybody", "certificate_id": "UC-static-1"}
+        assert "Certificate of Completion" in result["text"]
+        assert metrics.get("fetch.fast_path") == 1
+        assert set(result["timing"]["http"]) == {"queue_ms", "fetch_ms"}
+    finally:
+        server.shutdown()
+
+
+def test_escalates_to_browser_when_fields_missing_or_blocked():
+    server, base = start_stub_server()
+    try:
+        metrics.reset()
+        for path in ["/certificate/UC-js-1/", "/certificate/UC-blocked-1/"]:
+            result, browser_calls = run_fetch(base + path)
+            assert result["tier"] == "browser"
+            assert browser_calls == [base + path]
+            assert "rendered" in result["text"]
+        assert metrics.get("fetch.browser_fallback") == 2
+    finally:
+        server.shutdown()
+
+
+def test_not_found_does_not_launch_browser():
+    server, base = start_stub_server()
+    try:
+        result, browser_calls = run_fetch(base + "/certificate/UC-missing/")
+        assert result["text"] == ""
+        assert browser_calls == []
+    finally:
+        server.shutdown()
+
+
+def test_http_client_is_closed_when_replaced_and_on_shutdown():
+    async def get_client():
+        client = cert_fetcher.get_http_client()
+        assert cert_fetcher.get_http_client() is client
+        return client
+
+    first = asyncio.run(get_client())
+
+    async def replace_then_shutdown():
+        second = cert_fetcher.get_http_client()
+        await asyncio.sleep(0)  # let the close task run
+        await cert_fetcher.close_http_client()
+        return second
+
+    second = asyncio.run(replace_then_shutdown())
+    assert second is not first
+    assert first.is_closed and second.is_closed
+    assert cert_fetcher._client is None
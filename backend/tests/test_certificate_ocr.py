@@ -0,0 +1,113 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import cv2
+import numpy as np
+from app.core.metrics import metrics
+from app.services import bot_service, ocr_service
+from app.services.bot_service import RuleEngine
+from app.services.certificate_ocr import extract_fields, read_certificate_image
+
+UDEMY_PAGE = "CERTIFICATE OF COMPLETION\nPython for Everyone\nInstructors Jane Smith\nUdemy"
+
+
+class ScriptedEngine(ocr_service.OCREngine):
+    """Full-page calls return `page`, single-line (region) calls return `line`."""
+    name = "scripted"
+
+    def __init__(self, page, line):
+        super().__init__()
+        self.page, self.line = page, line
+        self.calls = []
+
+    def image_to_string(self, image, psm=None):
+        self.calls.append((np.asarray(image).shape, psm))
+        return self.page if psm is None else self.line
+
+
+def make_udemy_image():
+    img = np.full((800, 1200), 255, dtype=np.uint8)
+    cv2.putText(img, "Certificate no: UC-1234-abcd", (700, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+    cv2.putText(img, "ude.my/UC-1234-abcd", (700, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+    cv2.putText(img, "CERTIFICATE OF COMPLETION", (150, 300), cv2.FONT_HERSHEY_SIMPLEX, 2.0, 0, 4)
+    cv2.putText(img, "Jane Doe", (400, 500), cv2.FONT_HERSHEY_SIMPLEX, 2.5, 0, 5)
+    return img
+
+
+def test_low_res_pass_then_roi_only():
+    img = make_udemy_image()
+    engine = ScriptedEngine(UDEMY_PAGE, "Certificate url: ude.my / UC-1234-abcd")
+    result = read_certificate_image(img, RuleEngine.identify_platform, engine=engine)
+
+    assert result["platform"] == "Udemy"
+    assert result["passes"] == ["lowres", "roi"]
+    assert result["certificate_id"] == "UC-1234-abcd"
+    assert result["certificate_url"] == "https://www.udemy.com/certificate/UC-1234-abcd/"
+
+    (page_shape, page_psm), *lines = engine.calls
+    assert page_psm is None and max(page_shape) <= 960
+    # High-resolution OCR only on the top-right band lines
+    assert lines and all(psm == ocr_service.PSM_SINGLE_LINE for _, psm in lines)
+    assert all(shape[0] < 60 for shape, _ in lines)
+
+
+def test_unknown_platform_reads_general_regions():
+    img = make_udemy_image()
+    engine = ScriptedEngine("blurry", "Udemy Certificate of Completion ude.my/UC-9-x")
+    result = read_certificate_image(img, RuleEngine.identify_platform, engine=engine)
+    assert result["passes"] == ["lowres", "regions"]
+    assert result["platform"] == "Udemy"
+    assert result["certificate_id"] == "UC-9-x"
+
+
+def test_extract_fields_tolerates_ocr_spacing():
+    fields = extract_fields("Verify at coursera.org / verify / ABC123XYZ", "Coursera")
+    assert fields == {
+        "certificate_id": "ABC123XYZ",
+        "certificate_url": "https://www.coursera.org/account/accomplishments/verify/ABC123XYZ",
+    }
+    assert extract_fields("Certificate no: UC-77-aa", "Udemy")["certificate_id"] == "UC-77-aa"
+    assert extract_fields("anything", "Unknown")["certificate_id"] is None
+
+
+class RecordingGateway:
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_certificate_file(self, file_bytes, mime, digest=None):
+        self.calls += 1
+        return {"observations": ["looks fine"]}
+
+
+def png(img):
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def test_bot_path_settles_udemy_image_without_ai(monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(bot_service, "ai_gateway", gateway)
+    engine = ScriptedEngine(UDEMY_PAGE, "ude.my/UC-1234-abcd")
+    monkeypatch.setattr(ocr_service, "get_ocr_engine", lambda: engine)
+    metrics.reset()
+
+    result = asyncio.run(bot_service.analyze_file_upload(png(make_udemy_image())))
+    assert result["platform"] == "Udemy"
+    assert result["rule_based_result"]["status"] == "Consistent"
+    assert result["settled_locally"] is True
+    assert result["certificate_url"] == "https://www.udemy.com/certificate/UC-1234-abcd/"
+    assert gateway.calls == 0
+    assert metrics.get("bot.settled_locally") == 1
+
+
+def test_bot_path_falls_back_to_ai_when_not_settled(monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(bot_service, "ai_gateway", gateway)
+    engine = ScriptedEngine("Udemy", "no id here")
+    monkeypatch.setattr(ocr_service, "get_ocr_engine", lambda: engine)
+
+    result = asyncio.run(bot_service.analyze_file_upload(png(make_udemy_image())))
+    assert result["settled_locally"] is False
+    assert result["ai_analysis"] == {"observations": ["looks fine"]}
+    assert gateway.calls == 1
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.deadline import Deadline, parse_deadline_header, set_deadline, reset_deadline
+from app.services import image_service, media_router
+from test_streaming import png_bytes
+
+client = TestClient(app)
+
+
+def test_parse_deadline_header():
+    assert parse_deadline_header("2.5") == 2.5
+    assert 9 < parse_deadline_header(str(time.time() + 10)) <= 10
+    assert parse_deadline_header(str(time.time() - 10)) == 0.0
+    assert parse_deadline_header("soon") is None
+
+
+def test_run_cuts_slow_stage():
+    async def main():
+        deadline = Deadline(0.05)
+        fast = await deadline.run("fast", asyncio.sleep(0, result="ok"))
+        slow = await deadline.run("slow", asyncio.sleep(1, result="late"), default="cut")
+        after = await deadline.run("after", asyncio.sleep(0, result="never"), default="cut")
+        return deadline, fast, slow, after
+
+    deadline, fast, slow, after = asyncio.run(main())
+    assert (fast, slow, after) == ("ok", "cut", "cut")
+    assert deadline.cut_stages == ["slow", "after"]
+
+
+def slow_ocr(img):
+    time.sleep(0.5)
+    return {"ocr_text": "late text"}
+
+
+def test_pipeline_returns_partial_decision(monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", slow_ocr)
+
+    async def main():
+        token = set_deadline(Deadline(0.2))
+        started = time.monotonic()
+        try:
+            events = [e async for e in media_router.iter_media_stages(png_bytes())]
+        finally:
+            reset_deadline(token)
+        return events, time.monotonic() - started
+
+    events, elapsed = asyncio.run(main())
+    # The result does not wait for the slow OCR thread
+    assert elapsed < 0.45
+    stages = [stage for stage, _ in events]
+    assert "ocr" not in stages
+    assert {"exif", "qr"} <= set(stages)
+
+    decision = events[-1][1]["decision"]
+    assert decision["partial"] is True
+    assert decision["cut_stages"] == ["ocr"]
+    assert any("Partial decision" in r for r in decision["reasons"])
+
+
+def test_deadline_header_reaches_stages(monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", slow_ocr)
+    response = client.post(
+        "/api/verify",
+        files={"file": ("a.png", png_bytes(), "image/png")},
+        headers={"X-Request-Deadline": "0.2"}
+    )
+    decision = response.json()["routing"]["decision"]
+    assert decision["cut_stages"] == ["ocr"]
+
+
+def test_no_deadline_header_runs_everything(monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", lambda img: {"ocr_text": "x"})
+    decision = client.post("/api/verify", files={"file": ("a.png", png_bytes(), "image/png")}).json()["routing"]["decision"]
+    assert "partial" not in decision
+
+
+def test_last_millisecond_counts_as_expired():
+    deadline = Deadline(10)
+    assert 9000 < deadline.timeout_ms(30000) <= 10000
+    deadline.expires_at = time.monotonic() + 0.0005
+    assert deadline.expired()
+    assert deadline.timeout_ms(30000) >= 1
+    assert Deadline(None).timeout_ms(30000) == 30000
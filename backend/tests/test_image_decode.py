@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.metrics import metrics, process_memory
+from app.services.image_decode import ImageRejected, decode_image, estimate_decode_bytes
+
+client = TestClient(app)
+
+
+def encode(array, fmt):
+    buf = io.BytesIO()
+    Image.fromarray(array).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def noise(height, width):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_decodes_to_grayscale_without_rgb_copy():
+    array = decode_image(encode(noise(120, 200), "PNG"))
+    assert array.shape == (120, 200)
+    assert array.dtype == np.uint8
+
+
+def test_rgb_mode_still_available():
+    array = decode_image(encode(noise(40, 60), "PNG"), mode="RGB")
+    assert array.shape == (40, 60, 3)
+
+
+def test_large_jpeg_uses_reduced_decode():
+    data = encode(noise(2000, 3000), "JPEG")
+    metrics.reset()
+    array = decode_image(data, max_side=800)
+    # Draft mode decodes at 1/2 scale (1500 px), then reduce() caps at 800
+    assert max(array.shape) <= 800
+    assert metrics.get("image.decode.reduced") == 1
+
+
+def test_jpeg_scale_chosen_to_fit_memory_budget():
+    data = encode(noise(2000, 3000), "JPEG")
+    # Full grayscale decode needs ~12 MB; 3 MB forces a smaller DCT scale
+    array = decode_image(data, memory_mb=3, max_side=10000)
+    assert array.shape == (1000, 1500)
+
+
+def test_png_over_budget_is_rejected_before_decoding():
+    data = encode(noise(2000, 3000), "PNG")
+    metrics.reset()
+    with pytest.raises(ImageRejected) as exc:
+        decode_image(data, memory_mb=5)
+    assert "per-request limit is 5 MB" in exc.value.reason
+    assert metrics.get("image.rejected.memory") == 1
+
+
+def test_pixel_limit_checked_from_header():
+    data = encode(np.zeros((1000, 1000), dtype=np.uint8), "PNG")
+    with pytest.raises(ImageRejected) as exc:
+        decode_image(data, max_pixels=500_000)
+    assert exc.value.status_code == 413
+    assert "1000x1000" in exc.value.reason
+
+
+def test_unreadable_image_rejected():
+    with pytest.raises(ImageRejected) as exc:
+        decode_image(b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+    assert exc.value.status_code == 422
+
+
+def test_estimate_accounts_for_conversion():
+    assert estimate_decode_bytes(100, 100, "L") == 100 * 100 * 2
+    # RGB is stored as 4 bytes per pixel by Pillow, plus L copy and array
+    assert estimate_decode_bytes(100, 100, "RGB") == 100 * 100 * 6
+    assert estimate_decode_bytes(100, 100, "L", scale=2) == 50 * 50 * 2
+
+
+def test_verify_returns_clear_rejection(monkeypatch):
+    monkeypatch.setattr("app.core.config.IMAGE_MAX_PIXELS", 1000)
+    data = encode(np.zeros((64, 64), dtype=np.uint8), "PNG")
+    response = client.post("/api/verify", files={"file": ("big.png", data, "image/png")})
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Image rejected: image is 64x64")
+
+
+def test_worker_memory_in_metrics():
+    assert process_memory()["rss_mb"] > 0
+    worker = client.get("/api/metrics").json()["worker"]
+    assert worker["pid"] == os.getpid()
+
+
+def test_qr_and_ocr_input_keeps_full_resolution():
+    from PIL import Image as PILImage
+    from app.services.image_service import load_image
+    pillow_limit = PILImage.MAX_IMAGE_PIXELS
+    data = encode(np.zeros((300, 6000), dtype=np.uint8), "PNG")
+    assert load_image(data).shape == (300, 6000)
+    # The per-decode limit does not touch Pillow's process-wide setting
+    with pytest.raises(ImageRejected):
+        decode_image(data, max_pixels=1000)
+    assert PILImage.MAX_IMAGE_PIXELS == pillow_limit
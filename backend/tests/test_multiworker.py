@@ -0,0 +1,188 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import multiprocessing
+import socket
+import subprocess
+import threading
+import time
+import urllib.request
+import numpy as np
+from app.core import config
+from app.services import ocr_service
+from app.services.ocr_pool import RemoteOCREngine, start_ocr_pool
+from app.utils.cache import SQLiteCache, TTLCache, make_cache
+from test_ocr_service import FakeEngine
+
+BACKEND = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_sqlite_cache_roundtrip_and_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.db"), "certificate", ttl_seconds=60)
+    assert cache.get("missing") is None
+    cache.set("https://udemy.com/certificate/UC-1", {"valid": True, "reasons": ["a"]})
+    assert cache.get("https://udemy.com/certificate/UC-1") == {"valid": True, "reasons": ["a"]}
+
+    cache.set("short", 1, ttl_seconds=-1)
+    assert cache.get("short") is None
+    assert len(cache) == 1
+
+    # Namespaces do not collide
+    other = SQLiteCache(str(tmp_path / "c.db"), "ai")
+    assert other.get("https://udemy.com/certificate/UC-1") is None
+
+
+def test_sqlite_cache_evicts_oldest(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.db"), "ns", max_entries=10)
+    cache.EVICT_EVERY = 1
+    for i in range(25):
+        cache.set(f"k{i}", i)
+    assert len(cache) == 10
+    assert cache.get("k24") == 24 and cache.get("k0") is None
+
+
+def _child_writes(path):
+    SQLiteCache(path, "certificate").set("url", {"from": os.getpid()})
+
+
+def test_sqlite_cache_shared_across_processes(tmp_path):
+    path = str(tmp_path / "c.db")
+    cache = SQLiteCache(path, "certificate")
+    cache.get("warm")  # parent connection exists before the fork
+
+    child = multiprocessing.get_context("fork").Process(target=_child_writes, args=(path,))
+    child.start()
+    child.join()
+    assert cache.get("url") == {"from": child.pid}
+
+
+def test_make_cache_follows_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SHARED_CACHE_PATH", "")
+    assert isinstance(make_cache("x", 10, 60), TTLCache)
+    monkeypatch.setattr(config, "SHARED_CACHE_PATH", str(tmp_path / "c.db"))
+    assert isinstance(make_cache("x", 10, 60), SQLiteCache)
+
+
+def test_remote_engine_uses_shared_pool(tmp_path, monkeypatch):
+    address = str(tmp_path / "ocr.sock")
+    pool = start_ocr_pool(address, b"key", engine_factory=FakeEngine)
+    try:
+        monkeypatch.setattr(config, "OCR_SERVER_ADDRESS", address)
+        monkeypatch.setattr(config, "OCR_SERVER_AUTHKEY", "key")
+        engine = ocr_service.create_engine("auto")
+        assert isinstance(engine, RemoteOCREngine)
+
+        crop = np.zeros((20, 80), dtype=np.uint8)
+        assert engine.image_to_string(crop, psm=7) == "line1"
+        # Same pool for every caller: the call counter is shared
+        assert RemoteOCREngine(address, b"key").image_to_string(crop) == "line2"
+    finally:
+        pool.terminate()
+
+
+def test_remote_engine_falls_back_and_reconnects(tmp_path, monkeypatch):
+    from app.services import ocr_pool
+    address = str(tmp_path / "ocr.sock")
+    local = FakeEngine()
+    engine = RemoteOCREngine(address, b"key", fallback=lambda: local)
+    crop = np.zeros((20, 80), dtype=np.uint8)
+
+    pool = start_ocr_pool(address, b"key", engine_factory=FakeEngine)
+    assert engine.image_to_string(crop) == "line1"
+    pool.terminate()
+    pool.join()
+
+    # Pool gone: served locally, and no reconnect attempt until the back-off passes
+    assert engine.image_to_string(crop) == "line1" and len(local.calls) == 1
+    assert engine.image_to_string(crop) == "line2" and len(local.calls) == 2
+
+    pool = start_ocr_pool(address, b"key", engine_factory=FakeEngine)
+    try:
+        monkeypatch.setattr(engine, "_retry_at", 0.0)
+        assert engine.image_to_string(crop) == "line1"  # fresh pool process
+        assert len(local.calls) == 2
+    finally:
+        pool.terminate()
+
+
+def test_pool_receives_grayscale_arrays():
+    from PIL import Image
+    from app.services.ocr_pool import _wire_image
+    rgb = np.zeros((20, 80, 3), dtype=np.uint8)
+    rgb[:, :40] = 255
+    for image in (rgb, Image.fromarray(rgb), Image.fromarray(rgb).convert("RGBA")):
+        wire = _wire_image(image)
+        assert wire.shape == (20, 80) and wire.dtype == np.uint8 and wire.flags.c_contiguous
+        assert wire[0, 0] == 255 and wire[0, 79] == 0
+
+
+def test_supervisor_restarts_dead_helper():
+    from app.serve import Helper, Supervisor
+    started = []
+
+    def start_helper():
+        process = subprocess.Popen(["sleep", "30"])
+        started.append(process)
+        return process
+
+    helper = Helper("sleeper", start_helper)
+    helper.start()
+    supervisor = Supervisor(None, 1, "warning", [helper])
+    supervisor.RESTART_DELAY = 0.0
+    worker = []
+
+    def spawn():
+        # Stand-in worker: lives until the supervisor is stopped
+        process = subprocess.Popen(["sleep", "30"])
+        worker.append(process)
+        supervisor.children.add(process.pid)
+
+    def kill_helper_then_stop():
+        started[0].kill()
+        deadline = time.monotonic() + 10
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        supervisor.stop()
+
+    supervisor.spawn = spawn
+    threading.Thread(target=kill_helper_then_stop, daemon=True).start()
+    supervisor.run()
+
+    assert len(started) == 2 and len(worker) == 1
+    assert list(supervisor.helpers) == [started[1].pid]
+    helper.terminate()
+    started[1].wait(timeout=5)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_launcher_serves_from_several_workers():
+    port = _free_port()
+    env = dict(os.environ)
+    for name in ("SHARED_CACHE_PATH", "OCR_SERVER_ADDRESS", "BROWSER_CDP_URL"):
+        env.pop(name, None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", "2", "--port", str(port), "--no-browser",
+         "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        pids = set()
+        deadline = time.monotonic() + 60
+        while len(pids) < 2 and time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/metrics", timeout=2) as r:
+                    pids.add(json.load(r)["worker"]["pid"])
+            except OSError:
+                time.sleep(0.2)
+        assert len(pids) == 2
+        assert proc.pid not in pids
+    finally:
+        proc.terminate()
+        assert proc.wait(timeout=30) == 0
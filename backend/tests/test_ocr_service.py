@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import cv2
+import numpy as np
+from app.services import ocr_service
+
+
+class FakeEngine(ocr_service.OCREngine):
+    """Records what it was asked to OCR instead of running Tesseract."""
+    name = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def image_to_string(self, image, psm=None):
+        self.calls.append((np.asarray(image).shape, psm))
+        return f"line{len(self.calls)}"
+
+
+def make_certificate_image():
+    img = np.full((800, 1200), 255, dtype=np.uint8)
+    cv2.putText(img, "CERTIFICATE OF COMPLETION", (150, 120), cv2.FONT_HERSHEY_SIMPLEX, 2.0, 0, 4)
+    cv2.putText(img, "Jane Doe", (400, 320), cv2.FONT_HERSHEY_SIMPLEX, 2.5, 0, 5)
+    for i in range(6):
+        cv2.putText(img, f"body text line {i}", (100, 400 + i * 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 0, 1)
+    cv2.putText(img, "Certificate no: UC-1234-abcd", (100, 720), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    cv2.putText(img, "udemy.com/certificate/UC-1234-abcd", (100, 770), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    return img
+
+
+def test_detect_text_regions_finds_lines():
+    img = make_certificate_image()
+    boxes = ocr_service.detect_text_regions(img)
+    assert len(boxes) >= 8
+    # Boxes are returned top-to-bottom
+    assert [b[1] for b in boxes] == sorted(b[1] for b in boxes)
+
+
+def test_select_certificate_regions_keeps_title_name_and_footer():
+    img = make_certificate_image()
+    boxes = ocr_service.detect_text_regions(img)
+    chosen = ocr_service.select_certificate_regions(boxes, img.shape[0], max_regions=5)
+    assert len(chosen) <= 5
+    tallest = max(boxes, key=lambda b: b[3])
+    assert tallest in chosen
+    # Both footer lines (ID and verify URL) are kept
+    assert sum(1 for b in chosen if b[1] > img.shape[0] * 0.7) == 2
+
+
+def test_extract_text_regions_mode_ocrs_crops_only():
+    img = make_certificate_image()
+    engine = FakeEngine()
+    text = ocr_service.extract_text(img, mode="regions", engine=engine)
+    assert text.startswith("line1")
+    assert all(psm == ocr_service.PSM_SINGLE_LINE for _, psm in engine.calls)
+    assert all(shape[0] < img.shape[0] for shape, _ in engine.calls)
+
+
+def test_extract_text_falls_back_to_full_page():
+    blank = np.full((200, 200), 255, dtype=np.uint8)
+    engine = FakeEngine()
+    ocr_service.extract_text(blank, mode="regions", engine=engine)
+    assert engine.calls == [((200, 200), None)]
+
+
+def test_create_engine_respects_provider_options(monkeypatch):
+    monkeypatch.setitem(ocr_service.config.OCR_ENGINE_OPTIONS, "pytesseract", {"lang": "deu", "psm": 6})
+    engine = ocr_service.create_engine("pytesseract")
+    assert isinstance(engine, ocr_service.PytesseractEngine)
+    assert (engine.lang, engine.psm) == ("deu", 6)
+
+    if ocr_service.tesserocr is None:
+        assert isinstance(ocr_service.create_engine("auto"), ocr_service.PytesseractEngine)
@@ -0,0 +1,172 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import pypdfium2 as pdfium
+from app.core.metrics import metrics
+from app.services import bot_service, image_service
+from app.services.pdf_handle import PDFHandle, open_pdf
+
+
+def make_pdf(pages: list) -> bytes:
+    """Minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 18 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+CERTIFICATE = make_pdf(["Terms and conditions", "Udemy Certificate of Completion", "Instructor Jane Smith"])
+
+
+def test_text_layer_and_thumbnail_parsed_once():
+    data = make_pdf(["Coursera has successfully completed", "page two"])
+    metrics.reset()
+    with open_pdf(data) as pdf:
+        assert pdf.page_count == 2
+        assert "has successfully completed" in pdf.text
+        assert max(pdf.thumbnail.shape) == 256
+        assert len(pdf.thumbnail_hash) == 16
+
+    # Second open of the same bytes (e.g. bot path after /api/verify) reuses the parse
+    with open_pdf(bytes(data)) as pdf:
+        assert pdf.page_count == 2
+        assert pdf._doc is None
+    assert metrics.get("pdf.parsed") == 1
+
+
+def test_open_from_file_is_memory_mapped(tmp_path):
+    path = tmp_path / "cert.pdf"
+    path.write_bytes(CERTIFICATE)
+    with open(path, "rb") as f:
+        pdf = open_pdf(f)
+    assert pdf._mmap is not None
+    assert pdf.digest == PDFHandle(CERTIFICATE).digest
+    assert pdf.pages_text[1].startswith("Udemy")
+    pdf.close()
+    assert pdf._mmap is None
+
+
+def test_relevant_pages_and_subset():
+    pdf = open_pdf(CERTIFICATE)
+    keywords = bot_service.RuleEngine.PLATFORMS["Udemy"]["keywords"]
+    assert pdf.relevant_pages(keywords) == [1, 2]
+    assert pdf.relevant_pages(["nothing matches"]) == [0]
+
+    subset = pdfium.PdfDocument(pdf.page_subset([1]))
+    assert len(subset) == 1
+    assert "Certificate of Completion" in subset[0].get_textpage().get_text_range()
+    # All pages selected: the upload itself, no re-serialisation
+    assert pdf.page_subset([0, 1, 2]) == CERTIFICATE
+
+
+def test_run_pdf_text_reports_pages_and_hash():
+    result = image_service.run_pdf_text(CERTIFICATE)
+    assert "Certificate of Completion" in result["ocr_text"]
+    assert result["pdf_pages"] == 3
+    assert result["pdf_thumbnail_hash"] == open_pdf(CERTIFICATE).thumbnail_hash
+    assert result["metadata"] == {}
+
+
+class RecordingGateway:
+    def __init__(self):
+        self.calls = []
+
+    async def analyze_certificate_file(self, file_bytes, mime, digest=None):
+        self.calls.append((file_bytes, digest))
+        return {"observations": ["ok"]}
+
+
+def test_bot_path_sends_only_relevant_pages(monkeypatch):
+    gateway = RecordingGateway()
+    monkeypatch.setattr(bot_service, "ai_gateway", gateway)
+
+    result = asyncio.run(bot_service.analyze_file_upload(CERTIFICATE))
+    assert result["platform"] == "Udemy"
+    assert result["ai_analysis"] == {"observations": ["ok"]}
+
+    (sent, digest), = gateway.calls
+    assert len(pdfium.PdfDocument(sent)) == 2
+    assert digest == f"{PDFHandle(CERTIFICATE).digest}:pages=1,2"
+
+
+def test_concurrent_pdfium_use_is_serialised():
+    from concurrent.futures import ThreadPoolExecutor
+    docs = [make_pdf([f"Udemy Certificate of Completion {i}", "Instructor", "Terms"]) for i in range(8)]
+    handles = [open_pdf(d) for d in docs]
+    assert all(h._digest is None for h in handles)  # nothing hashed on open
+
+    def work(handle):
+        return handle.page_count, len(pdfium.PdfDocument(handle.page_subset([0, 1])))
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(work, handles * 4)) == [(3, 2)] * 32
+    for handle in handles:
+        handle.close()
+    try:
+        handles[0].page_subset([0])
+        assert False, "closed handle reopened"
+    except ValueError:
+        pass
+
+
+def test_bot_path_closes_the_handle(monkeypatch):
+    import threading
+    import time
+    from app.core.deadline import Deadline, set_deadline, reset_deadline
+    opened = []
+
+    def recording_open(source):
+        opened.append(open_pdf(source))
+        return opened[-1]
+
+    monkeypatch.setattr(bot_service, "open_pdf", recording_open)
+    monkeypatch.setattr(bot_service, "ai_gateway", None)
+
+    def wait_closed(handle):
+        for _ in range(100):
+            if handle._closed:
+                return True
+            time.sleep(0.01)
+        return False
+
+    asyncio.run(bot_service.analyze_file_upload(make_pdf(["closed after use"])))
+    assert wait_closed(opened[0])
+
+    # Text stage cut by the deadline: still open until the request finishes
+    release = threading.Event()
+    monkeypatch.setattr(bot_service, "extract_text_from_pdf", lambda pdf: release.wait(5) and "")
+
+    async def cut_request():
+        deadline = Deadline(0.05)
+        token = set_deadline(deadline)
+        try:
+            result = await bot_service.analyze_file_upload(make_pdf(["slow"]))
+        finally:
+            reset_deadline(token)
+        return deadline, result
+
+    deadline, result = asyncio.run(cut_request())
+    assert result["cut_stages"] == ["pdf_text"]
+    assert not opened[1]._closed
+    release.set()
+    deadline.finish()
+    assert wait_closed(opened[1])
@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import config, profiling
+from app.services import image_service
+from test_streaming import png_bytes
+
+client = TestClient(app)
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def busy_ocr(img):
+    end = time.monotonic() + 0.15
+    while time.monotonic() < end:
+        pass
+    return {"ocr_text": "stub"}
+
+
+@pytest.fixture
+def profiling_on(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILE_INTERVAL_MS", 2)
+    monkeypatch.setattr(image_service, "run_ocr", busy_ocr)
+    return tmp_path
+
+
+def upload(headers=None, params=None):
+    return client.post("/api/verify", files={"file": ("a.png", png_bytes(), "image/png")},
+                       headers=headers, params=params)
+
+
+def test_profiled_request_stores_flamegraph(profiling_on):
+    response = upload(headers={"X-Profile": "1", "X-Request-ID": "req-1", **ADMIN})
+    assert response.status_code == 200
+    assert response.headers["x-profile-id"] == "req-1"
+
+    profiles = client.get("/api/profiles", headers=ADMIN).json()["profiles"]
+    assert [p["id"] for p in profiles] == ["req-1-route_media"]
+    assert profiles[0]["samples"] > 0
+
+    folded = client.get("/api/profiles/req-1-route_media", headers=ADMIN)
+    assert folded.status_code == 200
+    # Worker-thread time is attributed to the OCR stage
+    assert "busy_ocr (test_profiling.py" in folded.text
+    line = folded.text.splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_query_parameter_enables_profiling(profiling_on):
+    response = upload(headers=ADMIN, params={"profile": "1"})
+    assert "x-profile-id" in response.headers
+
+
+def test_not_profiled_without_admin_token(profiling_on):
+    response = upload(headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profiling.list_profiles() == []
+
+
+def test_endpoints_hidden_when_disabled(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_ADMIN_TOKEN", "")
+    assert client.get("/api/profiles", headers=ADMIN).status_code == 404
+    assert client.get("/api/profiles/x", headers={"X-Admin-Token": ""}).status_code == 404
+
+
+def test_download_rejects_path_traversal(profiling_on):
+    assert profiling.profile_file("../etc/passwd") is None
+    assert client.get("/api/profiles/..%2Fsecret", headers=ADMIN).status_code == 404
+
+
+def test_old_profiles_pruned(profiling_on, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_KEEP", 2)
+    for i in range(4):
+        upload(headers={"X-Profile": "1", "X-Request-ID": f"r{i}", **ADMIN})
+        time.sleep(0.01)
+    ids = [p["id"] for p in profiling.list_profiles()]
+    assert ids == ["r3-route_media", "r2-route_media"]
+    assert len(os.listdir(profiling_on)) == 4
+
+
+def test_profile_stage_is_noop_without_session():
+    async def run():
+        async with profiling.profile_stage("route_media"):
+            return [t for t in threading.enumerate() if t.name == "profile-sampler"]
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import cv2
+import numpy as np
+from app.services import qr_service, media_router, bot_service
+
+UDEMY_URL = "https://www.udemy.com/certificate/UC-1234-abcd/"
+
+
+def make_qr(payload, module_px=8):
+    code = cv2.QRCodeEncoder.create().encode(payload)
+    code = cv2.resize(code, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+    return cv2.copyMakeBorder(code, 32, 32, 32, 32, cv2.BORDER_CONSTANT, value=255)
+
+
+def test_decode_small_image():
+    img = make_qr(UDEMY_URL)
+    assert qr_service.decode_qr_codes(img) == [UDEMY_URL]
+
+
+def test_decode_multiple_codes_on_large_image():
+    canvas = np.full((1600, 2400), 255, dtype=np.uint8)
+    first, second = make_qr(UDEMY_URL), make_qr("hello world")
+    canvas[100:100 + first.shape[0], 100:100 + first.shape[1]] = first
+    canvas[900:900 + second.shape[0], 1500:1500 + second.shape[1]] = second
+    assert sorted(qr_service.decode_qr_codes(canvas)) == sorted([UDEMY_URL, "hello world"])
+
+
+def test_decode_no_code():
+    assert qr_service.decode_qr_codes(np.full((1500, 1500), 255, dtype=np.uint8)) == []
+
+
+def test_certificate_urls_filters_payloads():
+    payloads = [UDEMY_URL, "https://example.com", "WIFI:S:home;;"]
+    assert qr_service.certificate_urls(payloads) == [UDEMY_URL]
+
+
+def test_qr_certificate_goes_through_cached_verify(monkeypatch):
+    calls = []
+
+    async def fake_uncached(url):
+        calls.append(url)
+        return {"valid": True, "provider": "Udemy", "details": "ok", "structured_analysis": {}}
+
+    monkeypatch.setattr(bot_service, "_verify_certificate_uncached", fake_uncached)
+    bot_service.certificate_cache.clear()
+
+    linked = asyncio.run(media_router.verify_qr_certificates([UDEMY_URL, "not a url"]))
+    assert linked == [{"url": UDEMY_URL, "valid": True, "provider": "Udemy", "details": "ok"}]
+
+    asyncio.run(media_router.verify_qr_certificates([UDEMY_URL]))
+    assert calls == [UDEMY_URL]
+    bot_service.certificate_cache.clear()
+
+
+def test_unreachable_link_is_not_counted_as_invalid(monkeypatch):
+    from app.services.decision_engine import make_decision
+    no_content = {"valid": False, "provider": "Udemy", "details": "Could not retrieve page content."}
+    outcomes = {
+        UDEMY_URL: no_content,
+        UDEMY_URL + "gone/": {**no_content, "not_found": True},
+        UDEMY_URL + "slow/": {"valid": False, "provider": "Udemy", "details": "cut", "partial": True},
+    }
+
+    async def fake_uncached(url):
+        if url.endswith("boom/"):
+            raise RuntimeError("connection reset")
+        return outcomes[url]
+
+    monkeypatch.setattr(bot_service, "_verify_certificate_uncached", fake_uncached)
+    bot_service.certificate_cache.clear()
+    linked = asyncio.run(media_router.verify_qr_certificates(
+        [UDEMY_URL, UDEMY_URL + "gone/", UDEMY_URL + "slow/", UDEMY_URL + "boom/"]
+    ))
+    assert [link["valid"] for link in linked] == [None, False, None, None]
+
+    unreachable = make_decision("image", {"qr_detected": True, "qr_certificates": [linked[0], linked[2]]})
+    assert "QR certificate link could not be verified" not in unreachable["reasons"]
+    missing = make_decision("image", {"qr_detected": True, "qr_certificates": linked})
+    assert "QR certificate link could not be verified" in missing["reasons"]
+    bot_service.certificate_cache.clear()
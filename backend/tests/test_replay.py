@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import time
+import pytest
+from app.services import bot_service
+from fake_genai import FakeGenAIClient, FakeAPIError
+from replay import ReplayServer, install
+from test_pdf_handle import make_pdf
+
+# These pages are synthetic (tests/recordings/README.md): the tests cover
+# tiers, fallbacks and AI handling, not extraction from real provider markup.
+
+STATIC_URL = "https://www.udemy.com/certificate/UC-3f1c9a52-8d4e-4b7a-9c61-2e0f5a7b8c90/"
+JS_URL = "https://www.udemy.com/certificate/UC-9b2e7d04-61a3-4f0e-b8d2-7c5e1a9f3d26/"
+COURSERA_URL = "https://www.coursera.org/account/accomplishments/verify/K7QXH2M9PLRT"
+MISSING_URL = "https://www.udemy.com/certificate/UC-00000000-dead-beef-0000-000000000000/"
+
+
+@pytest.fixture
+def server():
+    with ReplayServer() as replay:
+        yield replay
+
+
+def test_static_page_is_served_from_the_fixture(monkeypatch, server):
+    client = FakeGenAIClient()
+    install(monkeypatch, server, client)
+    result = asyncio.run(bot_service.verify_certificate(STATIC_URL))
+
+    assert result["valid"] is True
+    analysis = result["structured_analysis"]
+    assert analysis["fetch_tier"] == "http"
+    assert analysis["extracted_fields"]["name"] == "Priya Raman"
+    assert analysis["rule_result"]["status"] == "Consistent"
+    assert analysis["ai_analysis"] == {"observations": ["gemini-2.0-flash observation"], "concerns": []}
+    assert server.hits == ["/www.udemy.com/certificate/UC-3f1c9a52-8d4e-4b7a-9c61-2e0f5a7b8c90/"]
+    assert server.browser_hits == [] and len(client.models.calls) == 1
+
+
+def test_js_page_falls_back_to_recorded_render(monkeypatch, server):
+    install(monkeypatch, server)
+    result = asyncio.run(bot_service.verify_certificate(JS_URL))
+    assert result["structured_analysis"]["fetch_tier"] == "browser"
+    assert result["structured_analysis"]["rule_result"]["status"] == "Consistent"
+    assert server.browser_hits == [JS_URL]
+
+    coursera = asyncio.run(bot_service.verify_certificate(COURSERA_URL))
+    assert coursera["provider"] == "Coursera"
+    assert coursera["structured_analysis"]["extracted_fields"]["certificate_id"] == "K7QXH2M9PLRT"
+
+
+def test_missing_certificate_skips_browser(monkeypatch, server):
+    install(monkeypatch, server)
+    result = asyncio.run(bot_service.verify_certificate(MISSING_URL))
+    assert result["valid"] is False
+    assert "Could not retrieve page content" in result["details"]
+    assert result["not_found"] is True
+    assert server.browser_hits == []
+
+
+def test_injected_errors_are_deterministic():
+    def failures(**behaviour):
+        models = FakeGenAIClient(**behaviour).models
+        pattern = []
+        for i in range(20):
+            try:
+                models.generate_content("m", f"prompt {i}")
+                pattern.append(False)
+            except FakeAPIError:
+                pattern.append(True)
+        return pattern
+
+    assert failures(fail_every=3) == [i % 3 == 2 for i in range(20)]
+    assert failures(error_rate=0.3, seed=7) == failures(error_rate=0.3, seed=7)
+    assert 0 < sum(failures(error_rate=0.3, seed=7)) < 20
+
+    started = time.perf_counter()
+    FakeGenAIClient(latency=lambda model, contents: 0.05).models.generate_content("m", "p")
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_ai_outage_fails_open(monkeypatch, server):
+    client = FakeGenAIClient(fail_every=1)
+    install(monkeypatch, server, client)
+    result = asyncio.run(bot_service.verify_certificate(STATIC_URL))
+    assert result["valid"] is True
+    assert result["structured_analysis"]["ai_analysis"] is None
+    assert client.models.failures == 1
+
+    pdf = make_pdf(["Certificate of Completion Udemy Instructor UC-3f1c9a52 Priya Raman"])
+    upload = asyncio.run(bot_service.analyze_file_upload(pdf))
+    assert upload["platform"] == "Udemy"
+    assert upload["message"] == "AI analysis failed/skipped due to error."
+
+
+def test_file_upload_with_fake_gemini(monkeypatch, server):
+    client = FakeGenAIClient(latency=0.01)
+    install(monkeypatch, server, client)
+    pdf = make_pdf(["Certificate of Completion Udemy Instructor UC-3f1c9a52 Priya Raman"])
+    result = asyncio.run(bot_service.analyze_file_upload(pdf))
+    assert result["rule_based_result"]["status"] == "Consistent"
+    assert result["ai_analysis"] == {"observations": ["gemini-2.0-flash observation"], "concerns": []}
+    assert client.models.calls[0]["model"] == "gemini-2.0-flash"
+
+
+def test_synthetic_fixtures_are_labelled(server):
+    for url in server.synthetic:
+        entry = server.recordings[url]
+        assert all(entry[k].startswith("synthetic_") for k in ("page", "rendered") if entry.get(k))
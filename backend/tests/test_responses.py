@@ -0,0 +1,185 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import verify
+from app.core.responses import dumps, project
+from app.services import bot_service
+from test_streaming import png_bytes
+
+client = TestClient(app)
+
+ROUTING = {
+    "mediaType": "image",
+    "analysis": {"ocr_text": "x" * 4000, "metadata": {f"Tag {i}": "value" for i in range(200)}},
+    "decision": {"status": "VERIFIED", "confidence": 0.9, "reasons": ["QR code detected"]},
+}
+
+
+def fake_route(calls, routing=ROUTING):
+    async def route(file_bytes):
+        calls.append(len(file_bytes))
+        return json.loads(json.dumps(routing))
+    return route
+
+
+def post_verify(params="", headers=None):
+    return client.post(f"/api/verify{params}", files={"file": ("a.png", png_bytes(), "image/png")},
+                       headers=headers or {})
+
+
+def test_projection_include_exclude_without_mutation():
+    payload = {"routing": ROUTING, "filename": "a.png"}
+    assert project(payload, "routing.decision.status,filename") == {
+        "routing": {"decision": {"status": "VERIFIED"}}, "filename": "a.png"
+    }
+    trimmed = project(payload, "-routing.analysis.metadata,-routing.analysis.ocr_text")
+    assert trimmed["routing"]["analysis"] == {}
+    assert "metadata" in ROUTING["analysis"]
+    assert project(payload, "") is payload
+
+
+def test_dumps_handles_numpy_and_odd_keys():
+    assert json.loads(dumps({"score": np.float32(0.5), "ids": np.arange(2), 3: {1, 2} - {1}})) == {
+        "score": 0.5, "ids": [0, 1], "3": "{2}"
+    }
+
+
+def test_verify_etag_and_304_skip_the_pipeline(monkeypatch):
+    calls = []
+    monkeypatch.setattr(verify, "route_media_bytes", fake_route(calls))
+
+    first = post_verify()
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("private, max-age=")
+
+    second = post_verify(headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.headers["etag"] == etag
+    assert calls == [len(png_bytes())]
+
+    # A projection is a different representation
+    projected = post_verify("?fields=routing.decision", headers={"If-None-Match": etag})
+    assert projected.status_code == 200
+    assert projected.json() == {"routing": {"decision": ROUTING["decision"]}}
+    assert projected.headers["etag"] != etag
+
+
+def test_partial_results_are_not_cached(monkeypatch):
+    partial = {**ROUTING, "decision": {**ROUTING["decision"], "partial": True}}
+    monkeypatch.setattr(verify, "route_media_bytes", fake_route([], partial))
+    response = post_verify()
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_large_json_is_gzipped_small_is_not(monkeypatch):
+    monkeypatch.setattr(verify, "route_media_bytes", fake_route([]))
+    response = post_verify(headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert response.json()["routing"]["decision"]["status"] == "VERIFIED"
+
+    small = post_verify("?fields=routing.decision", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    raw = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+
+
+def test_stream_is_never_compressed(monkeypatch):
+    from app.services import image_service
+    monkeypatch.setattr(image_service, "run_ocr", lambda img: {"ocr_text": "y" * 5000})
+    response = client.post("/api/verify/stream", files={"file": ("a.png", png_bytes(), "image/png")},
+                           headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "event: result" in response.text
+
+
+def test_certificate_lookup_revalidates(monkeypatch):
+    async def fake_uncached(url):
+        return {"valid": True, "provider": "Udemy", "details": "ok", "structured_analysis": {}}
+
+    monkeypatch.setattr(bot_service, "_verify_certificate_uncached", fake_uncached)
+    bot_service.certificate_cache.clear()
+    url = "https://www.udemy.com/certificate/UC-1234/"
+
+    first = client.post("/api/bot/verify-certificate", json={"url": url}, headers={"Accept-Encoding": "identity"})
+    assert first.json()["valid"] is True
+    etag = first.headers["etag"]
+    again = client.post("/api/bot/verify-certificate", json={"url": url}, headers={"If-None-Match": f"W/{etag}"})
+    assert again.status_code == 304
+    bot_service.certificate_cache.clear()
+
+
+
+def test_negotiated_responses_vary_and_weak_etag(monkeypatch):
+    monkeypatch.setattr(verify, "route_media_bytes", fake_route([]))
+    plain = post_verify(headers={"Accept-Encoding": "identity"})
+    assert plain.headers["vary"] == "Accept-Encoding"
+    etag = plain.headers["etag"]
+    assert not etag.startswith("W/")
+
+    gzipped = post_verify(headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == f"W/{etag}" and gzipped.headers["vary"] == "Accept-Encoding"
+
+    small = post_verify("?fields=routing.decision", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.headers["vary"] == "Accept-Encoding"
+
+    revalidated = post_verify(headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == f"W/{etag}" and revalidated.headers["vary"] == "Accept-Encoding"
+
+
+def test_wildcard_if_none_match_is_ignored(monkeypatch):
+    calls = []
+    monkeypatch.setattr(verify, "route_media_bytes", fake_route(calls))
+    response = post_verify(headers={"If-None-Match": "*"})
+    assert response.status_code == 200 and calls
+
+
+def test_non_object_ai_result_is_returned_uncached(monkeypatch):
+    from app.api import bot
+
+    async def fake_analyze(content):
+        return json.dumps(["not", "an", "object"])
+
+    monkeypatch.setattr(bot, "analyze_image_with_gemini", fake_analyze)
+    response = client.post("/api/bot/analyze-image", files={"file": ("a.png", png_bytes(), "image/png")})
+    assert response.status_code == 200 and response.json() == ["not", "an", "object"]
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_bot_file_etag_follows_rules_and_model(monkeypatch):
+    from types import SimpleNamespace
+    from app.api import bot
+    from app.core import config
+    from app.services import decision_engine
+
+    async def fake_analyze(content):
+        return json.dumps({"platform": "Udemy"})
+
+    def upload(etag=None):
+        return client.post("/api/bot/analyze-image", files={"file": ("a.png", png_bytes(), "image/png")},
+                           headers={"If-None-Match": etag} if etag else {})
+
+    monkeypatch.setattr(bot, "analyze_image_with_gemini", fake_analyze)
+    monkeypatch.setattr(bot_service, "ai_gateway", SimpleNamespace(fingerprint="|gemini-2.0-flash|v1"))
+    etag = upload().headers["etag"]
+    assert upload(etag).status_code == 304
+
+    # Another model
+    monkeypatch.setattr(bot_service, "ai_gateway", SimpleNamespace(fingerprint="|gemini-2.5-pro|v1"))
+    assert upload(etag).status_code == 200
+
+    # Other decision rules
+    monkeypatch.setattr(bot_service, "ai_gateway", SimpleNamespace(fingerprint="|gemini-2.0-flash|v1"))
+    with open(config.DECISION_WEIGHTS_PATH) as f:
+        table = json.load(f)
+    table["thresholds"]["VERIFIED"] = 75
+    monkeypatch.setattr(decision_engine, "_engine", decision_engine.DecisionEngine(table))
+    assert upload(etag).status_code == 200
@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import io
+import json
+import tarfile
+import numpy as np
+from PIL import Image
+from app.cli import reverify
+from app.services import image_service
+
+
+def png_bytes(value=255):
+    buf = io.BytesIO()
+    Image.fromarray(np.full((64, 64, 3), value, dtype=np.uint8)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return {r["path"]: r for r in map(json.loads, f)}
+
+
+def make_tree(root):
+    os.makedirs(os.path.join(root, "sub"))
+    with open(os.path.join(root, "a.png"), "wb") as f:
+        f.write(png_bytes(255))
+    with open(os.path.join(root, "sub", "copy.png"), "wb") as f:
+        f.write(png_bytes(255))
+    with open(os.path.join(root, "notes.txt"), "w") as f:
+        f.write("not media")
+
+
+def quiet():
+    return reverify.Progress(stream=io.StringIO())
+
+
+def test_directory_run_then_resume_skips_unchanged(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", lambda img: {"ocr_text": "x" * 150})
+    source, output = str(tmp_path / "src"), str(tmp_path / "out.jsonl")
+    make_tree(source)
+
+    counts = reverify.run(source, output, workers=0, progress=quiet())
+    assert counts == {"processed": 2, "skipped": 0, "reused": 1, "errors": 0}
+
+    records = read_records(output)
+    assert set(records) == {"a.png", os.path.join("sub", "copy.png"), "notes.txt"}
+    assert records["a.png"]["mediaType"] == "image"
+    assert records["a.png"]["decision"]["reasons"] == ["Readable text extracted"]
+    assert records["notes.txt"]["decision"]["status"] == "NOT_VERIFIED"
+    assert records[os.path.join("sub", "copy.png")]["reused_from"] == "a.png"
+
+    # Second run: nothing changed, nothing re-verified
+    counts = reverify.run(source, output, workers=0, progress=quiet())
+    assert counts == {"processed": 0, "skipped": 3, "reused": 0, "errors": 0}
+
+    # A changed file is picked up again
+    with open(os.path.join(source, "a.png"), "wb") as f:
+        f.write(png_bytes(0))
+    os.utime(os.path.join(source, "a.png"), (1, 1))
+    counts = reverify.run(source, output, workers=0, progress=quiet())
+    assert counts["processed"] == 1 and counts["skipped"] == 2
+    assert len(read_records(output)) == 3
+
+
+def test_resume_after_torn_write(tmp_path):
+    source, output = str(tmp_path / "src"), str(tmp_path / "out.jsonl")
+    os.makedirs(source)
+    with open(os.path.join(source, "a.txt"), "w") as f:
+        f.write("a")
+    with open(output, "w") as f:
+        f.write('{"path": "partial')
+
+    counts = reverify.run(source, output, workers=0, progress=quiet())
+    assert counts["processed"] == 1
+    assert list(read_records(output)) == ["a.txt"]
+
+
+def test_tarball_with_process_pool(tmp_path):
+    archive, output = str(tmp_path / "in.tar.gz"), str(tmp_path / "out.jsonl")
+    with tarfile.open(archive, "w:gz") as tar:
+        for i in range(6):
+            data = f"file {i}".encode()
+            info = tarfile.TarInfo(f"docs/{i}.txt")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    counts = reverify.run(archive, output, workers=2, progress=quiet())
+    assert counts["processed"] == 6 and counts["errors"] == 0
+    records = read_records(output)
+    assert sorted(records) == [f"docs/{i}.txt" for i in range(6)]
+    assert all(r["mediaType"] == "unknown" for r in records.values())
+
+    counts = reverify.run(archive, output, workers=2, progress=quiet())
+    assert counts["skipped"] == 6
+
+
+def test_rules_change_forces_rescore(tmp_path, monkeypatch):
+    source, output = str(tmp_path / "src"), str(tmp_path / "out.jsonl")
+    os.makedirs(source)
+    with open(os.path.join(source, "a.txt"), "w") as f:
+        f.write("a")
+    reverify.run(source, output, workers=0, progress=quiet())
+
+    monkeypatch.setattr(reverify, "rules_fingerprint", lambda: "new-weights")
+    counts = reverify.run(source, output, workers=0, progress=quiet())
+    assert counts["processed"] == 1
+    assert read_records(output)["a.txt"]["rules"] == "new-weights"
+
+
+def test_parquet_without_pyarrow_fails_before_work(tmp_path, monkeypatch, capsys):
+    import importlib.util
+    import pytest
+    from app.services.decision_engine import get_engine
+    make_tree(str(tmp_path / "in"))
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *a: None if name == "pyarrow" else real_find_spec(name, *a))
+    out = tmp_path / "x.parquet"
+    with pytest.raises(SystemExit) as exc:
+        reverify.main([str(tmp_path / "in"), "--output", str(out), "--workers", "0"])
+    assert exc.value.code == 2
+    assert "needs pyarrow" in capsys.readouterr().err
+    assert not os.path.exists(str(out) + ".jsonl")
+    # Same fingerprint the API puts in its ETags
+    assert reverify.rules_fingerprint() == get_engine().fingerprint
@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+from app.services import scrape_scheduler
+from app.services.scrape_scheduler import OutboundScheduler, TokenBucket, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+def test_token_bucket_rate_and_backoff(monkeypatch):
+    monkeypatch.setattr(scrape_scheduler.config, "SCRAPE_BACKOFF_BASE_SECONDS", 5.0)
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    assert bucket.try_acquire(now=bucket.updated) == 0.0
+    assert bucket.try_acquire(now=bucket.updated) == 0.0
+    assert bucket.try_acquire(now=bucket.updated) == 0.5
+
+    bucket.penalize(now=100.0)
+    assert bucket.rate == 1.0
+    assert bucket.try_acquire(now=101.0) == 4.0
+
+    bucket.reward()
+    assert bucket.rate == 2.0
+
+
+def test_identical_pending_urls_are_coalesced():
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return 200, "page"
+
+    async def main():
+        sched = OutboundScheduler(rate_per_host=100, burst=100)
+        return await asyncio.gather(*(sched.submit("https://www.udemy.com/certificate/UC-1/", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == ["https://www.udemy.com/certificate/UC-1/"]
+    assert all(r[:2] == (200, "page") for r in results)
+
+
+def test_priority_order_and_queue_wait_reported():
+    order = []
+
+    async def fetch(url):
+        order.append(url)
+        await asyncio.sleep(0.02)
+        return 200, url
+
+    async def main():
+        sched = OutboundScheduler(rate_per_host=100, burst=100, max_in_flight=1)
+        first = asyncio.ensure_future(sched.submit("https://h/first", fetch))
+        await asyncio.sleep(0)
+        background = asyncio.ensure_future(sched.submit("https://h/bg", fetch, priority=PRIORITY_BACKGROUND))
+        interactive = asyncio.ensure_future(sched.submit("https://h/ui", fetch, priority=PRIORITY_INTERACTIVE))
+        return await asyncio.gather(first, background, interactive)
+
+    results = asyncio.run(main())
+    assert order == ["https://h/first", "https://h/ui", "https://h/bg"]
+    # The background job waited for both others
+    assert results[1][2]["queue_ms"] >= 30
+    assert results[1][2]["fetch_ms"] < results[1][2]["queue_ms"]
+
+
+def test_throttle_status_slows_host(monkeypatch):
+    monkeypatch.setattr(scrape_scheduler.config, "SCRAPE_BACKOFF_BASE_SECONDS", 0.1)
+
+    async def fetch(url):
+        return (429, "") if url.endswith("/a") else (200, "ok")
+
+    async def main():
+        sched = OutboundScheduler(rate_per_host=100, burst=100)
+        await sched.submit("https://h/a", fetch)
+        bucket = sched._hosts["h"].bucket
+        assert bucket.strikes == 1
+        _, _, timing = await sched.submit("https://h/b", fetch)
+        return timing
+
+    timing = asyncio.run(main())
+    assert timing["queue_ms"] >= 80
+
+
+def test_rate_limited_submits_keep_one_timer():
+    async def fetch(url):
+        return 200, url
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        handles = []
+        call_later = loop.call_later
+
+        def recording_call_later(*args):
+            handle = call_later(*args)
+            handles.append(handle)
+            return handle
+
+        loop.call_later = recording_call_later
+        sched = OutboundScheduler(rate_per_host=20, burst=1)
+        jobs = [asyncio.ensure_future(sched.submit(f"https://h/{i}", fetch)) for i in range(5)]
+        await asyncio.sleep(0)
+        assert sum(not h.cancelled() for h in handles) == 1
+        results = await asyncio.gather(*jobs)
+        del loop.call_later
+        return results
+
+    assert [r[1] for r in asyncio.run(main())] == [f"https://h/{i}" for i in range(5)]
+
+
+def test_cancelled_fetch_releases_coalesced_waiters():
+    async def fetch(url):
+        raise asyncio.CancelledError()
+
+    async def main():
+        sched = OutboundScheduler(rate_per_host=100, burst=100)
+        waiters = [sched.submit("https://h/page", fetch) for _ in range(3)]
+        return await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), timeout=2)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+def test_static_403_does_not_slow_browser_fallback():
+    async def fetch(url):
+        return 403, ""
+
+    async def main():
+        sched = OutboundScheduler(rate_per_host=100, burst=100)
+        await sched.submit("https://h/a", fetch, kind="http")
+        bucket = sched._hosts["h"].bucket
+        assert bucket.strikes == 0 and bucket.rate == 100
+        await sched.submit("https://h/a", fetch, kind="browser")
+        assert bucket.strikes == 1
+
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import io
+import json
+import numpy as np
+from PIL import Image
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import image_service, media_router
+
+client = TestClient(app)
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def png_bytes():
+    buf = io.BytesIO()
+    Image.fromarray(np.full((64, 64, 3), 255, dtype=np.uint8)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_verify_stream_sends_stages_then_result(monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", lambda img: {"ocr_text": "stub text"})
+    response = client.post("/api/verify/stream", files={"file": ("a.png", png_bytes(), "image/png")})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert events[0] == ("stage", {"stage": "file_type", "data": {"mediaType": "image"}})
+    stages = {data["stage"] for event, data in events if event == "stage"}
+    assert {"exif", "qr", "ocr"} <= stages
+
+    event, result = events[-1]
+    assert event == "result"
+    assert result["mediaType"] == "image"
+    assert result["analysis"]["ocr_text"] == "stub text"
+    assert result["decision"]["status"] in ["VERIFIED", "SUSPICIOUS", "NOT_VERIFIED"]
+
+
+def test_stream_and_plain_endpoint_agree(monkeypatch):
+    monkeypatch.setattr(image_service, "run_ocr", lambda img: {"ocr_text": "stub text"})
+    plain = client.post("/api/verify", files={"file": ("a.png", png_bytes(), "image/png")}).json()
+    streamed = parse_sse(client.post("/api/verify/stream", files={"file": ("a.png", png_bytes(), "image/png")}).text)
+    assert streamed[-1][1] == plain["routing"]
+
+
+def test_bot_stream_unknown_file():
+    response = client.post("/api/bot/analyze-image/stream", files={"file": ("a.bin", b"\x00" * 32, "application/octet-stream")})
+    events = parse_sse(response.text)
+    assert [e for e, _ in events] == ["stage", "stage", "result"]
+    assert events[1][1]["stage"] == "rules"
+    assert events[-1][1]["platform"] == "Unknown"
+
+
+def test_closing_stream_cancels_pending_stages():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fast():
+        return {"x": 1}
+
+    async def main():
+        gen = media_router._as_completed({"slow": slow(), "fast": fast()})
+        first = await gen.__anext__()
+        await gen.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(main()) == ("fast", {"x": 1})
+    assert cancelled == [True]
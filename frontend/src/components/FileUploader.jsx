@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   Button,
   Typography,
@@ -8,9 +8,33 @@ import {
 import UploadFileIcon from "@mui/icons-material/CloudUpload";
 import { verifyFile } from "../services/api";
 
-const FileUploader = ({ accept, description, onResult, uploadFunction = verifyFile }) => {
+// One line per finished stage, shown while the rest of the pipeline runs
+const describeStage = ({ stage, data }) => {
+  switch (stage) {
+    case "file_type":
+      return `Detected ${data?.mediaType || data?.mime || "file"}`;
+    case "ocr":
+      return data?.platform ? `Text read: ${data.platform} certificate` : "Text read";
+    case "rules":
+      return `Rule check: ${data?.rule_based_result?.status || "done"}`;
+    case "ai":
+      return "AI analysis finished";
+    default:
+      return `${stage.replace(/_/g, " ")} finished`;
+  }
+};
+
+// `streamFunction(file, onStage, signal)` (see services/api.js) is preferred
+// when given: stage events render as they arrive instead of after the
+// whole pipeline. `uploadFunction(file)` is the one-shot fallback.
+const FileUploader = ({ accept, description, onResult, uploadFunction = verifyFile, streamFunction }) => {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [stages, setStages] = useState([]);
+  const abortRef = useRef(null);
+
+  // Leaving the page cancels the request; the server stops pending stages
+  useEffect(() => () => abortRef.current?.abort(), []);
 
   const handleVerify = async () => {
     if (!file) {
@@ -19,12 +43,23 @@ const FileUploader = ({ accept, description, onResult, uploadFunction = verifyFi
     }
 
     setLoading(true);
+    setStages([]);
+    onResult(null);
+    const controller = new AbortController();
+    abortRef.current = controller;
     try {
-      const result = await uploadFunction(file);
+      const result = streamFunction
+        ? await streamFunction(
+            file,
+            (event) => setStages((previous) => [...previous, describeStage(event)]),
+            controller.signal
+          )
+        : await uploadFunction(file);
       onResult(result);
-    } catch {
-      alert("Verification failed");
+    } catch (error) {
+      if (error?.name !== "AbortError") alert("Verification failed");
     } finally {
+      abortRef.current = null;
       setLoading(false);
     }
   };
@@ -67,6 +102,16 @@ const FileUploader = ({ accept, description, onResult, uploadFunction = verifyFi
           </Typography>
         )}
 
+        {stages.length > 0 && (
+          <Stack spacing={0.5}>
+            {stages.map((line, i) => (
+              <Typography key={i} variant="body2" sx={{ color: "#9ca3af" }}>
+                ✓ {line}
+              </Typography>
+            ))}
+          </Stack>
+        )}
+
         <Button
           variant="contained"
           size="large"
@@ -1,7 +1,7 @@
 import { useState } from "react";
 import FileUploader from "../components/FileUploader";
 import ResultCard from "../components/ResultCard";
-import { analyzeImage } from "../services/api";
+import { analyzeImage, analyzeImageStream } from "../services/api";
 
 const ImageSection = () => {
   const [result, setResult] = useState(null);
@@ -13,6 +13,7 @@ const ImageSection = () => {
         description="Upload an image to verify whether it is authentic or manipulated."
         onResult={setResult}
         uploadFunction={analyzeImage}
+        streamFunction={analyzeImageStream}
       />
       <ResultCard result={result} />
     </>
@@ -1,6 +1,7 @@
 import { useState } from "react";
 import FileUploader from "../components/FileUploader";
 import ResultCard from "../components/ResultCard";
+import { verifyFileStream } from "../services/api";
 
 const VideoSection = () => {
   const [result, setResult] = useState(null);
@@ -11,6 +12,7 @@ const VideoSection = () => {
         accept=".mp4,.mov"
         description="Upload a video to verify authenticity using frame and metadata analysis."
         onResult={setResult}
+        streamFunction={verifyFileStream}
       />
       <ResultCard result={result} />
     </>
@@ -25,3 +25,61 @@ export const analyzeImage = async (file) => {
 
   return response.data;
 };
+
+// Streaming variants: the server sends Server-Sent Events as each stage
+// finishes. `onStage({ stage, data })` is called for partial results and the
+// promise resolves with the final result. Pass an AbortSignal to cancel;
+// the server stops pending work when the connection closes.
+const streamUpload = async (path, file, onStage, signal) => {
+  const formData = new FormData();
+  formData.append("file", file);
+
+  const response = await fetch(`/api${path}`, {
+    method: "POST",
+    body: formData,
+    headers: { Accept: "text/event-stream" },
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : null;
+
+      if (event === "stage" && onStage) onStage(payload);
+      else if (event === "result") return payload;
+      else if (event === "error") throw new Error(payload?.detail || "Stream failed");
+    }
+  }
+  throw new Error("Stream ended without a result");
+};
+
+export const verifyFileStream = (file, onStage, signal) =>
+  streamUpload("/verify/stream", file, onStage, signal).then((routing) => ({
+    status: "RECEIVED",
+    filename: file.name,
+    routing,
+  }));
+
+export const analyzeImageStream = (file, onStage, signal) =>
+  streamUpload("/bot/analyze-image/stream", file, onStage, signal);